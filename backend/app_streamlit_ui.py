@@ -1,11 +1,11 @@
 import json
 import hashlib
+import os
 from datetime import datetime
 import pandas as pd
 import numpy as np
 import requests
 import streamlit as st
-from pathlib import Path
 # =========================
 # CONFIG CHUNG
 # =========================
@@ -108,6 +108,8 @@ def render_main_header():
 
 # Test local với FastAPI port 8000
 API_BASE_URL = "http://localhost:8000"
+# token giám sát (header X-Supervisor-Token) cho endpoint audit
+SUPERVISOR_TOKEN = os.getenv("SUPERVISOR_TOKEN", "")
 
 
 def api_post(path: str, payload: dict):
@@ -129,6 +131,22 @@ def api_post(path: str, payload: dict):
         return None, f"Gọi API {path} thất bại: {ex}"
 
 
+def api_get(path: str, params: dict = None):
+    """Gọi GET tới API backend. Trả về (data, error) như api_post."""
+    base = API_BASE_URL.rstrip("/")
+    if not path.startswith("/"):
+        path = "/" + path
+    url = base + path
+
+    try:
+        headers = {"X-Supervisor-Token": SUPERVISOR_TOKEN} if SUPERVISOR_TOKEN else None
+        resp = requests.get(url, params=params, headers=headers, timeout=10)
+        resp.raise_for_status()
+        return resp.json(), None
+    except Exception as ex:
+        return None, f"Gọi API {path} thất bại: {ex}"
+
+
 # =========================
 # MÀN HÌNH 1 – CÔNG DÂN (DSAP)
 # =========================
@@ -430,7 +448,7 @@ def view_regulator():
 # =========================
 
 def view_logs():
-    """Màn hình Audit Log Viewer – đọc log từ file JSONL do API ghi ra."""
+    """Màn hình Audit Log Viewer – đọc log qua API /api/v1/audit/logs."""
 
     st.subheader("PB-025 — Audit Log Viewer")
     st.caption(
@@ -443,37 +461,22 @@ def view_logs():
         "`/score/apply`, chưa nối với audit ledger thật."
     )
 
-    log_path = Path(__file__).parent / "data" / "audit_log.jsonl"
+    # 20 bản ghi mới nhất qua API (index của ledger, gồm cả segment đã xoay)
+    page, err = api_get("/api/v1/audit/logs", {"limit": 20})
+    if err:
+        st.warning(f"Không đọc được audit log: {err}")
+        return
 
-    if not log_path.exists():
+    records = page.get("items", [])
+    if not records:
         st.warning(
             "Chưa có bản ghi nào. Hãy vào **Banking Dashboard** và gửi "
             "ít nhất 1 yêu cầu thẩm định để tạo audit log."
         )
         return
 
-    records = []
-    with log_path.open("r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                records.append(json.loads(line))
-            except Exception:
-                # Nếu có dòng lỗi format thì bỏ qua, tránh crash demo
-                continue
-
-    if not records:
-        st.warning("File audit_log.jsonl trống hoặc không đọc được.")
-        return
-
     df = pd.DataFrame(records)
 
-    # Sắp xếp theo thời gian mới nhất
-    if "timestamp" in df.columns:
-        df = df.sort_values("timestamp", ascending=False)
-
     st.markdown("### Danh sách audit log gần nhất")
 
     st.dataframe(
@@ -0,0 +1,393 @@
+"""
+Index và truy vấn audit ledger (audit_log.jsonl) không phải đọc cả file.
+
+Index nằm trong SQLite cạnh file log (<log>.index.db), cập nhật tăng dần
+(chỉ đọc phần mới ghi thêm kể từ lần trước):
+
+- blocks   : index thưa thời gian → byte offset. Mỗi ~64KB log là 1 block
+             với ts_min / ts_max → bỏ qua được các block ngoài khoảng
+             since / until.
+- postings : index phụ (key, offset) với key = "n:<national_id>",
+             "a:<audit_id>", "b:<bank_code>".
+
+Đọc dữ liệu bằng seek tới offset (hoặc đọc ngược từ cuối file theo block
+cho "N bản ghi mới nhất") → bộ nhớ và thời gian không phụ thuộc kích thước
+ledger. Phân trang bằng cursor = byte offset.
+
+Index chỉ phủ file đang ghi; các segment đã đóng (audit_segments.py) được
+lọc bằng footer (khoảng thời gian, bloom national_id) rồi mới giải nén.
+"""
+
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from audit_segments import list_segments, segment_lines, segment_lines_reversed
+from ids import id_timestamp
+from state_db import SQLiteStore
+
+AUDIT_INDEX_BLOCK = int(os.getenv("AUDIT_INDEX_BLOCK", str(64 * 1024)))
+# các worker gán timestamp lúc append nên thứ tự trong file chỉ "gần" theo
+# thời gian; quét theo thời gian chỉ dừng khi đã vượt quá khoảng này
+AUDIT_TS_SKEW_S = float(os.getenv("AUDIT_TS_SKEW_S", "5"))
+# audit_id mang thời điểm sinh ID (ids.py) → chỉ xét segment quanh thời điểm đó
+AUDIT_ID_SKEW_S = float(os.getenv("AUDIT_ID_SKEW_S", "3600"))
+
+_READ_BLOCK = 64 * 1024
+_REFRESH_CHUNK = 4 * 1024 * 1024
+
+# trường bản ghi -> tiền tố key trong postings
+_KEY_FIELDS = (("audit_id", "a:"), ("national_id", "n:"), ("bank_code", "b:"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS blocks (
+    start  INTEGER PRIMARY KEY,
+    ts_min TEXT NOT NULL,
+    ts_max TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS postings (
+    key    TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    ts     TEXT NOT NULL,
+    PRIMARY KEY (key, offset)
+) WITHOUT ROWID;
+"""
+
+
+def _ts_param(value: Optional[datetime], shift: float = 0.0) -> Optional[str]:
+    """datetime (naive = UTC) → chuỗi cùng định dạng timestamp trong ledger."""
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (value + timedelta(seconds=shift)).isoformat(timespec="microseconds")
+
+
+def _reverse_lines(f, end: int) -> Iterator[Tuple[int, bytes]]:
+    """(offset, dòng) từ `end` lùi về đầu file, đọc từng block."""
+    pos = end
+    head = b""  # phần đầu block trước, có thể là nửa dòng
+    while pos > 0:
+        step = min(_READ_BLOCK, pos)
+        pos -= step
+        f.seek(pos)
+        buf = f.read(step) + head
+        lines = buf.split(b"\n")
+        head = lines[0]
+        offsets = []
+        off = pos + len(head) + 1
+        for line in lines[1:]:
+            offsets.append(off)
+            off += len(line) + 1
+        for off, line in zip(reversed(offsets), reversed(lines[1:])):
+            if line:
+                yield off, line
+    if head:
+        yield 0, head
+
+
+def _forward_lines(f, start: int, end: int) -> Iterator[Tuple[int, bytes]]:
+    """(offset, dòng) từ `start` tới `end` (end nằm ở ranh giới dòng)."""
+    pos = start
+    f.seek(pos)
+    tail = b""
+    while pos < end:
+        chunk = f.read(min(_READ_BLOCK, end - pos))
+        if not chunk:
+            break
+        buf = tail + chunk
+        base = pos - len(tail)
+        pos += len(chunk)
+        lines = buf.split(b"\n")
+        tail = lines.pop()
+        off = base
+        for line in lines:
+            if line:
+                yield off, line
+            off += len(line) + 1
+
+
+def _read_line(f, offset: int) -> bytes:
+    f.seek(offset)
+    return f.readline().rstrip(b"\n")
+
+
+class AuditIndex(SQLiteStore):
+    schema = _SCHEMA
+
+    def __init__(self, log_path: str, index_path: Optional[str] = None):
+        self.log_path = log_path
+        super().__init__(index_path or log_path + ".index.db")
+        self._known_size = -1
+        self._footers: Dict[str, Dict[str, Any]] = {}
+
+    # ---- cập nhật index ----
+
+    def _head(self) -> str:
+        with open(self.log_path, "rb") as f:
+            return f.readline()[-67:-3].decode(errors="replace")  # hash của dòng đầu
+
+    def refresh(self) -> int:
+        """Index phần log ghi thêm từ lần trước; trả về offset đã index tới (cuối dòng đầy đủ)."""
+        size = os.path.getsize(self.log_path) if os.path.exists(self.log_path) else 0
+        if size == self._known_size:
+            return size
+        with self._transaction() as conn:
+            meta = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+            upto = int(meta.get("indexed_upto", 0))
+            head = self._head() if size else ""
+            if upto > size or (upto and meta.get("head") != head):
+                # file log bị thay / cắt → index lại từ đầu
+                conn.execute("DELETE FROM blocks")
+                conn.execute("DELETE FROM postings")
+                conn.execute("DELETE FROM meta")
+                upto, meta = 0, {}
+            block = None
+            if "block_start" in meta:
+                block = [int(meta["block_start"]), meta["block_ts_min"], meta["block_ts_max"]]
+
+            pos = upto
+            if size:
+                with open(self.log_path, "rb") as f:
+                    f.seek(upto)
+                    pending = b""
+                    while True:
+                        chunk = f.read(_REFRESH_CHUNK)
+                        if not chunk:
+                            break
+                        buf = pending + chunk
+                        cut = buf.rfind(b"\n")
+                        if cut < 0:
+                            pending = buf
+                            continue
+                        pending = buf[cut + 1:]
+                        postings = []
+                        for line in buf[:cut].split(b"\n"):
+                            off = pos
+                            pos += len(line) + 1
+                            if not line:
+                                continue
+                            rec = json.loads(line)
+                            ts = rec.get("timestamp", "")
+                            if block is None or off - block[0] >= AUDIT_INDEX_BLOCK:
+                                if block is not None:
+                                    conn.execute("INSERT OR REPLACE INTO blocks VALUES (?, ?, ?)", block)
+                                block = [off, ts, ts]
+                            elif ts < block[1]:
+                                block[1] = ts
+                            elif ts > block[2]:
+                                block[2] = ts
+                            for field, prefix in _KEY_FIELDS:
+                                value = rec.get(field)
+                                if value:
+                                    postings.append((prefix + str(value), off, ts))
+                        conn.executemany("INSERT OR IGNORE INTO postings VALUES (?, ?, ?)", postings)
+
+            if block is not None:
+                conn.execute("INSERT OR REPLACE INTO blocks VALUES (?, ?, ?)", block)  # block đang mở
+                meta_rows = [
+                    ("block_start", str(block[0])), ("block_ts_min", block[1]), ("block_ts_max", block[2]),
+                ]
+            else:
+                meta_rows = []
+            meta_rows += [("indexed_upto", str(pos)), ("head", head)]
+            conn.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", meta_rows)
+        self._known_size = size if pos == size else -1
+        return pos
+
+    # ---- truy vấn ----
+
+    def query(
+        self,
+        national_id: Optional[str] = None,
+        audit_id: Optional[str] = None,
+        bank_code: Optional[str] = None,
+        action: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        limit: int = 20,
+        cursor: Optional[int] = None,
+        order: str = "desc",
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """(bản ghi, cursor trang sau). desc: mới nhất trước, cursor = offset
+        bản ghi cuối (trang sau lấy các bản ghi trước nó); asc: cursor = offset
+        ngay sau bản ghi cuối. Offset là offset logic qua mọi segment
+        (audit_segments.py)."""
+        while True:
+            # segment xoay vòng giữa lúc liệt kê và refresh → làm lại cho khớp
+            segments = list_segments(self.log_path, self._footers)
+            try:
+                end = self.refresh()
+            except FileNotFoundError:  # file đang ghi vừa bị đổi tên thành segment
+                continue
+            if len(list_segments(self.log_path, self._footers)) == len(segments):
+                break
+        base = segments[-1].end if segments else 0
+
+        want = {"national_id": national_id, "audit_id": audit_id, "bank_code": bank_code, "action": action}
+        want = {k: v for k, v in want.items() if v is not None}
+        lo, hi = _ts_param(since), _ts_param(until)
+
+        def matches(rec: Dict[str, Any]) -> bool:
+            ts = rec.get("timestamp", "")
+            if (lo and ts < lo) or (hi and ts > hi):
+                return False
+            return all(rec.get(k) == v for k, v in want.items())
+
+        # lọc thô trên bytes trước khi parse JSON (ledger ghi JSON gọn, sort_keys)
+        needles = [
+            f'"{k}":'.encode() + json.dumps(v, ensure_ascii=False).encode() for k, v in want.items()
+        ]
+        # khoảng thời gian dùng để loại segment / block
+        seg_lo, seg_hi = lo, hi
+        if audit_id and audit_id.startswith("A-"):
+            try:
+                at = id_timestamp(audit_id, "A-").replace(tzinfo=None)
+            except ValueError:
+                pass
+            else:
+                seg_lo = max(filter(None, (lo, _ts_param(at, -AUDIT_ID_SKEW_S))))
+                seg_hi = min(filter(None, (hi, _ts_param(at, AUDIT_ID_SKEW_S))))
+
+        out: List[Dict[str, Any]] = []
+        if order == "desc":
+            pos = base + end if cursor is None else cursor
+            if pos > base:
+                items, nxt = self._query_active(want, matches, lo, hi, limit, pos - base, order, end)
+                out += items
+                if nxt is not None:
+                    return out, base + nxt
+                pos = base
+            for seg in reversed(segments):
+                if seg.start >= pos or not seg.may_match(seg_lo, seg_hi, national_id):
+                    continue
+                items, nxt = self._query_segment(seg, needles, matches, seg_lo, seg_hi, limit - len(out), pos - seg.start, True)
+                out += items
+                if nxt is not None:
+                    return out, seg.start + nxt
+            return out, None
+
+        pos = cursor or 0
+        for seg in segments:
+            if seg.end <= pos or not seg.may_match(seg_lo, seg_hi, national_id):
+                continue
+            items, nxt = self._query_segment(
+                seg, needles, matches, seg_lo, seg_hi, limit - len(out), max(pos - seg.start, 0), False
+            )
+            out += items
+            if nxt is not None:
+                return out, seg.start + nxt
+        items, nxt = self._query_active(want, matches, lo, hi, limit - len(out), max(pos - base, 0), order, end)
+        out += items
+        return out, None if nxt is None else base + nxt
+
+    def _query_active(self, want, matches, lo, hi, limit, cursor, order, end):
+        """Truy vấn file đang ghi qua index; cursor = offset trong file."""
+        if not end:
+            return [], None
+        with open(self.log_path, "rb") as f:
+            if cursor:
+                # cursor phải nằm ở đầu 1 dòng đã index
+                f.seek(cursor - 1)
+                if cursor > end or f.read(1) != b"\n":
+                    raise ValueError(f"Invalid cursor: {cursor}")
+            for field, prefix in _KEY_FIELDS:
+                if field in want:
+                    return self._query_postings(f, prefix + want[field], matches, lo, hi, limit, cursor, order, end)
+            return self._query_scan(f, matches, lo, hi, limit, cursor, order, end)
+
+    def _query_segment(self, seg, needles, matches, lo, hi, limit, cursor, desc):
+        """Quét 1 segment đã đóng (chỉ giải nén block giao [lo, hi]); cursor = offset trong segment."""
+        out: List[Dict[str, Any]] = []
+        with open(seg.path, "rb") as f:
+            if seg.sealed:
+                lines = segment_lines_reversed(seg, f, cursor, lo, hi) if desc else segment_lines(seg, f, cursor, lo, hi)
+            else:
+                lines = _reverse_lines(f, cursor) if desc else _forward_lines(f, cursor, seg.size)
+            for off, line in lines:
+                if not all(n in line for n in needles):
+                    continue
+                rec = json.loads(line)
+                if matches(rec):
+                    out.append(rec)
+                    if len(out) == limit:
+                        return out, off if desc else off + len(line) + 1
+        return out, None
+
+    def _query_postings(self, f, key, matches, lo, hi, limit, cursor, order, end):
+        desc = order == "desc"
+        bound = cursor if cursor is not None else (end if desc else 0)
+        sql = "SELECT offset FROM postings WHERE key = ? AND offset " + ("< ?" if desc else ">= ? AND offset < ?")
+        params_tail: List[Any] = []
+        if lo:
+            sql += " AND ts >= ?"
+            params_tail.append(lo)
+        if hi:
+            sql += " AND ts <= ?"
+            params_tail.append(hi)
+        sql += " ORDER BY offset " + ("DESC" if desc else "ASC") + " LIMIT ?"
+        page = max(limit * 2, 64)
+        out: List[Dict[str, Any]] = []
+        conn = self._conn()
+        while True:
+            params = [key, bound] + ([] if desc else [end]) + params_tail + [page]
+            offsets = [row[0] for row in conn.execute(sql, params)]
+            for off in offsets:
+                line = _read_line(f, off)
+                rec = json.loads(line)
+                if matches(rec):
+                    out.append(rec)
+                    if len(out) == limit:
+                        return out, off if desc else off + len(line) + 1
+            if len(offsets) < page:
+                return out, None
+            bound = offsets[-1] if desc else offsets[-1] + 1
+
+    def _query_scan(self, f, matches, lo, hi, limit, cursor, order, end):
+        conn = self._conn()
+        out: List[Dict[str, Any]] = []
+        if order == "desc":
+            stop = cursor if cursor is not None else end
+            if hi:
+                # bắt đầu từ cuối block cuối cùng còn bản ghi <= until
+                row = conn.execute(
+                    "SELECT start FROM blocks WHERE start < ? AND ts_min <= ? ORDER BY start DESC LIMIT 1",
+                    (stop, hi),
+                ).fetchone()
+                if row is None:
+                    return [], None
+                nxt = conn.execute("SELECT MIN(start) FROM blocks WHERE start > ?", (row[0],)).fetchone()[0]
+                stop = min(stop, nxt if nxt is not None else end)
+            floor = _ts_param(datetime.fromisoformat(lo), -AUDIT_TS_SKEW_S) if lo else None
+            for off, line in _reverse_lines(f, stop):
+                rec = json.loads(line)
+                if floor and rec.get("timestamp", "") < floor:
+                    break
+                if matches(rec):
+                    out.append(rec)
+                    if len(out) == limit:
+                        return out, off
+            return out, None
+
+        start = cursor if cursor is not None else 0
+        if lo:
+            # bỏ qua các block toàn bản ghi < since
+            row = conn.execute("SELECT MIN(start) FROM blocks WHERE ts_max >= ?", (lo,)).fetchone()
+            if row[0] is None:
+                return [], None
+            start = max(start, row[0])
+        ceiling = _ts_param(datetime.fromisoformat(hi), AUDIT_TS_SKEW_S) if hi else None
+        for off, line in _forward_lines(f, start, end):
+            rec = json.loads(line)
+            if ceiling and rec.get("timestamp", "") > ceiling:
+                break
+            if matches(rec):
+                out.append(rec)
+                if len(out) == limit:
+                    return out, off + len(line) + 1
+        return out, None
@@ -0,0 +1,418 @@
+"""
+Audit ledger append-only cho PB-025 (JSONL, hash chain).
+
+Request chỉ đẩy bản ghi vào queue có giới hạn (không I/O); 1 thread nền gom
+cả lô đang chờ, ghi 1 lần và fsync 1 lần cho cả lô (group commit).
+Queue đầy → backpressure: append chờ tối đa AUDIT_APPEND_TIMEOUT_S rồi ném
+AuditUnavailable (API trả 503) – không bao giờ bỏ bản ghi.
+
+Mỗi dòng:  {...bản ghi, sort_keys...,"hash":"<sha256 64 hex>"}
+           hash_i = sha256(hash_{i-1} + <dòng i bỏ phần ,"hash":...>)
+           hash_0 trước bản ghi đầu = "0" * 64
+
+Kiểm tra toàn vẹn (verify) chỉ cần băm lại từng dòng, không parse JSON.
+Nhiều uvicorn worker ghi cùng file: mỗi lô ghi giữ flock, đọc lại hash cuối
+file nếu worker khác vừa ghi → chuỗi hash vẫn liền mạch.
+
+File đang ghi đủ AUDIT_SEGMENT_BYTES hoặc cũ hơn AUDIT_SEGMENT_SECONDS thì
+được đóng thành segment và nén nền (xem audit_segments.py); chuỗi hash nối
+tiếp sang file mới.
+"""
+
+import atexit
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: không khoá giữa các process
+    fcntl = None
+
+from audit_segments import (
+    AUDIT_SEGMENT_BYTES,
+    AUDIT_SEGMENT_SECONDS,
+    closed_path,
+    list_segments,
+    seal_pending,
+    seal_segment,
+)
+
+AUDIT_LOG_PATH = os.getenv("AUDIT_LOG_PATH", os.path.join("data", "audit_log.jsonl"))
+AUDIT_QUEUE_MAX = int(os.getenv("AUDIT_QUEUE_MAX", "100000"))
+AUDIT_BATCH_MAX = int(os.getenv("AUDIT_BATCH_MAX", "4096"))
+AUDIT_FSYNC = os.getenv("AUDIT_FSYNC", "1") == "1"
+AUDIT_APPEND_TIMEOUT_S = float(os.getenv("AUDIT_APPEND_TIMEOUT_S", "2.0"))
+
+GENESIS_HASH = "0" * 64
+_HASH_SUFFIX = len(',"hash":"') + 64 + len('"}')
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def _encode(record: Dict[str, Any]) -> bytes:
+    return json.dumps(record, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=_default).encode()
+
+
+def chain_line(prev_hash: str, body: bytes) -> bytes:
+    """body = JSON bản ghi (không có hash) → dòng hoàn chỉnh có hash (chưa có \\n)."""
+    digest = hashlib.sha256(prev_hash.encode() + body).hexdigest()
+    return body[:-1] + b',"hash":"' + digest.encode() + b'"}'
+
+
+def line_hash(line: bytes) -> str:
+    return line[-_HASH_SUFFIX + len(',"hash":"'):-2].decode()
+
+
+def line_body(line: bytes) -> bytes:
+    return line[:-_HASH_SUFFIX] + b"}"
+
+
+def _read_last_line(f) -> Optional[bytes]:
+    """Dòng cuối của file (đọc ngược từ cuối, không đọc cả file)."""
+    end = f.seek(0, os.SEEK_END)
+    if end == 0:
+        return None
+    block = 4096
+    pos = end
+    buf = b""
+    while pos > 0:
+        step = min(block, pos)
+        pos -= step
+        f.seek(pos)
+        buf = f.read(step) + buf
+        lines = buf.rstrip(b"\n").split(b"\n")
+        if len(lines) > 1 or pos == 0:
+            return lines[-1] or None
+    return None
+
+
+class AuditUnavailable(RuntimeError):
+    """Queue audit đầy quá thời gian chờ – request phải thất bại thay vì mất bản ghi."""
+
+
+class AuditLedger:
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        queue_max: int = AUDIT_QUEUE_MAX,
+        batch_max: int = AUDIT_BATCH_MAX,
+        fsync: bool = AUDIT_FSYNC,
+        segment_bytes: int = AUDIT_SEGMENT_BYTES,
+        segment_seconds: float = AUDIT_SEGMENT_SECONDS,
+        append_timeout: float = AUDIT_APPEND_TIMEOUT_S,
+    ):
+        self.path = path or AUDIT_LOG_PATH
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.batch_max = batch_max
+        self.fsync = fsync
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self.queue_max = max(1, int(queue_max))
+        self.append_timeout = append_timeout
+        self._queue: deque = deque()
+        self._cond = threading.Condition()
+        self._pending = 0  # đã append nhưng chưa ghi xong (cho flush)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        # trạng thái cuối file mà process này biết (kiểm tra lại mỗi lô)
+        self._size = -1
+        self._ino = -1
+        self._last_hash = GENESIS_HASH
+        self._last_seq = 0
+        self._head: Optional[Dict[str, Any]] = None  # bản ghi đầu của file đang ghi
+        self.written = 0
+        self.batches = 0
+        self.rotations = 0
+        self.rejected = 0
+        self.errors = 0
+
+    # ---- phía request ----
+
+    def append(self, action: str, **fields: Any) -> None:
+        """Đưa 1 bản ghi vào hàng đợi (không I/O).
+
+        Queue đầy (writer không theo kịp / đĩa treo) → chờ tối đa append_timeout
+        giây cho writer giải phóng chỗ, quá hạn thì ném AuditUnavailable. Gọi từ
+        threadpool / thread nền; trên event loop dùng append_nowait."""
+        self._put(action, fields, self.append_timeout)
+
+    def append_nowait(self, action: str, **fields: Any) -> None:
+        """Như append nhưng không chờ: queue đầy → AuditUnavailable ngay (an toàn trên event loop)."""
+        self._put(action, fields, 0.0)
+
+    def _put(self, action: str, fields: Dict[str, Any], timeout: float) -> None:
+        record = {"timestamp": datetime.utcnow().isoformat(timespec="microseconds"), "action": action}
+        record.update(fields)
+        with self._cond:
+            if len(self._queue) >= self.queue_max:
+                deadline = time.monotonic() + timeout
+                while len(self._queue) >= self.queue_max:
+                    left = deadline - time.monotonic()
+                    if left <= 0:
+                        self.rejected += 1
+                        if self.rejected == 1 or self.rejected % 1000 == 0:
+                            print(f"[AUDIT] Queue full ({self.queue_max}), rejected {self.rejected} requests so far")
+                        raise AuditUnavailable(f"audit queue full ({self.queue_max})")
+                    self._cond.wait(left)
+            self._queue.append(record)
+            self._pending += 1
+            self._cond.notify_all()
+
+    # ---- phía writer ----
+
+    def _open_active(self):
+        """Mở + flock file đang ghi; mở lại nếu process khác vừa xoay segment."""
+        while True:
+            f = open(self.path, "a+b")
+            if fcntl is None:
+                return f
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                if os.stat(self.path).st_ino == os.fstat(f.fileno()).st_ino:
+                    return f
+            except FileNotFoundError:
+                pass
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            f.close()
+
+    def _previous_tail(self) -> None:
+        """File đang ghi còn trống → nối chuỗi hash từ cuối segment trước."""
+        segments = list_segments(self.path)
+        self._last_hash, self._last_seq = GENESIS_HASH, 0
+        if not segments:
+            return
+        seg = segments[-1]
+        if seg.sealed:
+            self._last_hash, self._last_seq = seg.footer["last_hash"], int(seg.footer["last_seq"])
+            return
+        with open(seg.path, "rb") as raw:
+            last = _read_last_line(raw)
+        if last is not None:
+            self._last_hash = line_hash(last)
+            self._last_seq = int(json.loads(line_body(last))["seq"])
+
+    def _sync_tail(self, f) -> None:
+        st = os.fstat(f.fileno())
+        if st.st_size == self._size and st.st_ino == self._ino:
+            return
+        if st.st_ino != self._ino:
+            self._head = None
+        last = _read_last_line(f)
+        if last is None:
+            self._previous_tail()
+        else:
+            self._last_hash = line_hash(last)
+            self._last_seq = int(json.loads(line_body(last))["seq"])
+        self._size, self._ino = st.st_size, st.st_ino
+
+    def _should_rotate(self, f) -> bool:
+        if self._size >= self.segment_bytes:
+            return True
+        if self.segment_seconds <= 0 or self._size <= 0:
+            return False
+        if self._head is None:
+            f.seek(0)
+            self._head = json.loads(line_body(f.readline().rstrip(b"\n")))
+        first_ts = datetime.fromisoformat(self._head["timestamp"])
+        return datetime.utcnow() - first_ts >= timedelta(seconds=self.segment_seconds)
+
+    def _rotate(self, f) -> int:
+        """Đóng file đang ghi thành segment (đang giữ flock); trả về first_seq của segment."""
+        if self._head is None:
+            f.seek(0)
+            self._head = json.loads(line_body(f.readline().rstrip(b"\n")))
+        first_seq = int(self._head["seq"])
+        os.rename(self.path, closed_path(self.path, first_seq))
+        self._size, self._ino, self._head = -1, -1, None
+        self.rotations += 1
+        return first_seq
+
+    def _seal(self, first_seq: int) -> None:
+        try:
+            seal_segment(self.path, first_seq)
+        except FileNotFoundError:
+            pass  # process khác đã niêm phong
+        except Exception as e:
+            print(f"[AUDIT] Failed to seal segment {first_seq}: {e}")
+
+    def _write_batch(self, batch: List[Dict[str, Any]]) -> None:
+        rotated = None
+        with self._open_active() as f:
+            try:
+                self._sync_tail(f)
+                prev, seq = self._last_hash, self._last_seq
+                out = []
+                for record in batch:
+                    seq += 1
+                    record["seq"] = seq
+                    line = chain_line(prev, _encode(record))
+                    prev = line_hash(line)
+                    out.append(line)
+                data = b"\n".join(out) + b"\n"
+                f.seek(0, os.SEEK_END)
+                f.write(data)
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())  # 1 fsync cho cả lô
+                self._last_hash, self._last_seq = prev, seq
+                self._size = os.fstat(f.fileno()).st_size
+                if self._should_rotate(f):
+                    rotated = self._rotate(f)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        if rotated is not None:
+            # nén ngoài flock, ở thread riêng → không chặn các lô ghi tiếp theo
+            threading.Thread(target=self._seal, args=(rotated,), name="audit-seal", daemon=True).start()
+
+    def _drain(self) -> List[Optional[Dict[str, Any]]]:
+        """Chờ có bản ghi rồi lấy cả lô đang chờ (tối đa batch_max)."""
+        with self._cond:
+            while not self._queue:
+                self._cond.wait()
+            take = min(len(self._queue), self.batch_max)
+            batch = [self._queue.popleft() for _ in range(take)]
+            self._cond.notify_all()  # đánh thức append đang chờ chỗ trống
+            return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._drain()
+            stop = any(r is None for r in batch)
+            records = [r for r in batch if r is not None]
+            if records:
+                try:
+                    self._write_batch(records)
+                    self.written += len(records)
+                    self.batches += 1
+                except Exception as e:
+                    self.errors += 1
+                    print(f"[AUDIT] Failed to write {len(records)} records: {e}")
+                    self._size = -1  # đọc lại đuôi file ở lô sau
+            with self._cond:
+                self._pending -= len(batch)
+                self._cond.notify_all()
+            if stop:
+                return
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+            self._thread.start()
+        # segment đã đóng nhưng chưa kịp nén (process trước bị dừng giữa chừng)
+        threading.Thread(target=seal_pending, args=(self.path,), name="audit-seal", daemon=True).start()
+        atexit.register(self.close)
+
+    def flush(self) -> None:
+        """Chờ mọi bản ghi đã append được ghi xuống file."""
+        with self._cond:
+            while self._pending > 0 and self._thread is not None:
+                self._cond.wait(0.1)
+
+    def close(self) -> None:
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            with self._cond:
+                self._queue.append(None)  # vượt giới hạn: tín hiệu dừng không được bỏ
+                self._pending += 1
+                self._cond.notify_all()
+            thread.join()
+
+    def healthy(self) -> bool:
+        """False khi đã có request bị từ chối / lô ghi lỗi, hoặc queue đang đầy."""
+        return not self.rejected and not self.errors and len(self._queue) < self.queue_max
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": len(self._queue),
+            "queue_max": self.queue_max,
+            "written": self.written,
+            "batches": self.batches,
+            "mean_batch": round(self.written / self.batches, 1) if self.batches else 0.0,
+            "rejected": self.rejected,
+            "rotations": self.rotations,
+            "errors": self.errors,
+        }
+
+
+def verify(path: Optional[str] = None, full: bool = True) -> Dict[str, Any]:
+    """Kiểm tra chuỗi hash qua mọi segment rồi file đang ghi; dừng ở dòng hỏng đầu tiên.
+
+    Mặc định (full) băm lại mọi dòng và đối chiếu với footer của từng segment.
+    full=False (incremental, nhanh): segment đã niêm phong không băm lại – chỉ
+    kiểm tra dòng đầu nối đúng hash cuối segment trước và seq liền mạch, rồi
+    lấy `last_hash` trong footer làm mắt xích tiếp theo. Sửa 1 dòng giữa
+    segment sẽ không bị phát hiện, nên kết quả ghi "partial": true và số
+    segment được tin (`trusted_segments`)."""
+    path = path or AUDIT_LOG_PATH
+    t0 = time.perf_counter()
+    prev = GENESIS_HASH
+    prev_seq: Optional[int] = None
+    n = 0
+    trusted = 0
+
+    def bad(line_no: int, source: str, reason: str) -> Dict[str, Any]:
+        return {
+            "ok": False,
+            "records": line_no - 1,
+            "first_bad_line": line_no,
+            "file": os.path.basename(source),
+            "reason": reason,
+            "seconds": round(time.perf_counter() - t0, 3),
+        }
+
+    sources = [(seg.path, seg.footer) for seg in list_segments(path)]
+    if os.path.exists(path):
+        sources.append((path, None))
+    for source, footer in sources:
+        sealed = footer is not None
+        with (gzip.open(source, "rb") if sealed else open(source, "rb")) as f:
+            if sealed and not full:
+                if not footer["records"]:
+                    continue
+                line = f.readline().rstrip(b"\n")
+                if prev_seq is not None and footer["first_seq"] != prev_seq + 1:
+                    return bad(n + 1, source, "seq gap")
+                if len(line) <= _HASH_SUFFIX or hashlib.sha256(prev.encode() + line_body(line)).hexdigest() != line_hash(line):
+                    return bad(n + 1, source, "hash")
+                n += footer["records"]
+                prev, prev_seq = footer["last_hash"], footer["last_seq"]
+                trusted += 1
+                continue
+            for line in f:
+                line = line.rstrip(b"\n")
+                if not line:
+                    continue
+                n += 1
+                if len(line) <= _HASH_SUFFIX or hashlib.sha256(prev.encode() + line_body(line)).hexdigest() != line_hash(line):
+                    return bad(n, source, "hash")
+                prev = line_hash(line)
+        if sealed and footer["records"]:
+            if prev != footer["last_hash"]:
+                return bad(n, source, "footer")
+        prev_seq = footer["last_seq"] if sealed else None
+    return {
+        "ok": True,
+        "records": n,
+        "segments": len(sources),
+        "trusted_segments": trusted,
+        "partial": trusted > 0,
+        "last_hash": prev,
+        "seconds": round(time.perf_counter() - t0, 3),
+    }
@@ -0,0 +1,339 @@
+"""
+Chia audit ledger thành segment (xoay vòng theo dung lượng / thời gian).
+
+    audit_log.jsonl                    segment đang ghi
+    audit_log.<first_seq>.jsonl        segment đã đóng, chờ nén (tạm thời)
+    audit_log.<first_seq>.jsonl.gz     segment đã niêm phong: chuỗi gzip member
+                                       độc lập, mỗi member ~256KB dữ liệu
+    audit_log.<first_seq>.footer.json  footer: seq / timestamp min-max, hash
+                                       cuối, bảng block, bloom filter national_id
+
+File .gz vẫn là gzip hợp lệ (zcat đọc được cả segment); bảng block trong
+footer cho phép giải nén riêng từng block. Hash chain chạy liên tục qua các
+segment nên verify chỉ cần đọc tuần tự. Truy vấn dùng footer để bỏ qua
+segment không thể khớp (ngoài khoảng thời gian, bloom không chứa
+national_id) và chỉ giải nén các block cần.
+
+Offset "logic" của 1 dòng = tổng kích thước (chưa nén) các segment trước nó
++ offset trong segment → cursor phân trang (audit_index.py) vẫn là 1 số
+nguyên, không đổi khi segment được nén.
+"""
+
+import base64
+import gzip
+import hashlib
+import json
+import math
+import os
+import re
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: không khoá giữa các process
+    fcntl = None
+
+AUDIT_SEGMENT_BYTES = int(os.getenv("AUDIT_SEGMENT_BYTES", str(64 * 1024 * 1024)))
+AUDIT_SEGMENT_SECONDS = float(os.getenv("AUDIT_SEGMENT_SECONDS", "86400"))  # 0 = chỉ theo dung lượng
+AUDIT_SEGMENT_BLOCK = int(os.getenv("AUDIT_SEGMENT_BLOCK", str(256 * 1024)))
+AUDIT_BLOOM_FP = float(os.getenv("AUDIT_BLOOM_FP", "0.01"))
+
+
+class BloomFilter:
+    """Bloom filter (double hashing trên blake2b) – không có false negative."""
+
+    def __init__(self, bits: int, hashes: int, data: Optional[bytes] = None):
+        self.bits = max(8, bits)
+        self.hashes = max(1, hashes)
+        self.data = bytearray(data) if data is not None else bytearray((self.bits + 7) // 8)
+
+    @classmethod
+    def for_capacity(cls, n: int, fp: float = AUDIT_BLOOM_FP) -> "BloomFilter":
+        n = max(1, n)
+        bits = int(math.ceil(-n * math.log(fp) / math.log(2) ** 2))
+        return cls(bits, round(bits / n * math.log(2)))
+
+    def _positions(self, value: str) -> Iterator[int]:
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.bits
+
+    def add(self, value: str) -> None:
+        for p in self._positions(value):
+            self.data[p >> 3] |= 1 << (p & 7)
+
+    def __contains__(self, value: str) -> bool:
+        return all(self.data[p >> 3] & (1 << (p & 7)) for p in self._positions(value))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"bits": self.bits, "hashes": self.hashes, "data": base64.b64encode(bytes(self.data)).decode()}
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "BloomFilter":
+        return cls(d["bits"], d["hashes"], base64.b64decode(d["data"]))
+
+
+# ---- tên file ----
+
+def _split(log_path: str) -> Tuple[str, str]:
+    root, ext = os.path.splitext(log_path)
+    return root, ext or ".jsonl"
+
+
+def closed_path(log_path: str, first_seq: int) -> str:
+    root, ext = _split(log_path)
+    return f"{root}.{first_seq:012d}{ext}"
+
+
+def footer_path(log_path: str, first_seq: int) -> str:
+    root, _ = _split(log_path)
+    return f"{root}.{first_seq:012d}.footer.json"
+
+
+class Segment:
+    """1 segment đã đóng; footer = None nếu chưa niêm phong (còn file .jsonl)."""
+
+    __slots__ = ("first_seq", "path", "footer", "size", "start", "_bloom")
+
+    def __init__(self, first_seq: int, path: str, footer: Optional[Dict[str, Any]], size: int):
+        self.first_seq = first_seq
+        self.path = path
+        self.footer = footer
+        self.size = size
+        self.start = 0
+        self._bloom: Optional[BloomFilter] = None
+
+    @property
+    def end(self) -> int:
+        return self.start + self.size
+
+    @property
+    def sealed(self) -> bool:
+        return self.footer is not None
+
+    def may_match(self, lo: Optional[str], hi: Optional[str], national_id: Optional[str]) -> bool:
+        """False = chắc chắn không có bản ghi khớp (chỉ kết luận được khi đã niêm phong)."""
+        if self.footer is None:
+            return True
+        if (lo and self.footer["ts_max"] < lo) or (hi and self.footer["ts_min"] > hi):
+            return False
+        if national_id is not None:
+            if self._bloom is None:
+                self._bloom = BloomFilter.from_dict(self.footer["bloom"])
+            return national_id in self._bloom
+        return True
+
+    def read_block(self, f, i: int) -> bytes:
+        blocks = self.footer["blocks"]
+        gz_start = blocks[i][1]
+        gz_end = blocks[i + 1][1] if i + 1 < len(blocks) else self.footer["gz_size"]
+        f.seek(gz_start)
+        return gzip.decompress(f.read(gz_end - gz_start))
+
+
+def _read_footer(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, "rb") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def list_segments(log_path: str, cache: Optional[Dict[str, Dict[str, Any]]] = None) -> List[Segment]:
+    """Các segment đã đóng theo thứ tự seq, kèm offset logic `start`.
+
+    `cache` (path footer -> footer) tránh đọc lại footer – footer không đổi sau khi ghi."""
+    root, ext = _split(log_path)
+    directory = os.path.dirname(root) or "."
+    pattern = re.compile(re.escape(os.path.basename(root)) + r"\.(\d{12})(" + re.escape(ext) + r"(?:\.gz)?|\.footer\.json)$")
+    found: Dict[int, Dict[str, str]] = {}
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    for name in names:
+        m = pattern.match(name)
+        if m:
+            found.setdefault(int(m.group(1)), {})[m.group(2)] = os.path.join(directory, name)
+
+    segments: List[Segment] = []
+    offset = 0
+    for first_seq in sorted(found):
+        files = found[first_seq]
+        footer = None
+        if ".footer.json" in files and ext + ".gz" in files:
+            fpath = files[".footer.json"]
+            footer = cache.get(fpath) if cache is not None else None
+            if footer is None:
+                footer = _read_footer(fpath)
+                if footer is not None and cache is not None:
+                    cache[fpath] = footer
+        if footer is not None:
+            seg = Segment(first_seq, files[ext + ".gz"], footer, footer["raw_size"])
+        elif ext in files:
+            try:
+                seg = Segment(first_seq, files[ext], None, os.path.getsize(files[ext]))
+            except FileNotFoundError:  # vừa niêm phong xong giữa chừng → liệt kê lại
+                return list_segments(log_path, cache)
+        else:
+            continue  # .gz dở dang của lần niêm phong bị ngắt – bỏ qua
+        seg.start = offset
+        offset += seg.size
+        segments.append(seg)
+    return segments
+
+
+# ---- niêm phong ----
+
+def seal_segment(log_path: str, first_seq: int) -> Optional[Dict[str, Any]]:
+    """Nén segment đã đóng thành .jsonl.gz (block gzip độc lập) + footer, xoá file gốc.
+
+    Trả về footer; None nếu process khác đang niêm phong segment này."""
+    raw_path = closed_path(log_path, first_seq)
+    gz_path = raw_path + ".gz"
+    fpath = footer_path(log_path, first_seq)
+    with open(raw_path, "rb") as src:
+        if fcntl is not None:
+            try:
+                fcntl.flock(src.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return None
+        if os.path.exists(fpath):  # process khác vừa niêm phong xong
+            os.remove(raw_path)
+            return _read_footer(fpath)
+
+        blocks: List[List[Any]] = []
+        national_ids = set()
+        ts_min = ts_max = None
+        first = last = None
+        records = 0
+        raw_size = 0
+
+        with open(gz_path + ".tmp", "wb") as out:
+            pending: List[bytes] = []
+            pending_size = 0
+            block_ts: List[Optional[str]] = [None, None]
+
+            def flush_block() -> None:
+                nonlocal pending, pending_size, raw_size
+                blocks.append([raw_size, out.tell(), block_ts[0], block_ts[1]])
+                out.write(gzip.compress(b"".join(pending), compresslevel=6, mtime=0))
+                raw_size += pending_size
+                pending, pending_size = [], 0
+                block_ts[0] = block_ts[1] = None
+
+            for line in src:
+                rec = json.loads(line)
+                ts = rec.get("timestamp", "")
+                if block_ts[0] is None or ts < block_ts[0]:
+                    block_ts[0] = ts
+                if block_ts[1] is None or ts > block_ts[1]:
+                    block_ts[1] = ts
+                if rec.get("national_id"):
+                    national_ids.add(str(rec["national_id"]))
+                if first is None:
+                    first = rec
+                last = line
+                records += 1
+                pending.append(line)
+                pending_size += len(line)
+                if pending_size >= AUDIT_SEGMENT_BLOCK:
+                    flush_block()
+            if pending:
+                flush_block()
+            out.flush()
+            os.fsync(out.fileno())
+            gz_size = out.tell()
+
+        for b in blocks:
+            ts_min = b[2] if ts_min is None or b[2] < ts_min else ts_min
+            ts_max = b[3] if ts_max is None or b[3] > ts_max else ts_max
+        bloom = BloomFilter.for_capacity(len(national_ids))
+        for nid in national_ids:
+            bloom.add(nid)
+        last_line = last.rstrip(b"\n") if last else b""
+        footer = {
+            "first_seq": first.get("seq", first_seq) if first else first_seq,
+            "last_seq": json.loads(last_line).get("seq") if last_line else first_seq - 1,
+            "records": records,
+            "ts_min": ts_min or "",
+            "ts_max": ts_max or "",
+            "last_hash": last_line[-66:-2].decode() if last_line else None,
+            "raw_size": raw_size,
+            "gz_size": gz_size,
+            "blocks": blocks,
+            "bloom": bloom.to_dict(),
+        }
+        with open(fpath + ".tmp", "w", encoding="utf-8") as out:
+            json.dump(footer, out, separators=(",", ":"))
+            out.flush()
+            os.fsync(out.fileno())
+        # thứ tự: .gz rồi footer (footer tồn tại = segment đã niêm phong) rồi xoá file gốc
+        os.replace(gz_path + ".tmp", gz_path)
+        os.replace(fpath + ".tmp", fpath)
+        os.remove(raw_path)
+    print(
+        f"[AUDIT] Sealed segment {first_seq}: {records} records, "
+        f"{raw_size / 1e6:.1f}MB -> {gz_size / 1e6:.1f}MB, {len(blocks)} blocks"
+    )
+    return footer
+
+
+def seal_pending(log_path: str) -> int:
+    """Niêm phong mọi segment đã đóng còn dạng .jsonl (vd. sau khi process bị dừng giữa chừng)."""
+    n = 0
+    for seg in list_segments(log_path):
+        if not seg.sealed:
+            try:
+                if seal_segment(log_path, seg.first_seq) is not None:
+                    n += 1
+            except FileNotFoundError:
+                pass  # process khác đã niêm phong xong
+    return n
+
+
+# ---- đọc ----
+
+def _outside(b: List[Any], lo: Optional[str], hi: Optional[str]) -> bool:
+    return bool((lo and b[3] < lo) or (hi and b[2] > hi))
+
+
+def segment_lines(
+    seg: Segment, f, start: int = 0, lo: Optional[str] = None, hi: Optional[str] = None
+) -> Iterator[Tuple[int, bytes]]:
+    """(offset trong segment, dòng) từ `start` tới hết segment đã niêm phong;
+    bỏ qua (không giải nén) block nằm ngoài [lo, hi]."""
+    blocks = seg.footer["blocks"]
+    for i, b in enumerate(blocks):
+        block_end = blocks[i + 1][0] if i + 1 < len(blocks) else seg.size
+        if block_end <= start or _outside(b, lo, hi):
+            continue
+        data = seg.read_block(f, i)
+        off = b[0]
+        for line in data.split(b"\n")[:-1]:
+            if off >= start:
+                yield off, line
+            off += len(line) + 1
+
+
+def segment_lines_reversed(
+    seg: Segment, f, end: int, lo: Optional[str] = None, hi: Optional[str] = None
+) -> Iterator[Tuple[int, bytes]]:
+    """(offset trong segment, dòng) từ trước `end` lùi về đầu segment đã niêm phong."""
+    blocks = seg.footer["blocks"]
+    for i in range(len(blocks) - 1, -1, -1):
+        b = blocks[i]
+        if b[0] >= end or _outside(b, lo, hi):
+            continue
+        data = seg.read_block(f, i)
+        lines = data.split(b"\n")[:-1]
+        offsets = []
+        off = b[0]
+        for line in lines:
+            offsets.append(off)
+            off += len(line) + 1
+        for off, line in zip(reversed(offsets), reversed(lines)):
+            if off < end:
+                yield off, line
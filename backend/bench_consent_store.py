@@ -0,0 +1,105 @@
+# backend/bench_consent_store.py
+"""
+Benchmark ConsentStore (SQLite WAL) ở quy mô lớn (mặc định 10M consent).
+
+    python bench_consent_store.py                     # 10M consent, DB tạm
+    python bench_consent_store.py --n 1000000 --db data/bench_consents.db
+
+Nạp N consent (executemany theo lô), rồi đo latency grant / revoke / latest /
+history trên các national_id ngẫu nhiên. Kết quả in ra dạng JSON.
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from consent_store import ConsentStore
+
+
+def consent_row(i: int, n_citizens: int, base: datetime) -> dict:
+    granted = base + timedelta(seconds=i)
+    return {
+        "consent_id": f"CON-BENCH-{i:010d}",
+        "national_id": f"{i % n_citizens:012d}",
+        "bank_code": ("VCB", "BIDV", "TCB", "MB")[i % 4],
+        "scope_credit_history": True,
+        "scope_utility": i % 2 == 0,
+        "scope_income": i % 3 == 0,
+        "status": "active",
+        "granted_at": granted,
+        "valid_until": granted + timedelta(days=30),
+    }
+
+
+def timed(fn, args_list):
+    lat = []
+    for args in args_list:
+        t0 = time.perf_counter()
+        fn(*args)
+        lat.append(time.perf_counter() - t0)
+    lat.sort()
+    return {
+        "ops": len(lat),
+        "p50_us": round(lat[len(lat) // 2] * 1e6, 1),
+        "p99_us": round(lat[int(len(lat) * 0.99)] * 1e6, 1),
+        "ops_per_s": round(len(lat) / sum(lat)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark consent store")
+    parser.add_argument("--n", type=int, default=10_000_000, help="số consent nạp sẵn")
+    parser.add_argument("--citizens", type=int, default=0, help="số national_id (mặc định n/3)")
+    parser.add_argument("--ops", type=int, default=20_000, help="số thao tác đo mỗi loại")
+    parser.add_argument("--batch", type=int, default=100_000, help="kích thước lô khi nạp")
+    parser.add_argument("--db", default="", help="file SQLite (mặc định: file tạm, xoá sau khi chạy)")
+    args = parser.parse_args()
+
+    n_citizens = args.citizens or max(1, args.n // 3)
+    tmp_dir = None
+    db_path = args.db
+    if not db_path:
+        tmp_dir = tempfile.mkdtemp(prefix="pb025_bench_")
+        db_path = os.path.join(tmp_dir, "consents.db")
+
+    store = ConsentStore(db_path)
+    base = datetime(2025, 1, 1)
+    start = store.count()
+
+    t0 = time.perf_counter()
+    for lo in range(start, args.n, args.batch):
+        hi = min(lo + args.batch, args.n)
+        store.grant_many(consent_row(i, n_citizens, base) for i in range(lo, hi))
+    load_s = time.perf_counter() - t0
+
+    rng = random.Random(0)
+    total = store.count()
+    citizens = [(f"{rng.randrange(n_citizens):012d}",) for _ in range(args.ops)]
+    consent_ids = [(f"CON-BENCH-{rng.randrange(total):010d}",) for _ in range(args.ops)]
+    new_rows = [(consent_row(total + i, n_citizens, base),) for i in range(args.ops)]
+
+    report = {
+        "consents": total,
+        "citizens": n_citizens,
+        "load_seconds": round(load_s, 1),
+        "load_rows_per_s": round((total - start) / load_s) if total > start else None,
+        "grant": timed(store.grant, new_rows),
+        "revoke": timed(store.revoke, consent_ids),
+        "latest": timed(store.latest, citizens),
+        "history": timed(store.history, citizens),
+        "db_bytes": os.path.getsize(db_path),
+    }
+    print(json.dumps(report, indent=2))
+
+    if tmp_dir:
+        for name in os.listdir(tmp_dir):
+            os.remove(os.path.join(tmp_dir, name))
+        os.rmdir(tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
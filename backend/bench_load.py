@@ -0,0 +1,335 @@
+# backend/bench_load.py
+"""
+Load test cho main:app và pb025_api:app, qua 2 đường:
+
+- asgi    : httpx.ASGITransport, gọi app ngay trong process (không socket) →
+            số đo ổn định, hợp để so release này với release trước.
+- uvicorn : `uvicorn <module>:app` chạy subprocess, client httpx keep-alive.
+
+    python bench_load.py                                   # cả 2 app, cả 2 đường, concurrency 1,8,32
+    python bench_load.py --app main --transport asgi --concurrency 16 --duration 20
+    python bench_load.py --mix score=80,dashboard=20 --out load.json
+    python bench_load.py --baseline load.json --max-regression 0.15   # exit 1 nếu chậm đi
+
+Request mix theo trọng số (--mix) giữa score, consent_grant, consent_revoke,
+complaint, dashboard; op app không có (pb025_api chỉ có score / dashboard) bị
+bỏ và ghi vào "skipped_ops". Mỗi lượt chạy báo req/s và p50/p95/p99/p999
+(ms) tổng + theo từng op, in ra dạng JSON (stdout còn lẫn log lúc import app,
+dùng --out để có file JSON sạch).
+
+--baseline: so p99 và req/s của op score với file kết quả cũ theo từng
+(app, transport, concurrency); vượt --max-regression thì liệt kê trong
+"regressions" và thoát mã 1.
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+_TMP = tempfile.mkdtemp(prefix="pb025-bench-load-")
+os.environ.setdefault("STATE_DB_PATH", os.path.join(_TMP, "state.db"))
+os.environ.setdefault("AUDIT_LOG_PATH", os.path.join(_TMP, "audit_log.jsonl"))
+os.environ.setdefault("PSEUDONYM_VAULT_PATH", os.path.join(_TMP, "vault.db"))
+os.environ.setdefault("PSEUDONYM_KEY_PATH", os.path.join(_TMP, "pseudonym.key"))
+
+import httpx  # noqa: E402
+
+OPS = ("score", "consent_grant", "consent_revoke", "complaint", "dashboard")
+
+# module -> op hỗ trợ + endpoint dashboard
+APPS = {
+    "main": {
+        "module": "main",
+        "ops": set(OPS),
+        "dashboard": "/api/v1/dashboard/live",
+    },
+    "pb025": {
+        "module": "pb025_api",
+        "ops": {"score", "dashboard"},
+        "dashboard": "/api/v1/dashboard/summary",
+    },
+}
+
+DEFAULT_MIX = "score=70,consent_grant=10,consent_revoke=5,complaint=5,dashboard=10"
+BANKS = ["VCB", "BIDV", "TCB", "MBB"]
+GRADES = ["A", "B", "C", "D", "E", None]
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPS:
+            raise SystemExit(f"Unknown op in --mix: {name!r} (choose from {', '.join(OPS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def percentiles(latencies: List[float]) -> Dict[str, float]:
+    """Nearest-rank, latency tính bằng giây → ms."""
+    xs = sorted(latencies)
+    n = len(xs)
+    if not n:
+        return {}
+
+    def at(q: float) -> float:
+        return round(xs[min(n - 1, int(q * n))] * 1e3, 3)
+
+    return {
+        "mean": round(sum(xs) / n * 1e3, 3),
+        "p50": at(0.50),
+        "p95": at(0.95),
+        "p99": at(0.99),
+        "p999": at(0.999),
+        "max": round(xs[-1] * 1e3, 3),
+    }
+
+
+class Workload:
+    """Sinh request theo mix; giữ pool consent_id đã cấp để revoke."""
+
+    def __init__(self, app_name: str, mix: Dict[str, float], citizens: int, seed: int):
+        spec = APPS[app_name]
+        self.dashboard_path = spec["dashboard"]
+        self.ops = [op for op in mix if op in spec["ops"] and mix[op] > 0]
+        self.weights = [mix[op] for op in self.ops]
+        self.skipped = sorted(op for op in mix if op not in spec["ops"])
+        if not self.ops:
+            raise SystemExit(f"--mix has no op supported by {app_name}")
+        self.citizens = citizens
+        self.rng = random.Random(seed)
+        self.consents: deque = deque(maxlen=100_000)
+
+    def national_id(self) -> str:
+        return f"{self.rng.randrange(self.citizens):012d}"
+
+    def score_payload(self) -> Dict[str, Any]:
+        rng = self.rng
+        return {
+            "national_id": self.national_id(),
+            "loan_amount": rng.choice([50e6, 120e6, 300e6, 800e6]) + rng.randrange(10**6),
+            "loan_tenor_months": rng.choice([12, 24, 36, 48, 60]),
+            "annual_income": rng.choice([None, 240e6, 600e6]),
+            "dti": rng.choice([None, 18.0, 45.0, 70.0]),
+            "grade": rng.choice(GRADES),
+            "home_ownership": "RENT",
+            "purpose": "debt_consolidation",
+            "bank_code": rng.choice(BANKS),
+        }
+
+    def next(self) -> Tuple[str, str, str, Optional[Dict[str, Any]]]:
+        """(op, method, path, json body)."""
+        op = self.rng.choices(self.ops, self.weights)[0]
+        if op == "consent_revoke" and not self.consents:
+            op = "consent_grant"  # chưa có consent nào để revoke
+        if op == "score":
+            return op, "POST", "/api/v1/score", self.score_payload()
+        if op == "consent_grant":
+            body = {"national_id": self.national_id(), "bank_code": self.rng.choice(BANKS)}
+            return op, "POST", "/api/v1/consent/grant", body
+        if op == "consent_revoke":
+            return op, "POST", f"/api/v1/consent/{self.consents.popleft()}/revoke", None
+        if op == "complaint":
+            body = {"national_id": self.national_id(), "complaint_type": "data", "description": "load test"}
+            return op, "POST", "/api/v1/complaint", body
+        return op, "GET", self.dashboard_path, None
+
+
+async def drive(client: httpx.AsyncClient, workload: Workload, concurrency: int,
+                duration: float, warmup: float) -> Dict[str, Any]:
+    latencies: Dict[str, List[float]] = {op: [] for op in workload.ops + ["consent_grant"]}
+    errors: Dict[str, int] = {op: 0 for op in latencies}
+    start = time.perf_counter()
+    record_from = start + warmup
+    deadline = record_from + duration
+
+    async def worker():
+        while True:
+            op, method, path, body = workload.next()
+            t0 = time.perf_counter()
+            if t0 >= deadline:
+                return
+            try:
+                r = await client.request(method, path, json=body)
+                ok = r.status_code < 400
+            except httpx.HTTPError:
+                r, ok = None, False
+            t1 = time.perf_counter()
+            if ok and op == "consent_grant":
+                workload.consents.append(r.json()["consent_id"])
+            if t0 >= record_from:
+                latencies[op].append(t1 - t0)
+                errors[op] += not ok
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - record_from
+    everything = [x for lat in latencies.values() for x in lat]
+    return {
+        "requests": len(everything),
+        "errors": sum(errors.values()),
+        "req_per_s": round(len(everything) / elapsed, 1),
+        "latency_ms": percentiles(everything),
+        "ops": {
+            op: {"count": len(lat), "errors": errors[op], "latency_ms": percentiles(lat)}
+            for op, lat in latencies.items()
+            if lat or errors[op]
+        },
+    }
+
+
+def run_asgi(app_name: str, args, mix: Dict[str, float], concurrency: int) -> Dict[str, Any]:
+    module = importlib.import_module(APPS[app_name]["module"])
+    workload = Workload(app_name, mix, args.citizens, args.seed)
+
+    async def go():
+        transport = httpx.ASGITransport(app=module.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=30.0) as client:
+            return await drive(client, workload, concurrency, args.duration, args.warmup)
+
+    report = asyncio.run(go())
+    if app_name == "main" and getattr(module, "SCORER", None) is None:
+        report["warning"] = "main has no model artifact (MODEL_STORE_DIR): score calls fail"
+    report["skipped_ops"] = workload.skipped
+    return report
+
+
+def wait_ready(base_url: str, timeout: float = 120.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(base_url + "/health", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("uvicorn did not become ready")
+
+
+def run_uvicorn(app_name: str, args, mix: Dict[str, float], concurrency: int) -> Dict[str, Any]:
+    base_url = f"http://127.0.0.1:{args.port}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", f"{APPS[app_name]['module']}:app", "--port", str(args.port),
+         "--workers", str(args.workers), "--log-level", "warning", "--no-access-log"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=dict(os.environ),
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        wait_ready(base_url)
+        workload = Workload(app_name, mix, args.citizens, args.seed)
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+        async def go():
+            async with httpx.AsyncClient(base_url=base_url, timeout=30.0, limits=limits) as client:
+                return await drive(client, workload, concurrency, args.duration, args.warmup)
+
+        report = asyncio.run(go())
+    finally:
+        server.terminate()
+        server.wait()
+    report["skipped_ops"] = workload.skipped
+    return report
+
+
+def find_regressions(runs: List[Dict[str, Any]], baseline: Dict[str, Any], max_regression: float) -> List[Dict[str, Any]]:
+    """So op score (p99, req/s) với baseline theo (app, transport, concurrency)."""
+    def key(r):
+        return r["app"], r["transport"], r["concurrency"]
+
+    old_runs = {key(r): r for r in baseline.get("runs", [])}
+    out = []
+    for run in runs:
+        old = old_runs.get(key(run))
+        new_score = run["ops"].get("score")
+        old_score = old and old["ops"].get("score")
+        if not new_score or not old_score:
+            continue
+        checks = [
+            ("score_p99_ms", new_score["latency_ms"]["p99"], old_score["latency_ms"]["p99"], True),
+            ("req_per_s", run["req_per_s"], old["req_per_s"], False),
+        ]
+        for metric, new, before, higher_is_worse in checks:
+            if not before:
+                continue
+            change = (new - before) / before if higher_is_worse else (before - new) / before
+            if change > max_regression:
+                out.append({
+                    "app": run["app"], "transport": run["transport"], "concurrency": run["concurrency"],
+                    "metric": metric, "baseline": before, "current": new, "regression": round(change, 4),
+                })
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test main:app / pb025_api:app (ASGI in-process + uvicorn)")
+    parser.add_argument("--app", default="main,pb025", help="main, pb025 hoặc cả 2 (phân cách dấu phẩy)")
+    parser.add_argument("--transport", default="asgi,uvicorn", help="asgi, uvicorn hoặc cả 2")
+    parser.add_argument("--concurrency", default="1,8,32", help="số request đồng thời, vd. 1,8,32")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="trọng số op, vd. score=80,dashboard=20")
+    parser.add_argument("--duration", type=float, default=10.0, help="giây đo mỗi lượt (sau warm-up)")
+    parser.add_argument("--warmup", type=float, default=1.0, help="giây chạy trước khi bắt đầu đo")
+    parser.add_argument("--citizens", type=int, default=10_000, help="số national_id khác nhau")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=1, help="số worker uvicorn")
+    parser.add_argument("--out", help="ghi kết quả JSON ra file (dùng làm --baseline lần sau)")
+    parser.add_argument("--baseline", help="file kết quả cũ để so sánh")
+    parser.add_argument("--max-regression", type=float, default=0.10, help="mức chậm đi tối đa cho phép (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    apps = [a.strip() for a in args.app.split(",")]
+    transports = [t.strip() for t in args.transport.split(",")]
+    for a in apps:
+        if a not in APPS:
+            raise SystemExit(f"Unknown app {a!r} (choose from {', '.join(APPS)})")
+    for t in transports:
+        if t not in ("asgi", "uvicorn"):
+            raise SystemExit(f"Unknown transport {t!r} (asgi, uvicorn)")
+    mix = parse_mix(args.mix)
+    levels = [int(c) for c in args.concurrency.split(",")]
+
+    runs = []
+    for app_name in apps:
+        for transport in transports:
+            for concurrency in levels:
+                fn = run_asgi if transport == "asgi" else run_uvicorn
+                report = fn(app_name, args, mix, concurrency)
+                runs.append({"app": app_name, "transport": transport, "concurrency": concurrency, **report})
+                print(
+                    f"[BENCH] {app_name}/{transport} c={concurrency}: {report['req_per_s']} req/s, "
+                    f"p99 {report['latency_ms'].get('p99')} ms, errors {report['errors']}",
+                    file=sys.stderr,
+                )
+
+    result: Dict[str, Any] = {
+        "cpu_count": os.cpu_count(),
+        "python": sys.version.split()[0],
+        "mix": mix,
+        "duration_s": args.duration,
+        "runs": runs,
+    }
+    regressions = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = find_regressions(runs, json.load(f), args.max_regression)
+        result["regressions"] = regressions
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    print(json.dumps(result, indent=2))
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# backend/bench_prepare.py
+"""
+Micro-benchmark parse cột LendingClub (term / int_rate / revol_util).
+
+So sánh _prepare_df_basic cũ (astype(str) + regex trên cả cột) với bản
+parse-theo-giá-trị-distinct trong main.py, trên mẫu N dòng (mặc định 1M):
+
+    python bench_prepare.py
+    python bench_prepare.py --rows 2000000 --repeat 5
+
+Kết quả in ra dạng JSON (rows/second trước và sau).
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from main import PARSE_DTYPES, _prepare_df_basic
+
+
+def prepare_legacy(df: pd.DataFrame) -> pd.DataFrame:
+    """Bản _prepare_df_basic trước khi tối ưu (giữ nguyên để so sánh)."""
+    df = df.copy()
+    df["term_months"] = df["term"].astype(str).str.extract(r"(\d+)").astype(float)
+    df["int_rate_num"] = df["int_rate"].astype(str).str.replace("%", "", regex=False).astype(float)
+    df["revol_util_num"] = df["revol_util"].astype(str).str.replace("%", "", regex=False).astype(float)
+    return df
+
+
+def make_sample(rows: int, seed: int = 0) -> pd.DataFrame:
+    """Mẫu giống định dạng CSV LendingClub (cột object như pd.read_csv mặc định)."""
+    rng = np.random.default_rng(seed)
+    term = np.where(rng.random(rows) < 0.7, " 36 months", " 60 months")
+    rates = np.round(rng.uniform(5.0, 31.0, 2_000), 2)
+    utils = np.round(rng.uniform(0.0, 120.0, 1_201), 1)
+    int_rate = np.array([f"{r:.2f}%" for r in rates], dtype=object)[rng.integers(0, len(rates), rows)]
+    revol_util = np.array([f"{u:.1f}%" for u in utils], dtype=object)[rng.integers(0, len(utils), rows)]
+    revol_util[rng.random(rows) < 0.001] = np.nan
+    return pd.DataFrame({"term": term.astype(object), "int_rate": int_rate, "revol_util": revol_util})
+
+
+def best_of(fn, df: pd.DataFrame, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(df)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parse term / int_rate / revol_util")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    df_object = make_sample(args.rows)
+    df_category = df_object.astype({c: t for c, t in PARSE_DTYPES.items()})
+
+    # kiểm tra kết quả giống nhau trước khi đo
+    old, new = prepare_legacy(df_object), _prepare_df_basic(df_object)
+    for c in ("term_months", "int_rate_num", "revol_util_num"):
+        np.testing.assert_allclose(old[c].to_numpy(), new[c].to_numpy(), rtol=1e-6, equal_nan=True)
+
+    t_legacy = best_of(prepare_legacy, df_object, args.repeat)
+    t_object = best_of(_prepare_df_basic, df_object, args.repeat)
+    t_category = best_of(_prepare_df_basic, df_category, args.repeat)
+
+    report = {
+        "rows": args.rows,
+        "legacy_rows_per_s": round(args.rows / t_legacy),
+        "fast_object_rows_per_s": round(args.rows / t_object),
+        "fast_category_rows_per_s": round(args.rows / t_category),
+        "speedup_object": round(t_legacy / t_object, 1),
+        "speedup_category": round(t_legacy / t_category, 1),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+# backend/bench_serialize.py
+"""
+Đo tỷ trọng serialize JSON trong latency của POST /api/v1/score, trước / sau
+response class riêng (ScoreJSONResponse – main.py, SyntheticScoreResponse –
+pb025_api.py):
+
+    python bench_serialize.py                     # cả 2 API, 2000 request mỗi đường
+    python bench_serialize.py --api pb025 --requests 5000
+
+- before: handler trả model / dict, FastAPI validate lại + jsonable_encoder +
+  json.dumps (đường mặc định, route tạm /bench/legacy/score).
+- after : handler trả thẳng response class (orjson, hoặc template ghép
+  fragment encode sẵn khi không có orjson).
+
+Latency đo trong process qua TestClient (ASGI, không qua mạng) để phần
+serialize không bị chìm trong nhiễu socket. main.py cần model artifact
+(MODEL_STORE_DIR); micro-batching tắt mặc định vì cửa sổ gom batch (2 ms)
+lấn át mọi thứ khác. Kết quả in ra dạng JSON.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+_TMP = tempfile.mkdtemp(prefix="pb025-bench-serialize-")
+os.environ.setdefault("SCORE_MICROBATCH", "0")
+os.environ.setdefault("SCORE_CACHE_SIZE", "0")
+os.environ.setdefault("STATE_DB_PATH", os.path.join(_TMP, "state.db"))
+os.environ.setdefault("AUDIT_LOG_PATH", os.path.join(_TMP, "audit_log.jsonl"))
+os.environ.setdefault("PSEUDONYM_VAULT_PATH", os.path.join(_TMP, "vault.db"))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+import fast_json  # noqa: E402
+
+GRADES = ["A", "B", "C", "D", "E", None]
+
+
+def make_payloads(n: int, seed: int = 7) -> List[Dict[str, Any]]:
+    rnd = random.Random(seed)
+    return [
+        {
+            "national_id": f"{rnd.randrange(10**12):012d}",
+            "loan_amount": rnd.choice([50e6, 120e6, 300e6, 800e6]) + rnd.randrange(10**6),
+            "loan_tenor_months": rnd.choice([12, 24, 36, 48, 60]),
+            "annual_income": rnd.choice([None, 240e6, 600e6]),
+            "dti": rnd.choice([None, 18.0, 45.0, 70.0]),
+            "grade": rnd.choice(GRADES),
+            "home_ownership": "RENT",
+            "purpose": "debt_consolidation",
+        }
+        for _ in range(n)
+    ]
+
+
+def percentile(xs: List[float], q: float) -> float:
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(q * len(xs)))]
+
+
+def time_calls(fn: Callable[[], Any], n: int) -> float:
+    """µs trung bình mỗi lần gọi."""
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - t0) / n * 1e6
+
+
+def summarize(lat: List[float]) -> Dict[str, float]:
+    return {
+        "mean_us": round(statistics.fmean(lat), 1),
+        "p50_us": round(percentile(lat, 0.50), 1),
+        "p99_us": round(percentile(lat, 0.99), 1),
+    }
+
+
+def time_requests(client: TestClient, paths: List[str], payloads: List[Dict[str, Any]]) -> List[Dict[str, float]]:
+    """Gọi xen kẽ các path với cùng payload (tránh lệch do nhiễu theo thời gian)."""
+    for p in payloads[:50]:  # warm-up
+        for path in paths:
+            client.post(path, json=p)
+    lat: List[List[float]] = [[] for _ in paths]
+    for p in payloads:
+        for path, out in zip(paths, lat):
+            t0 = time.perf_counter()
+            r = client.post(path, json=p)
+            out.append((time.perf_counter() - t0) * 1e6)
+            r.raise_for_status()
+    return [summarize(x) for x in lat]
+
+
+def run(name: str, app, handler_module, response_name: str, request_model, legacy_kwargs: Dict[str, Any],
+        sample, default_serialize: Callable[[Any], bytes], fast_serialize: Callable[[Any], bytes],
+        payloads: List[Dict[str, Any]], reps: int) -> Dict[str, Any]:
+    fast_cls = getattr(handler_module, response_name)
+    handler = next(r.endpoint for r in app.routes if getattr(r, "path", None) == "/api/v1/score")
+
+    # đường cũ: cùng handler nhưng response class thay bằng hàm trả nguyên content
+    # (sync / async giữ như handler thật để cùng chạy threadpool / event loop)
+    def swap():
+        setattr(handler_module, response_name, lambda content: content)
+
+    def restore():
+        setattr(handler_module, response_name, fast_cls)
+
+    if asyncio.iscoroutinefunction(handler):
+
+        async def legacy(req: request_model):
+            swap()
+            try:
+                return await handler(req)
+            finally:
+                restore()
+
+    else:
+
+        def legacy(req: request_model):
+            swap()
+            try:
+                return handler(req)
+            finally:
+                restore()
+
+    app.add_api_route("/bench/legacy/score", legacy, methods=["POST"], **legacy_kwargs)
+
+    default_body, fast_body = default_serialize(sample), fast_serialize(sample)
+    if json.loads(default_body) != json.loads(fast_body):
+        raise SystemExit(f"{name}: fast response differs from default serialization")
+
+    ser_before = time_calls(lambda: default_serialize(sample), reps)
+    ser_after = time_calls(lambda: fast_serialize(sample), reps)
+    with TestClient(app) as client:
+        before, after = time_requests(client, ["/bench/legacy/score", "/api/v1/score"], payloads)
+    return {
+        "response_bytes": len(fast_body),
+        "before": {**before, "serialize_us": round(ser_before, 2),
+                   "serialize_share": round(ser_before / before["mean_us"], 4)},
+        "after": {**after, "serialize_us": round(ser_after, 2),
+                  "serialize_share": round(ser_after / after["mean_us"], 4)},
+        "speedup_serialize": round(ser_before / ser_after, 1),
+        "speedup_latency": round(before["mean_us"] / after["mean_us"], 2),
+    }
+
+
+def bench_main(payloads: List[Dict[str, Any]], reps: int) -> Dict[str, Any]:
+    import main
+
+    if main.SCORER is None:
+        return {"skipped": "no model artifact in MODEL_STORE_DIR"}
+    route = next(r for r in main.app.routes if getattr(r, "path", None) == "/api/v1/score")
+    sample = main.score_one(main.ScoreRequest(**payloads[0]), main.SCORER)
+    loop = asyncio.new_event_loop()
+
+    def default_serialize(r):
+        content = loop.run_until_complete(serialize_response(field=route.response_field, response_content=r))
+        return JSONResponse(content).body
+
+    report = run(
+        "main", main.app, main, "ScoreJSONResponse", main.ScoreRequest, {"response_model": main.ScoreResponse},
+        sample, default_serialize, lambda r: main.ScoreJSONResponse(r).body, payloads, reps,
+    )
+    report["template_us"] = round(time_calls(lambda: main.encode_score(sample).encode("utf-8"), reps), 2)
+    return report
+
+
+def bench_pb025(payloads: List[Dict[str, Any]], reps: int) -> Dict[str, Any]:
+    import pb025_api
+
+    sample = pb025_api._synthetic_score(pb025_api.ScoreRequest(**payloads[0]))
+    report = run(
+        "pb025", pb025_api.app, pb025_api, "SyntheticScoreResponse", pb025_api.ScoreRequest, {},
+        sample, lambda d: JSONResponse(jsonable_encoder(d)).body,
+        lambda d: pb025_api.SyntheticScoreResponse(d).body, payloads, reps,
+    )
+    report["template_us"] = round(time_calls(lambda: pb025_api._encode_score(sample).encode("utf-8"), reps), 2)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serialization share of /api/v1/score latency")
+    parser.add_argument("--api", choices=["main", "pb025", "all"], default="all")
+    parser.add_argument("--requests", type=int, default=2000, help="số request mỗi đường (before / after)")
+    parser.add_argument("--reps", type=int, default=20000, help="số lần serialize khi đo riêng")
+    args = parser.parse_args()
+
+    payloads = make_payloads(args.requests)
+    report: Dict[str, Any] = {"orjson": fast_json.HAVE_ORJSON, "requests": args.requests}
+    if args.api in ("main", "all"):
+        report["main"] = bench_main(payloads, args.reps)
+    if args.api in ("pb025", "all"):
+        report["pb025"] = bench_pb025(payloads, args.reps)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+# backend/bench_workers.py
+"""
+Load test đọc consent / complaint với `uvicorn main:app --workers N`.
+
+Dữ liệu nằm trong SQLite dùng chung (state_db.py) nên mọi worker đọc cùng 1
+nguồn; bài test đo throughput đọc khi tăng số worker (kỳ vọng gần tuyến tính
+tới số core):
+
+    python bench_workers.py                          # workers 1,2,4
+    python bench_workers.py --workers 1,2,4,8 --duration 20 --clients 16
+
+Mỗi client là 1 process riêng (httpx keep-alive) gọi xen kẽ
+GET /api/v1/consent/{id}/latest và GET /api/v1/complaint/{id}.
+Kết quả in ra dạng JSON (req/s, p50/p99, hiệu suất so với 1 worker).
+
+Mọi state của server (SQLite, audit log, vault, key pseudonym, cache dữ liệu,
+model store) nằm trong 1 thư mục tạm, xoá sau khi đo – không đụng tới data/
+hay artifacts/ thật. Bài đo chỉ đọc consent / complaint nên không cần model
+(MODEL_TRAIN_IF_MISSING=0, store rỗng); --model-store để trỏ vào store có sẵn.
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import random
+import secrets
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import httpx
+
+from complaint_store import ComplaintStore
+from consent_store import ConsentStore
+from pseudonym import Pseudonymizer
+
+
+def server_env(tmp_dir: str, key: bytes, model_store: str) -> dict:
+    """Env cho uvicorn: mọi đường dẫn state trỏ vào tmp_dir."""
+    return dict(
+        os.environ,
+        STATE_DB_PATH=os.path.join(tmp_dir, "state.db"),
+        AUDIT_LOG_PATH=os.path.join(tmp_dir, "audit_log.jsonl"),
+        PSEUDONYM_VAULT_PATH=os.path.join(tmp_dir, "pseudonym_vault.db"),
+        PSEUDONYM_KEY_PATH=os.path.join(tmp_dir, "pseudonym.key"),
+        PB025_PSEUDONYM_KEY=key.hex(),
+        DATA_CACHE_DIR=os.path.join(tmp_dir, "cache"),
+        MODEL_STORE_DIR=model_store or os.path.join(tmp_dir, "artifacts"),
+        MODEL_TRAIN_IF_MISSING="0",
+    )
+
+
+def seed(db_path: str, citizens: int, key: bytes) -> None:
+    consents, complaints = ConsentStore(db_path), ComplaintStore(db_path)
+    now = datetime.utcnow()
+    # store khoá theo pseudonym (cùng key với server qua PB025_PSEUDONYM_KEY)
+    refs = Pseudonymizer(key=key).pseudonymize_batch([f"{i:012d}" for i in range(citizens)])
+    consents.grant_many(
+        {
+            "consent_id": f"CON-BENCH-{i:09d}",
+            "national_id": refs[i],
+            "bank_code": "VCB",
+            "scope_credit_history": True,
+            "scope_utility": True,
+            "scope_income": False,
+            "status": "active",
+            "granted_at": now,
+            "valid_until": now + timedelta(days=30),
+        }
+        for i in range(citizens)
+    )
+    for i in range(0, citizens, 10):
+        complaints.create(
+            {
+                "ticket_id": f"TKT-BENCH-{i:09d}",
+                "national_id": refs[i],
+                "complaint_type": "data",
+                "description": "benchmark",
+                "created_at": now,
+                "status": "received",
+            }
+        )
+
+
+def client(base_url: str, citizens: int, deadline: float, seed_value: int, out: mp.Queue) -> None:
+    rng = random.Random(seed_value)
+    latencies = []
+    errors = 0
+    with httpx.Client(base_url=base_url, timeout=10.0) as c:
+        while time.time() < deadline:
+            nid = f"{rng.randrange(citizens):012d}"
+            path = f"/api/v1/consent/{nid}/latest" if rng.random() < 0.5 else f"/api/v1/complaint/{nid}"
+            t0 = time.perf_counter()
+            r = c.get(path)
+            latencies.append(time.perf_counter() - t0)
+            errors += r.status_code != 200
+    out.put((latencies, errors))
+
+
+def wait_ready(base_url: str, timeout: float = 120.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(base_url + "/health", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError("uvicorn did not become ready")
+
+
+def run(workers: int, args, env: dict) -> dict:
+    base_url = f"http://127.0.0.1:{args.port}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port),
+         "--workers", str(workers), "--log-level", "warning"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        wait_ready(base_url)
+        time.sleep(2.0)  # các worker còn lại khởi động xong
+        out: mp.Queue = mp.Queue()
+        deadline = time.time() + args.duration
+        procs = [
+            mp.Process(target=client, args=(base_url, args.citizens, deadline, i, out))
+            for i in range(args.clients)
+        ]
+        for p in procs:
+            p.start()
+        results = [out.get() for _ in procs]
+        for p in procs:
+            p.join()
+    finally:
+        server.terminate()
+        server.wait()
+
+    latencies = sorted(x for lat, _ in results for x in lat)
+    n = len(latencies)
+    return {
+        "workers": workers,
+        "requests": n,
+        "errors": sum(e for _, e in results),
+        "req_per_s": round(n / args.duration),
+        "p50_ms": round(latencies[n // 2] * 1e3, 2) if n else None,
+        "p99_ms": round(latencies[int(n * 0.99)] * 1e3, 2) if n else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-worker read scaling benchmark")
+    parser.add_argument("--workers", default="1,2,4", help="danh sách số worker, vd. 1,2,4,8")
+    parser.add_argument("--clients", type=int, default=0, help="số process client (mặc định 2 x max workers)")
+    parser.add_argument("--duration", type=float, default=10.0, help="giây mỗi lần đo")
+    parser.add_argument("--citizens", type=int, default=100_000)
+    parser.add_argument("--port", type=int, default=8799)
+    parser.add_argument("--model-store", default="", help="MODEL_STORE_DIR cho server (mặc định: store rỗng tạm)")
+    args = parser.parse_args()
+
+    counts = [int(x) for x in args.workers.split(",")]
+    args.clients = args.clients or 2 * max(counts)
+
+    tmp_dir = tempfile.mkdtemp(prefix="pb025_workers_")
+    key = secrets.token_bytes(32)
+    env = server_env(tmp_dir, key, args.model_store)
+    try:
+        seed(env["STATE_DB_PATH"], args.citizens, key)
+        runs = [run(w, args, env) for w in counts]
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    base = runs[0]["req_per_s"] / runs[0]["workers"]
+    for r in runs:
+        r["scaling_efficiency"] = round(r["req_per_s"] / (base * r["workers"]), 2) if base else None
+    print(json.dumps({"cpu_count": os.cpu_count(), "clients": args.clients, "runs": runs}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
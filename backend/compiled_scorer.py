@@ -0,0 +1,212 @@
+"""
+Compiled scorer cho PB-025.
+
+Trích tham số của Pipeline (imputer → scaler / one-hot → LogisticRegression)
+thành các mảng NumPy phẳng, rồi chấm điểm bằng phép nhân vô hướng thuần
+NumPy – không dựng DataFrame, không đi qua ColumnTransformer.
+"""
+
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from sklearn.pipeline import Pipeline
+
+
+def _is_missing(v) -> bool:
+    return v is None or (isinstance(v, float) and v != v)
+
+
+class CompiledScorer:
+    """Logistic scorer dạng mảng phẳng, tương đương Pipeline đã fit."""
+
+    def __init__(
+        self,
+        num_features: List[str],
+        cat_features: List[str],
+        num_fill: np.ndarray,
+        num_mean: np.ndarray,
+        num_scale: np.ndarray,
+        num_coef: np.ndarray,
+        cat_fill: List[Optional[str]],
+        cat_vocab: List[List[str]],
+        cat_coef: List[np.ndarray],
+        intercept: float,
+    ):
+        self.num_features = list(num_features)
+        self.cat_features = list(cat_features)
+        # NaN trong num_fill = cột bị imputer loại (toàn NaN lúc train) → không đóng góp
+        self.num_fill = np.asarray(num_fill, dtype=float)
+        self.num_mean = np.asarray(num_mean, dtype=float)
+        self.num_scale = np.asarray(num_scale, dtype=float)
+        self.num_coef = np.asarray(num_coef, dtype=float)
+        self.cat_fill = list(cat_fill)
+        self.cat_vocab = [list(v) for v in cat_vocab]
+        self.cat_coef = [np.asarray(w, dtype=float) for w in cat_coef]
+        self.intercept = float(intercept)
+
+        self._num_keep = ~np.isnan(self.num_fill)
+        self._cat_index: List[Dict[str, int]] = [
+            {v: i for i, v in enumerate(vocab)} for vocab in self.cat_vocab
+        ]
+
+    def logit(self, num: np.ndarray, cats: Sequence[Sequence[Optional[str]]]) -> np.ndarray:
+        """num: (n, len(num_features)) có thể chứa NaN; cats: mỗi feature 1 list độ dài n."""
+        x = np.asarray(num, dtype=float)[:, self._num_keep]
+        fill = self.num_fill[self._num_keep]
+        x = np.where(np.isnan(x), fill, x)
+        z = self.intercept + ((x - self.num_mean) / self.num_scale) @ self.num_coef
+
+        for j, values in enumerate(cats):
+            index, coef, fill_value = self._cat_index[j], self.cat_coef[j], self.cat_fill[j]
+            if fill_value is None:
+                continue  # feature bị imputer loại
+            # Giống Pipeline: chỉ NaN được impute (v != v), None / giá trị lạ → 0
+            # như OneHotEncoder(handle_unknown="ignore")
+            idx = np.fromiter(
+                (index.get(fill_value if v != v else v, -1) for v in values),
+                dtype=np.int64,
+                count=len(values),
+            )
+            z = z + np.where(idx >= 0, coef[idx], 0.0)
+        return z
+
+    def predict_proba_bad(self, num: np.ndarray, cats: Sequence[Sequence[Optional[str]]]) -> np.ndarray:
+        z = self.logit(num, cats)
+        # sigmoid ổn định số học: 1 / (1 + e^-z)
+        return np.exp(-np.logaddexp(0.0, -z))
+
+    def save(self, path: str) -> None:
+        """Ghi toàn bộ tham số ra 1 file .npz (không dùng pickle)."""
+        arrays = {
+            "num_features": np.array(self.num_features, dtype=str),
+            "cat_features": np.array(self.cat_features, dtype=str),
+            "num_fill": self.num_fill,
+            "num_mean": self.num_mean,
+            "num_scale": self.num_scale,
+            "num_coef": self.num_coef,
+            "cat_fill": np.array(["" if v is None else v for v in self.cat_fill], dtype=str),
+            "cat_dropped": np.array([v is None for v in self.cat_fill]),
+            "intercept": np.array([self.intercept]),
+        }
+        for j in range(len(self.cat_features)):
+            arrays[f"cat_vocab_{j}"] = np.array(self.cat_vocab[j], dtype=str)
+            arrays[f"cat_coef_{j}"] = self.cat_coef[j]
+        with open(path, "wb") as f:
+            np.savez(f, **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> "CompiledScorer":
+        with np.load(path, allow_pickle=False) as z:
+            cat_features = z["cat_features"].tolist()
+            cat_fill = [
+                None if dropped else str(v)
+                for v, dropped in zip(z["cat_fill"].tolist(), z["cat_dropped"].tolist())
+            ]
+            return cls(
+                num_features=z["num_features"].tolist(),
+                cat_features=cat_features,
+                num_fill=z["num_fill"],
+                num_mean=z["num_mean"],
+                num_scale=z["num_scale"],
+                num_coef=z["num_coef"],
+                cat_fill=cat_fill,
+                cat_vocab=[z[f"cat_vocab_{j}"].tolist() for j in range(len(cat_features))],
+                cat_coef=[z[f"cat_coef_{j}"] for j in range(len(cat_features))],
+                intercept=float(z["intercept"][0]),
+            )
+
+    def frame_to_arrays(self, X: pd.DataFrame):
+        num = X[self.num_features].to_numpy(dtype=float)
+        cats = [X[c].tolist() for c in self.cat_features]
+        return num, cats
+
+
+def compile_pipeline(pipe: Pipeline, num_features: List[str], cat_features: List[str]) -> CompiledScorer:
+    """Trích median/mode, mean/scale, vocabulary one-hot và coef từ Pipeline đã fit."""
+    preprocess = pipe.named_steps["preprocess"]
+    clf = pipe.named_steps["clf"]
+    if list(clf.classes_) != [0, 1]:
+        raise ValueError(f"Unexpected classes for compiled scorer: {clf.classes_}")
+
+    num_pipe = preprocess.named_transformers_["num"]
+    cat_pipe = preprocess.named_transformers_["cat"]
+    num_imputer = num_pipe.named_steps["imputer"]
+    scaler = num_pipe.named_steps["scaler"]
+    cat_imputer = cat_pipe.named_steps["imputer"]
+    encoder = cat_pipe.named_steps["encoder"]
+
+    coef = clf.coef_[0]
+    n_num_kept = len(scaler.mean_)
+    num_coef = coef[:n_num_kept]
+
+    cat_stats = list(cat_imputer.statistics_)
+    cat_fill: List[Optional[str]] = [None if _is_missing(v) else v for v in cat_stats]
+
+    cat_vocab: List[List[str]] = []
+    cat_coef: List[np.ndarray] = []
+    offset = n_num_kept
+    kept = iter(encoder.categories_)
+    for fill_value in cat_fill:
+        if fill_value is None:
+            cat_vocab.append([])
+            cat_coef.append(np.zeros(0))
+            continue
+        vocab = list(next(kept))
+        cat_vocab.append(vocab)
+        cat_coef.append(coef[offset:offset + len(vocab)])
+        offset += len(vocab)
+
+    if offset != len(coef):
+        raise ValueError(f"Coefficient layout mismatch: used {offset} of {len(coef)}")
+
+    return CompiledScorer(
+        num_features=num_features,
+        cat_features=cat_features,
+        num_fill=np.asarray(num_imputer.statistics_, dtype=float),
+        num_mean=scaler.mean_,
+        num_scale=scaler.scale_,
+        num_coef=num_coef,
+        cat_fill=cat_fill,
+        cat_vocab=cat_vocab,
+        cat_coef=cat_coef,
+        intercept=float(clf.intercept_[0]),
+    )
+
+
+def make_probe_frame(scorer: CompiledScorer, n: int = 512, seed: int = 0) -> pd.DataFrame:
+    """Bộ dữ liệu thử cho parity check: trộn giá trị thường, NaN, category lạ."""
+    rng = np.random.default_rng(seed)
+    data = {}
+    for j, name in enumerate(scorer.num_features):
+        base = scorer.num_fill[j]
+        base = 1.0 if np.isnan(base) or base == 0 else abs(base)
+        col = base * rng.lognormal(0.0, 1.0, n)
+        col[rng.random(n) < 0.2] = np.nan
+        data[name] = col
+    for j, name in enumerate(scorer.cat_features):
+        choices = scorer.cat_vocab[j] + [None, np.nan, "__unknown__"]
+        data[name] = [choices[k] for k in rng.integers(0, len(choices), n)]
+    return pd.DataFrame(data, columns=scorer.num_features + scorer.cat_features)
+
+
+def check_parity(scorer: CompiledScorer, pipe: Pipeline, X: pd.DataFrame) -> float:
+    """Trả về sai lệch tuyệt đối lớn nhất của P(bad) giữa compiled scorer và Pipeline."""
+    expected = pipe.predict_proba(X)[:, 1]
+    got = scorer.predict_proba_bad(*scorer.frame_to_arrays(X))
+    return float(np.max(np.abs(expected - got))) if len(X) else 0.0
+
+
+class PipelineScorer:
+    """Fallback: cùng interface với CompiledScorer nhưng gọi thẳng Pipeline."""
+
+    def __init__(self, pipe: Pipeline, num_features: List[str], cat_features: List[str]):
+        self.pipe = pipe
+        self.num_features = list(num_features)
+        self.cat_features = list(cat_features)
+
+    def predict_proba_bad(self, num: np.ndarray, cats: Sequence[Sequence[Optional[str]]]) -> np.ndarray:
+        X = pd.DataFrame(num, columns=self.num_features)
+        for name, values in zip(self.cat_features, cats):
+            X[name] = list(values)
+        return self.pipe.predict_proba(X)[:, 1]
@@ -0,0 +1,70 @@
+"""
+Complaint store cho PB-025 (SQLite, dùng chung file với consent store).
+
+Thay cho dict COMPLAINTS trong bộ nhớ: ticket tạo trên worker nào cũng đọc
+được từ mọi worker; index (national_id, created_at) cho danh sách theo
+công dân.
+"""
+
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from state_db import STATE_DB_PATH, SQLiteStore
+
+COMPLAINT_DB_PATH = os.getenv("COMPLAINT_DB_PATH", STATE_DB_PATH)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS complaints (
+    ticket_id      TEXT PRIMARY KEY,
+    national_id    TEXT NOT NULL,
+    complaint_type TEXT,
+    description    TEXT NOT NULL,
+    created_at     TEXT NOT NULL,
+    status         TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_complaints_national_created
+    ON complaints (national_id, created_at);
+"""
+
+_COLUMNS = "ticket_id, national_id, complaint_type, description, created_at, status"
+
+_SQL_INSERT = f"INSERT INTO complaints ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)"
+_SQL_LIST = (
+    f"SELECT {_COLUMNS} FROM complaints WHERE national_id = ? "
+    "ORDER BY created_at, ticket_id"
+)
+
+
+def _from_row(row: tuple) -> Dict[str, Any]:
+    return {
+        "ticket_id": row[0],
+        "national_id": row[1],
+        "complaint_type": row[2],
+        "description": row[3],
+        "created_at": datetime.fromisoformat(row[4]),
+        "status": row[5],
+    }
+
+
+class ComplaintStore(SQLiteStore):
+    schema = _SCHEMA
+
+    def __init__(self, path: Optional[str] = None):
+        super().__init__(path or COMPLAINT_DB_PATH)
+
+    def create(self, complaint: Dict[str, Any]) -> None:
+        self._conn().execute(
+            _SQL_INSERT,
+            (
+                complaint["ticket_id"],
+                complaint["national_id"],
+                complaint["complaint_type"],
+                complaint["description"],
+                complaint["created_at"].isoformat(timespec="microseconds"),
+                complaint["status"],
+            ),
+        )
+
+    def list_for(self, national_id: str) -> List[Dict[str, Any]]:
+        return [_from_row(r) for r in self._conn().execute(_SQL_LIST, (national_id,))]
@@ -0,0 +1,126 @@
+"""
+Scheduler hết hạn consent (min-heap theo valid_until).
+
+Heap chỉ giữ các consent hết hạn trong "tầm nhìn" gần (mặc định 1 ngày);
+phần xa hơn nằm sẵn trong partial index valid_until của SQLite và được nạp
+thêm khi tầm nhìn trôi qua → bộ nhớ không tỉ lệ với tổng số consent.
+
+- grant  : schedule() đẩy vào heap, O(log n).
+- revoke : không đụng heap; mục cũ bị bỏ qua khi tới hạn (lazy delete).
+- tới hạn: thread nền ngủ đúng tới mốc gần nhất (không quét định kỳ),
+           store.expire() đổi status → phát sự kiện cho các listener.
+"""
+
+import heapq
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from consent_store import ConsentStore
+
+ExpiryListener = Callable[[Dict[str, Any]], None]
+
+
+class ConsentExpiry:
+    def __init__(self, store: ConsentStore, horizon: timedelta = timedelta(days=1)):
+        self.store = store
+        self.horizon = horizon
+        self._heap: List[Tuple[datetime, str]] = []
+        self._loaded_until: Optional[datetime] = None  # heap đủ mọi consent hết hạn <= mốc này
+        self._listeners: List[ExpiryListener] = []
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+        self.expired = 0
+
+    def add_listener(self, fn: ExpiryListener) -> None:
+        self._listeners.append(fn)
+
+    def _refill(self, now: datetime) -> None:
+        until = now + self.horizon
+        for item in self.store.due_between(self._loaded_until, until):
+            heapq.heappush(self._heap, item)
+        self._loaded_until = until
+
+    def schedule(self, consent_id: str, valid_until: datetime) -> None:
+        # consent đã commit vào store trước khi schedule → nếu nằm ngoài tầm nhìn
+        # thì lần nạp sau sẽ thấy nó, không cần lock (đường chính của bulk grant)
+        loaded_until = self._loaded_until
+        if loaded_until is None or valid_until > loaded_until:
+            return
+        with self._cond:
+            heapq.heappush(self._heap, (valid_until, consent_id))
+            if self._heap[0][1] == consent_id:
+                self._cond.notify()  # mốc sớm hơn → đánh thức thread
+
+    def _pop_due(self, now: datetime) -> List[str]:
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due.append(heapq.heappop(self._heap)[1])
+        return due
+
+    def run_due(self, now: Optional[datetime] = None) -> int:
+        """Xử lý mọi consent đã tới hạn; trả về số consent vừa chuyển sang expired."""
+        now = now or datetime.utcnow()
+        with self._cond:
+            if self._loaded_until is None or now >= self._loaded_until:
+                self._refill(now)
+            due = self._pop_due(now)
+        n = 0
+        for consent_id in due:
+            consent = self.store.expire(consent_id, now)
+            if consent is None:
+                continue  # đã revoke / worker khác đã expire
+            n += 1
+            for fn in self._listeners:
+                try:
+                    fn(consent)
+                except Exception as e:
+                    print(f"[CONSENT] Expiry listener failed for {consent_id}: {e}")
+        self.expired += n
+        return n
+
+    def _next_wakeup(self, now: datetime) -> float:
+        deadline = self._loaded_until
+        if self._heap and self._heap[0][0] < deadline:
+            deadline = self._heap[0][0]
+        return max((deadline - now).total_seconds(), 0.0)
+
+    def _loop(self) -> None:
+        while True:
+            self.run_due()
+            with self._cond:
+                if self._stopped:
+                    return
+                now = datetime.utcnow()
+                if not (self._heap and self._heap[0][0] <= now):
+                    self._cond.wait(self._next_wakeup(now))
+                if self._stopped:
+                    return
+
+    def start(self) -> None:
+        with self._cond:
+            if self._loaded_until is None:
+                self._refill(datetime.utcnow())  # dựng lại heap từ store lúc khởi động
+            if self._thread is not None:
+                return
+            self._stopped = False
+            self._thread = threading.Thread(target=self._loop, name="consent-expiry", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "scheduled": len(self._heap),
+                "expired": self.expired,
+                "loaded_until": self._loaded_until,
+                "next_due": self._heap[0][0] if self._heap else None,
+            }
@@ -0,0 +1,96 @@
+"""
+Index consent đang hiệu lực trong bộ nhớ cho kiểm tra consent khi chấm điểm.
+
+    (national_id, bank_code, scope) -> {consent_id: valid_until}
+
+Kiểm tra = 1 lần tra dict + so valid_until, không quét danh sách / không
+truy vấn DB. Được cập nhật bởi grant, revoke và sự kiện expiry của worker
+này, thay đổi từ worker khác qua ConsentChangeFeed; dựng lại từ store lúc
+khởi động.
+"""
+
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+# scope trong request chấm điểm -> cột bool của Consent
+SCOPES = {
+    "credit_history": "scope_credit_history",
+    "utility": "scope_utility",
+    "income": "scope_income",
+}
+
+_Key = Tuple[str, str, str]
+
+
+class ActiveConsentIndex:
+    def __init__(self):
+        self._index: Dict[_Key, Dict[str, datetime]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _keys(consent: Dict[str, Any]):
+        for scope, field in SCOPES.items():
+            if consent[field]:
+                yield (consent["national_id"], consent["bank_code"], scope)
+
+    def add(self, consent: Dict[str, Any]) -> None:
+        if consent["status"] != "active":
+            return
+        with self._lock:
+            for key in self._keys(consent):
+                self._index.setdefault(key, {})[consent["consent_id"]] = consent["valid_until"]
+
+    def add_many(self, consents: Iterable[Dict[str, Any]]) -> int:
+        """Như add() cho cả lô, giữ lock 1 lần (bulk grant / dựng lại lúc khởi động)."""
+        n = 0
+        index = self._index
+        scopes = tuple(SCOPES.items())
+        with self._lock:
+            for c in consents:
+                if c["status"] != "active":
+                    continue
+                for scope, field in scopes:
+                    if c[field]:
+                        index.setdefault((c["national_id"], c["bank_code"], scope), {})[c["consent_id"]] = c["valid_until"]
+                n += 1
+        return n
+
+    def remove(self, consent: Dict[str, Any]) -> None:
+        with self._lock:
+            for key in self._keys(consent):
+                entry = self._index.get(key)
+                if entry is None:
+                    continue
+                entry.pop(consent["consent_id"], None)
+                if not entry:
+                    del self._index[key]
+
+    def apply(self, consent: Dict[str, Any]) -> None:
+        """Đồng bộ theo trạng thái hiện tại của 1 consent (từ change feed)."""
+        self.remove(consent)
+        self.add(consent)
+
+    def rebuild(self, consents: Iterable[Dict[str, Any]]) -> int:
+        """Dựng index mới rồi mới thay → không có lúc index rỗng giữa chừng."""
+        fresh = ActiveConsentIndex()
+        n = fresh.add_many(consents)
+        with self._lock:
+            self._index = fresh._index
+        return n
+
+    def allows(self, national_id: str, bank_code: str, scope: str, now: Optional[datetime] = None) -> bool:
+        """Có consent active, chưa quá valid_until cho (national_id, bank_code, scope)?"""
+        entry = self._index.get((national_id, bank_code, scope))
+        if not entry:
+            return False
+        now = now or datetime.utcnow()
+        # thường chỉ 1-2 consent mỗi key; copy để không lỗi khi thread khác sửa
+        return any(v > now for v in list(entry.values()))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "keys": len(self._index),
+                "entries": sum(len(entry) for entry in self._index.values()),
+            }
@@ -0,0 +1,286 @@
+"""
+Consent store bền vững cho PB-025 (SQLite, WAL).
+
+Thay cho dict CONSENTS trong bộ nhớ:
+- consent_id là PRIMARY KEY → revoke / get là tra B-tree O(log n),
+  không phải quét toàn bộ danh sách.
+- index (national_id, granted_at) → latest / history là range scan trên index.
+- WAL + mỗi thread 1 connection: đọc không chặn ghi, dữ liệu còn sau restart.
+- partial index valid_until (chỉ consent active) → nguồn cho scheduler hết hạn
+  (consent_expiry.py) nạp dần từng khoảng thời gian.
+
+- bảng consent_changes (ghi bằng trigger, cùng transaction với thay đổi) →
+  các worker khác cập nhật cache trong bộ nhớ (index consent active, heap
+  hết hạn) qua ConsentChangeFeed, không phải dựng lại toàn bộ.
+
+Đọc (get / latest / history) phản ánh hết hạn ngay: consent "active" đã quá
+valid_until được trả về với status "expired" kể cả khi scheduler chưa kịp ghi.
+
+Các câu SQL là hằng số nên được sqlite3 cache dạng prepared statement.
+"""
+
+import os
+import threading
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from state_db import STATE_DB_PATH, SQLiteStore
+
+CONSENT_DB_PATH = os.getenv("CONSENT_DB_PATH", STATE_DB_PATH)
+
+# số dòng consent_changes giữ lại; worker tụt lại xa hơn thì dựng lại cache
+CONSENT_CHANGES_KEEP = int(os.getenv("CONSENT_CHANGES_KEEP", "1000000"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS consents (
+    consent_id           TEXT PRIMARY KEY,
+    national_id          TEXT NOT NULL,
+    bank_code            TEXT NOT NULL,
+    scope_credit_history INTEGER NOT NULL,
+    scope_utility        INTEGER NOT NULL,
+    scope_income         INTEGER NOT NULL,
+    status               TEXT NOT NULL,
+    granted_at           TEXT NOT NULL,
+    valid_until          TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_consents_national_granted
+    ON consents (national_id, granted_at);
+CREATE INDEX IF NOT EXISTS ix_consents_active_expiry
+    ON consents (valid_until) WHERE status = 'active';
+CREATE TABLE IF NOT EXISTS consent_changes (
+    seq        INTEGER PRIMARY KEY AUTOINCREMENT,
+    consent_id TEXT NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS tr_consents_insert AFTER INSERT ON consents
+BEGIN
+    INSERT INTO consent_changes (consent_id) VALUES (NEW.consent_id);
+END;
+CREATE TRIGGER IF NOT EXISTS tr_consents_status AFTER UPDATE OF status ON consents
+WHEN NEW.status IS NOT OLD.status
+BEGIN
+    INSERT INTO consent_changes (consent_id) VALUES (NEW.consent_id);
+END;
+"""
+
+_COLUMNS = (
+    "consent_id, national_id, bank_code, scope_credit_history, scope_utility, "
+    "scope_income, status, granted_at, valid_until"
+)
+
+_SQL_INSERT = f"INSERT INTO consents ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+_SQL_GET = f"SELECT {_COLUMNS} FROM consents WHERE consent_id = ?"
+_SQL_REVOKE = f"UPDATE consents SET status = 'revoked' WHERE consent_id = ? RETURNING {_COLUMNS}"
+_SQL_REVOKE_IN = (
+    "UPDATE consents SET status = 'revoked' WHERE consent_id IN ({marks}) RETURNING " + _COLUMNS
+)
+_SQL_EXPIRE = (
+    f"UPDATE consents SET status = 'expired' "
+    f"WHERE consent_id = ? AND status = 'active' AND valid_until <= ? RETURNING {_COLUMNS}"
+)
+_SQL_DUE = (
+    "SELECT consent_id, valid_until FROM consents "
+    "WHERE status = 'active' AND valid_until > ? AND valid_until <= ?"
+)
+_SQL_ACTIVE = f"SELECT {_COLUMNS} FROM consents WHERE status = 'active' AND valid_until > ?"
+_SQL_CHANGES = (
+    "SELECT ch.seq, " + ", ".join(f"c.{col.strip()}" for col in _COLUMNS.split(",")) + " "
+    "FROM consent_changes ch JOIN consents c ON c.consent_id = ch.consent_id "
+    "WHERE ch.seq > ? ORDER BY ch.seq LIMIT ?"
+)
+_SQL_LATEST = (
+    f"SELECT {_COLUMNS} FROM consents WHERE national_id = ? "
+    "ORDER BY granted_at DESC, rowid DESC LIMIT 1"
+)
+_SQL_HISTORY = (
+    f"SELECT {_COLUMNS} FROM consents WHERE national_id = ? "
+    "ORDER BY granted_at, rowid"
+)
+
+
+@lru_cache(maxsize=1024)
+def _ts(value: datetime) -> str:
+    # luôn đủ microsecond để so sánh chuỗi = so sánh thời gian
+    # (cache: bulk grant ghi cả lô chung granted_at / valid_until)
+    return value.isoformat(timespec="microseconds")
+
+
+def _to_row(c: Dict[str, Any]) -> tuple:
+    return (
+        c["consent_id"],
+        c["national_id"],
+        c["bank_code"],
+        int(c["scope_credit_history"]),
+        int(c["scope_utility"]),
+        int(c["scope_income"]),
+        c["status"],
+        _ts(c["granted_at"]),
+        _ts(c["valid_until"]),
+    )
+
+
+def _from_row(row: tuple, now: Optional[str] = None) -> Dict[str, Any]:
+    status = row[6]
+    if status == "active" and now is not None and row[8] <= now:
+        status = "expired"  # hết hạn nhưng scheduler chưa chạy tới
+    return {
+        "consent_id": row[0],
+        "national_id": row[1],
+        "bank_code": row[2],
+        "scope_credit_history": bool(row[3]),
+        "scope_utility": bool(row[4]),
+        "scope_income": bool(row[5]),
+        "status": status,
+        "granted_at": datetime.fromisoformat(row[7]),
+        "valid_until": datetime.fromisoformat(row[8]),
+    }
+
+
+class ConsentStore(SQLiteStore):
+    """Kho consent trên SQLite; mỗi thread dùng 1 connection riêng."""
+
+    schema = _SCHEMA
+
+    def __init__(self, path: Optional[str] = None):
+        super().__init__(path or CONSENT_DB_PATH)
+        # số lần process này ghi: data_version không đổi với commit của chính
+        # connection đó, nên change feed xét thêm bộ đếm này
+        self.local_writes = 0
+        self._changes_since_prune = 0
+
+    def _wrote(self, rows: int) -> None:
+        # sau commit: poll() thấy bộ đếm mới thì cũng thấy dữ liệu mới
+        self.local_writes += 1
+        # cắt consent_changes theo lượng ghi (mỗi ~KEEP/10 thay đổi), không phụ
+        # thuộc có worker nào poll() change feed hay không (CONSENT_ENFORCE=0)
+        self._changes_since_prune += rows
+        if self._changes_since_prune > CONSENT_CHANGES_KEEP // 10:
+            self._changes_since_prune = 0
+            self.prune_changes()
+
+    def grant(self, consent: Dict[str, Any]) -> None:
+        self._conn().execute(_SQL_INSERT, _to_row(consent))
+        self._wrote(1)
+
+    def grant_many(self, consents: Iterable[Dict[str, Any]]) -> int:
+        """Ghi nhiều consent trong 1 transaction."""
+        with self._transaction() as conn:
+            cur = conn.executemany(_SQL_INSERT, (_to_row(c) for c in consents))
+        self._wrote(cur.rowcount)
+        return cur.rowcount
+
+    def revoke_many(self, consent_ids: List[str], chunk: int = 500) -> List[Optional[Dict[str, Any]]]:
+        """Revoke nhiều consent trong 1 transaction; None ở vị trí consent_id không tồn tại.
+
+        Mỗi câu UPDATE ... WHERE consent_id IN (...) xử lý `chunk` id thay vì 1.
+        """
+        found: Dict[str, Dict[str, Any]] = {}
+        with self._transaction() as conn:
+            for start in range(0, len(consent_ids), chunk):
+                part = consent_ids[start:start + chunk]
+                sql = _SQL_REVOKE_IN.format(marks=",".join("?" * len(part)))
+                for row in conn.execute(sql, part).fetchall():
+                    found[row[0]] = _from_row(row)
+        self._wrote(len(found))
+        return [found.get(consent_id) for consent_id in consent_ids]
+
+    def get(self, consent_id: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(_SQL_GET, (consent_id,)).fetchone()
+        return _from_row(row, _ts(datetime.utcnow())) if row else None
+
+    def revoke(self, consent_id: str) -> Optional[Dict[str, Any]]:
+        # fetchall: chạy hết câu UPDATE ... RETURNING để transaction được commit
+        rows = self._conn().execute(_SQL_REVOKE, (consent_id,)).fetchall()
+        self._wrote(len(rows))
+        return _from_row(rows[0]) if rows else None
+
+    def expire(self, consent_id: str, now: datetime) -> Optional[Dict[str, Any]]:
+        """Chuyển consent active đã quá hạn sang "expired".
+
+        Trả về consent nếu lần gọi này là lần đổi trạng thái (None nếu đã
+        revoke / đã expire / chưa tới hạn) → nhiều worker cùng chạy scheduler
+        thì chỉ 1 worker phát sự kiện.
+        """
+        rows = self._conn().execute(_SQL_EXPIRE, (consent_id, _ts(now))).fetchall()
+        self._wrote(len(rows))
+        return _from_row(rows[0]) if rows else None
+
+    def due_between(self, after: Optional[datetime], until: datetime) -> List[Tuple[datetime, str]]:
+        """(valid_until, consent_id) của consent active hết hạn trong (after, until]."""
+        lo = _ts(after) if after is not None else ""
+        rows = self._conn().execute(_SQL_DUE, (lo, _ts(until))).fetchall()
+        return [(datetime.fromisoformat(v), cid) for cid, v in rows]
+
+    def iter_active(self) -> Iterator[Dict[str, Any]]:
+        """Mọi consent active chưa hết hạn (dựng index lúc khởi động)."""
+        cur = self._conn().execute(_SQL_ACTIVE, (_ts(datetime.utcnow()),))
+        for row in cur:
+            yield _from_row(row)
+
+    def latest(self, national_id: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(_SQL_LATEST, (national_id,)).fetchone()
+        return _from_row(row, _ts(datetime.utcnow())) if row else None
+
+    def history(self, national_id: str) -> List[Dict[str, Any]]:
+        now = _ts(datetime.utcnow())
+        return [_from_row(r, now) for r in self._conn().execute(_SQL_HISTORY, (national_id,))]
+
+    def count(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM consents").fetchone()[0]
+
+    def last_change(self) -> int:
+        row = self._conn().execute("SELECT MAX(seq) FROM consent_changes").fetchone()
+        return row[0] or 0
+
+    def changes_since(self, seq: int, limit: int = 10_000) -> Tuple[bool, List[Tuple[int, Dict[str, Any]]]]:
+        """(còn liền mạch?, [(seq, consent)]) của các thay đổi sau seq.
+
+        False nghĩa là log đã bị cắt qua mốc seq → người gọi phải dựng lại cache.
+        """
+        conn = self._conn()
+        first = conn.execute("SELECT MIN(seq) FROM consent_changes").fetchone()[0]
+        if first is not None and first > seq + 1 and seq < self.last_change():
+            return False, []
+        rows = conn.execute(_SQL_CHANGES, (seq, limit)).fetchall()
+        return True, [(row[0], _from_row(row[1:])) for row in rows]
+
+    def prune_changes(self, keep: int = CONSENT_CHANGES_KEEP) -> int:
+        cur = self._conn().execute(
+            "DELETE FROM consent_changes WHERE seq <= (SELECT MAX(seq) FROM consent_changes) - ?", (keep,)
+        )
+        return cur.rowcount
+
+
+class ConsentChangeFeed:
+    """Theo dõi consent_changes cho cache trong bộ nhớ của 1 worker.
+
+    poll() gần như miễn phí khi không có gì mới: chỉ 1 lần PRAGMA data_version
+    (đổi khi connection khác commit). Khi có, trả về consent đã đổi kể từ lần
+    trước (trạng thái hiện tại trong DB, nên áp lại nhiều lần vẫn đúng).
+    """
+
+    def __init__(self, store: ConsentStore):
+        self.store = store
+        self.seq = store.last_change()
+        self._version = threading.local()
+        self._lock = threading.Lock()
+
+    def poll(self) -> Optional[List[Dict[str, Any]]]:
+        """Consent đã đổi; None nếu tụt quá xa (log đã cắt) → phải dựng lại cache."""
+        version = (self.store.data_version(), self.store.local_writes)
+        if getattr(self._version, "value", None) == version:
+            return []
+        with self._lock:
+            out: List[Dict[str, Any]] = []
+            while True:
+                contiguous, changes = self.store.changes_since(self.seq)
+                if not contiguous:
+                    self.seq = self.store.last_change()
+                    self._version.value = version
+                    return None
+                if not changes:
+                    break
+                self.seq = changes[-1][0]
+                out.extend(consent for _, consent in changes)
+            self._version.value = version
+            return out
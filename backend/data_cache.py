@@ -0,0 +1,220 @@
+"""
+Cache dạng cột cho dữ liệu đã chuẩn hoá (output của _prepare_df_basic).
+
+CSV chỉ được parse 1 lần; mỗi cột được ghi thành 1 file nhị phân thô
+(float64 cho cột số – float32 nếu bật DATA_CACHE_FLOAT32=1 để giảm nửa dung
+lượng, chấp nhận sai số làm tròn; int32 mã category + vocabulary trong
+manifest cho cột chuỗi) và đọc lại bằng np.memmap – không phải parse text
+lần nữa.
+
+    <DATA_CACHE_DIR>/<tên file>.index.json          # size / mtime / sha256 nguồn
+    <DATA_CACHE_DIR>/<tên file>-<sha256[:12]>/
+        manifest.json
+        <cột>.bin
+
+Cache bị coi là cũ khi size/mtime đổi VÀ sha256 đổi (chỉ đổi mtime thì
+hash lại rồi dùng tiếp). Build cache mới thì xoá các thư mục cache cũ của
+cùng file nguồn (sha256 khác).
+"""
+
+import json
+import os
+import re
+import shutil
+from typing import Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from model_store import file_fingerprint
+
+DATA_CACHE_DIR = os.getenv("DATA_CACHE_DIR", os.path.join("data", "cache"))
+
+DATA_CACHE_FLOAT32 = os.getenv("DATA_CACHE_FLOAT32", "0") == "1"
+
+NUM_DTYPE = "float32" if DATA_CACHE_FLOAT32 else "float64"
+CODE_DTYPE = "int32"
+
+# Cột dạng chuỗi ít giá trị distinct → đọc thẳng dạng category cho nhẹ
+_CATEGORY_RAW = {"term", "int_rate", "revol_util", "grade", "home_ownership", "purpose", "loan_status"}
+
+
+def read_chunks(path: str, usecols: List[str], chunksize: int, num_dtype: str = NUM_DTYPE):
+    """Đọc CSV theo chunk, chỉ các cột cần; cột số theo num_dtype, cột chuỗi ít giá trị dạng category."""
+    wanted = set(usecols)
+    dtype = {c: ("category" if c in _CATEGORY_RAW else num_dtype) for c in usecols}
+    return pd.read_csv(
+        path,
+        usecols=lambda c: c in wanted,
+        dtype=dtype,
+        chunksize=chunksize,
+        low_memory=True,
+    )
+
+
+class PreparedData:
+    """Dữ liệu đã chuẩn hoá, memory-map từ cache cột."""
+
+    def __init__(self, directory: str, manifest: Dict):
+        self.directory = directory
+        self.manifest = manifest
+        self.n_rows = int(manifest["n_rows"])
+        self.columns: Dict[str, Dict] = manifest["columns"]
+        self.num_dtype = manifest.get("num_dtype", "float32")  # cache cũ chỉ có float32
+
+    def _memmap(self, name: str, dtype: str) -> np.ndarray:
+        if self.n_rows == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(
+            os.path.join(self.directory, self.columns[name]["file"]),
+            dtype=dtype,
+            mode="r",
+            shape=(self.n_rows,),
+        )
+
+    def num(self, name: str) -> np.ndarray:
+        return self._memmap(name, self.num_dtype)
+
+    def codes(self, name: str) -> np.ndarray:
+        """Mã category (-1 = thiếu)."""
+        return self._memmap(name, CODE_DTYPE)
+
+    def vocab(self, name: str) -> List[str]:
+        return self.columns[name]["vocab"]
+
+    def frame(self, start: int = 0, stop: Optional[int] = None, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """DataFrame các dòng [start, stop); cột chuỗi trả về dạng object (NaN = thiếu)."""
+        stop = self.n_rows if stop is None else min(stop, self.n_rows)
+        data = {}
+        for name in columns or list(self.columns):
+            meta = self.columns[name]
+            if meta["kind"] == "num":
+                data[name] = np.asarray(self.num(name)[start:stop])
+            else:
+                lut = np.array(meta["vocab"] + [np.nan], dtype=object)  # mã -1 → NaN
+                data[name] = lut[np.asarray(self.codes(name)[start:stop])]
+        return pd.DataFrame(data)
+
+    def iter_frames(self, chunksize: int, columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+        for start in range(0, self.n_rows, chunksize):
+            yield self.frame(start, start + chunksize, columns)
+
+
+def _index_path(source: str, cache_dir: str) -> str:
+    return os.path.join(cache_dir, os.path.basename(source) + ".index.json")
+
+
+def _read_json(path: str) -> Optional[Dict]:
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_json(path: str, obj: Dict) -> None:
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def _remove_stale(source: str, target_dir: str, cache_dir: str) -> None:
+    """Xoá thư mục cache của các version nguồn cũ (cùng tên file, sha256 khác)."""
+    pattern = re.compile(re.escape(os.path.basename(source)) + r"-[0-9a-f]{12}$")
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if pattern.match(name) and path != target_dir and os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+            print(f"[DATA] Removed stale cache {path}")
+
+
+def _build(
+    source: str,
+    target_dir: str,
+    fingerprint: Dict,
+    usecols: List[str],
+    num_columns: List[str],
+    cat_columns: List[str],
+    prepare: Callable,
+    chunksize: int,
+) -> None:
+    tmp_dir = f"{target_dir}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    files = {name: open(os.path.join(tmp_dir, name + ".bin"), "wb") for name in num_columns + cat_columns}
+    vocab_index: Dict[str, Dict[str, int]] = {name: {} for name in cat_columns}
+    n_rows = 0
+    try:
+        for chunk in read_chunks(source, usecols, chunksize):
+            chunk = prepare(chunk)
+            n_rows += len(chunk)
+            for name in num_columns:
+                col = chunk[name] if name in chunk.columns else pd.Series(np.nan, index=chunk.index)
+                files[name].write(col.to_numpy(dtype=NUM_DTYPE).tobytes())
+            for name in cat_columns:
+                index = vocab_index[name]
+                if name in chunk.columns:
+                    local_codes, local_vocab = pd.factorize(chunk[name].astype(object), use_na_sentinel=True)
+                else:
+                    local_codes, local_vocab = np.full(len(chunk), -1), []
+                # mã cục bộ của chunk → mã toàn cục (vocabulary lớn dần)
+                lut = np.array([index.setdefault(v, len(index)) for v in local_vocab] + [-1], dtype=CODE_DTYPE)
+                files[name].write(lut[local_codes].astype(CODE_DTYPE).tobytes())
+    finally:
+        for f in files.values():
+            f.close()
+
+    columns = {name: {"kind": "num", "file": name + ".bin"} for name in num_columns}
+    for name in cat_columns:
+        columns[name] = {"kind": "cat", "file": name + ".bin", "vocab": list(vocab_index[name])}
+    _write_json(
+        os.path.join(tmp_dir, "manifest.json"),
+        {"source": fingerprint, "n_rows": n_rows, "num_dtype": NUM_DTYPE, "columns": columns},
+    )
+    try:
+        os.replace(tmp_dir, target_dir)
+    except OSError:
+        # process khác đã build xong cùng version → dùng bản đó
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def open_prepared(
+    source: str,
+    usecols: List[str],
+    num_columns: List[str],
+    cat_columns: List[str],
+    prepare: Callable,
+    chunksize: int = 200_000,
+    cache_dir: Optional[str] = None,
+) -> PreparedData:
+    """Mở cache cột của file CSV nguồn, build (1 lần) nếu chưa có hoặc đã cũ."""
+    cache_dir = cache_dir or DATA_CACHE_DIR
+    os.makedirs(cache_dir, exist_ok=True)
+    index_path = _index_path(source, cache_dir)
+    index = _read_json(index_path)
+    st = os.stat(source)
+
+    if index and index["size"] == st.st_size and index["mtime"] == st.st_mtime:
+        fingerprint = index
+    else:
+        fingerprint = file_fingerprint(source)
+
+    target_dir = os.path.join(cache_dir, f"{os.path.basename(source)}-{fingerprint['sha256'][:12]}")
+    manifest = _read_json(os.path.join(target_dir, "manifest.json"))
+    wanted = set(num_columns) | set(cat_columns)
+    if (
+        manifest is None
+        or not wanted.issubset(manifest["columns"])
+        or manifest.get("num_dtype", "float32") != NUM_DTYPE
+    ):
+        print(f"[DATA] Building columnar cache for {source} ({NUM_DTYPE}) ...")
+        shutil.rmtree(target_dir, ignore_errors=True)
+        _build(source, target_dir, fingerprint, usecols, num_columns, cat_columns, prepare, chunksize)
+        manifest = _read_json(os.path.join(target_dir, "manifest.json"))
+        _remove_stale(source, target_dir, cache_dir)
+        print(f"[DATA] Cache ready: {manifest['n_rows']} rows in {target_dir}.")
+
+    if fingerprint is not index:
+        _write_json(index_path, fingerprint)
+    return PreparedData(target_dir, manifest)
@@ -0,0 +1,65 @@
+"""
+Encode JSON nhanh cho response chấm điểm (main.py, pb025_api.py).
+
+- orjson nếu đã cài: encode dict / list trong C, nhanh hơn json chuẩn ~10 lần.
+- Không có orjson: json chuẩn, cùng tham số với starlette JSONResponse (UTF-8,
+  không khoảng trắng), và các giá trị cố định (danh sách factor, nhãn hạng...)
+  được encode sẵn 1 lần thành Fragments để template response ghép thẳng vào.
+"""
+
+import json
+import sys
+from json.encoder import encode_basestring
+from typing import Any, Dict, Iterable
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson là tuỳ chọn
+    orjson = None
+
+HAVE_ORJSON = orjson is not None
+
+_encode = json.JSONEncoder(ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode
+
+# chuỗi → literal JSON (giữ nguyên ký tự Unicode như JSONResponse)
+quote = encode_basestring
+
+if orjson is not None:
+
+    def dumps(content: Any) -> bytes:
+        return orjson.dumps(content)
+
+else:
+
+    def dumps(content: Any) -> bytes:
+        return _encode(content).encode("utf-8")
+
+
+class Fragments:
+    """Literal JSON encode sẵn cho các object cố định, tra theo id().
+
+    Chỉ đăng ký object sống suốt process (hằng của module) nên id() không bị
+    object khác dùng lại; object lạ thì encode lúc gọi."""
+
+    def __init__(self, values: Iterable[Any] = ()):
+        self._by_id: Dict[int, str] = {}
+        self._keep = []
+        for v in values:
+            self.add(v)
+
+    def add(self, value: Any) -> Any:
+        self._keep.append(value)
+        self._by_id[id(value)] = sys.intern(_encode(value))
+        return value
+
+    def __call__(self, value: Any) -> str:
+        return self._by_id.get(id(value)) or _encode(value)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse encode bằng orjson (nếu có)."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
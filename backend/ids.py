@@ -0,0 +1,50 @@
+"""
+Sinh ID duy nhất, sắp xếp được theo thời gian (kiểu Snowflake / ULID).
+
+    <prefix><ms: 11 hex><node: 8 hex><seq: 10 hex>
+    vd. A-1A14B3F5C6468202B5F00000F423F
+
+- ms   : mili-giây epoch, lấy từ đồng hồ monotonic neo vào wall clock lúc
+         khởi động → không bao giờ lùi trong 1 process.
+- node : 32 bit ngẫu nhiên mỗi process (sinh lại sau fork) → các uvicorn
+         worker không đụng nhau.
+- seq  : bộ đếm tăng dần của process (itertools.count, next() là nguyên tử
+         dưới GIL) → không cần lock, trong cùng 1 ms vẫn khác nhau.
+
+Trong 1 process ID tăng nghiêm ngặt; giữa các process sắp xếp theo ms.
+"""
+
+import itertools
+import os
+import secrets
+import time
+from datetime import datetime, timezone
+
+_TS_HEX = 11     # đủ tới năm ~2527
+_NODE_HEX = 8
+_SEQ_HEX = 10
+
+
+def _reseed() -> None:
+    global _NODE, _SEQ, _WALL_MS, _MONO_NS
+    _NODE = f"{secrets.randbits(4 * _NODE_HEX):0{_NODE_HEX}X}"
+    _SEQ = itertools.count()
+    _WALL_MS = time.time_ns() // 1_000_000
+    _MONO_NS = time.monotonic_ns()
+
+
+_reseed()
+if hasattr(os, "register_at_fork"):
+    # process con sau fork (gunicorn / multiprocessing) phải có node + seq riêng
+    os.register_at_fork(after_in_child=_reseed)
+
+
+def new_id(prefix: str, _mono=time.monotonic_ns, _next=next) -> str:
+    # độ rộng viết cứng (011X / 010X = _TS_HEX / _SEQ_HEX) cho nhanh – hàm nằm trên hot path
+    return f"{prefix}{_WALL_MS + (_mono() - _MONO_NS) // 1_000_000:011X}{_NODE}{_next(_SEQ):010X}"
+
+
+def id_timestamp(value: str, prefix: str = "") -> datetime:
+    """Thời điểm (UTC) ghi trong ID."""
+    ms = int(value[len(prefix):len(prefix) + _TS_HEX], 16)
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc)
@@ -0,0 +1,107 @@
+"""
+Thống kê realtime từ traffic chấm điểm (tumbling window 1 phút / 1 giờ / 1 ngày).
+
+Mỗi request được cộng dồn O(1) vào window hiện tại của từng độ dài; khi hết
+window, window đó được "đóng" thành previous và mở window mới. Không cần job
+batch đọc lại log.
+"""
+
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Sequence
+
+# tên window -> độ dài (giây)
+DEFAULT_WINDOWS = {"1m": 60, "1h": 3600, "1d": 86400}
+
+
+class _Window:
+    __slots__ = ("start", "count", "pd_sum", "buckets", "grades")
+
+    def __init__(self, start: float, n_buckets: int):
+        self.start = start
+        self.count = 0
+        self.pd_sum = 0.0
+        self.buckets = [0] * n_buckets
+        self.grades: Dict[str, int] = {}
+
+
+class TumblingWindow:
+    """1 độ dài window: giữ window hiện tại + window vừa đóng."""
+
+    def __init__(self, size_seconds: int, n_buckets: int):
+        self.size = size_seconds
+        self.n_buckets = n_buckets
+        self.current: Optional[_Window] = None
+        self.previous: Optional[_Window] = None
+
+    def _roll(self, now: float) -> _Window:
+        start = now - (now % self.size)  # căn theo mốc epoch (đầu phút / giờ / ngày UTC)
+        cur = self.current
+        if cur is None or cur.start != start:
+            if cur is not None and cur.start + self.size == start:
+                self.previous = cur
+            elif cur is not None:
+                self.previous = None  # có khoảng trống không traffic → window trước = rỗng
+            cur = self.current = _Window(start, self.n_buckets)
+        return cur
+
+    def record(self, now: float, pd: float, bucket: int, grade: str) -> None:
+        w = self._roll(now)
+        w.count += 1
+        w.pd_sum += pd
+        w.buckets[bucket] += 1
+        w.grades[grade] = w.grades.get(grade, 0) + 1
+
+
+class LiveDashboard:
+    """Bộ tổng hợp cho /api/v1/dashboard/live (an toàn giữa các thread)."""
+
+    def __init__(self, bucket_labels: Sequence[str], windows: Optional[Dict[str, int]] = None):
+        self.bucket_labels = list(bucket_labels)
+        self._windows = {
+            name: TumblingWindow(size, len(self.bucket_labels))
+            for name, size in (windows or DEFAULT_WINDOWS).items()
+        }
+        self._lock = threading.Lock()
+
+    def record(self, pd: float, bucket: int, grade: Optional[str], now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        grade = grade or "unknown"
+        with self._lock:
+            for w in self._windows.values():
+                w.record(now, pd, bucket, grade)
+
+    def record_many(self, pds: Sequence[float], buckets: Sequence[int], grades: Sequence[Optional[str]]) -> None:
+        now = time.time()
+        with self._lock:
+            for pd, bucket, grade in zip(pds, buckets, grades):
+                grade = grade or "unknown"
+                for w in self._windows.values():
+                    w.record(now, pd, bucket, grade)
+
+    def _window_dict(self, name: str, size: int, w: Optional[_Window], start: float) -> Dict[str, Any]:
+        if w is None:
+            w = _Window(start, len(self.bucket_labels))
+        return {
+            "window": name,
+            "start": datetime.fromtimestamp(w.start, tz=timezone.utc),
+            "end": datetime.fromtimestamp(w.start + size, tz=timezone.utc),
+            "count": w.count,
+            "mean_pd": (w.pd_sum / w.count) if w.count else 0.0,
+            "grade_bucket_distribution": dict(zip(self.bucket_labels, w.buckets)),
+            "grade_counts": dict(sorted(w.grades.items())),
+        }
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        now = time.time()
+        out: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            for name, tw in self._windows.items():
+                cur = tw._roll(now)
+                out[name] = {
+                    "current": self._window_dict(name, tw.size, cur, cur.start),
+                    "previous": self._window_dict(name, tw.size, tw.previous, cur.start - tw.size),
+                }
+        return out
+
@@ -1,18 +1,60 @@
+import gc
+import hmac
+import json
 import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from json.encoder import encode_basestring_ascii
+from typing import Any, List, Dict, Literal, Optional, Tuple
 
 import numpy as np
 import pandas as pd
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, TypeAdapter, ValidationError
 from sklearn.compose import ColumnTransformer
 from sklearn.impute import SimpleImputer
 from sklearn.linear_model import LogisticRegression
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import OneHotEncoder, StandardScaler
 
+from audit_index import AuditIndex
+from audit_ledger import AuditLedger, AuditUnavailable, verify as verify_audit_log
+from compiled_scorer import (
+    CompiledScorer,
+    PipelineScorer,
+    check_parity,
+    compile_pipeline,
+    make_probe_frame,
+)
+from consent_expiry import ConsentExpiry
+from consent_index import ActiveConsentIndex
+from complaint_store import ComplaintStore
+from consent_store import ConsentChangeFeed, ConsentStore
+from data_cache import NUM_DTYPE, PreparedData, open_prepared
+from fast_json import HAVE_ORJSON, FastJSONResponse, Fragments, dumps, quote
+from ids import new_id
+from live_stats import LiveDashboard
+from micro_batcher import MicroBatcher
+from pb025_api import synthetic_score_many
+from pseudonym import PseudonymVault, Pseudonymizer
+from model_store import (
+    MODEL_STORE_DIR,
+    file_fingerprint,
+    latest_version,
+    load_artifact,
+    new_version,
+    save_artifact,
+    train_lock,
+)
+from rule_engine import load_rules
+from score_cache import ScoreCache
+from shadow_scoring import DisagreementStats, ShadowScorer
+from streaming_train import train_streaming
+
 # =====================================================================
 # 1. Config
 # =====================================================================
@@ -24,6 +66,48 @@ DATA_TEST_PATH = os.getenv("DATA_TEST_PATH", "data/loan_2019_20.csv")
 MAX_TRAIN_ROWS = int(os.getenv("MAX_TRAIN_ROWS", "50000"))
 MAX_TEST_ROWS = int(os.getenv("MAX_TEST_ROWS", "30000"))
 
+# Cache dạng cột (memory-map) cho dữ liệu đã chuẩn hoá; DATA_CACHE=0 để đọc thẳng CSV
+USE_DATA_CACHE = os.getenv("DATA_CACHE", "1") == "1"
+
+# Chế độ train streaming (out-of-core): số dòng mỗi chunk khi đọc CSV
+TRAIN_CHUNKSIZE = int(os.getenv("TRAIN_CHUNKSIZE", "200000"))
+
+# Mặc định API chỉ load artifact train sẵn qua CLI train_pb025_model.py.
+# MODEL_TRAIN_IF_MISSING=1: store trống thì train 1 lần lúc khởi động (dưới train_lock)
+MODEL_TRAIN_IF_MISSING = os.getenv("MODEL_TRAIN_IF_MISSING", "0") == "1"
+
+# Sai lệch P(bad) tối đa cho phép giữa compiled scorer và sklearn Pipeline
+SCORER_PARITY_TOL = float(os.getenv("SCORER_PARITY_TOL", "1e-9"))
+
+# Micro-batching cho /api/v1/score: gom request trong cửa sổ N ms hoặc tới khi đủ M hồ sơ
+SCORE_MICROBATCH = os.getenv("SCORE_MICROBATCH", "1") == "1"
+SCORE_BATCH_WINDOW_MS = float(os.getenv("SCORE_BATCH_WINDOW_MS", "2"))
+SCORE_BATCH_MAX = int(os.getenv("SCORE_BATCH_MAX", "64"))
+
+# Cache kết quả /api/v1/score (LRU + TTL); SCORE_CACHE_SIZE=0 để tắt
+SCORE_CACHE_SIZE = int(os.getenv("SCORE_CACHE_SIZE", "100000"))
+SCORE_CACHE_TTL_S = float(os.getenv("SCORE_CACHE_TTL_S", "300"))
+
+# Số hồ sơ tối đa trong 1 lần gọi /api/v1/score/batch
+MAX_BATCH_ITEMS = int(os.getenv("MAX_BATCH_ITEMS", "20000"))
+
+# Shadow scoring: engine synthetic (pb025_api.py) chấm lại traffic chấm điểm ngoài
+# critical path để so PD / band / policy với model (xem shadow_scoring.py)
+SCORE_SHADOW = os.getenv("SCORE_SHADOW", "0") == "1"
+SHADOW_SAMPLE = float(os.getenv("SHADOW_SAMPLE", "1.0"))          # tỷ lệ request đem so
+SHADOW_QUEUE_MAX = int(os.getenv("SHADOW_QUEUE_MAX", "10000"))     # đầy → bỏ, không chặn
+SHADOW_BATCH_MAX = int(os.getenv("SHADOW_BATCH_MAX", "256"))
+SHADOW_MAX_SHARE = float(os.getenv("SHADOW_MAX_SHARE", "0.05"))    # trần thời gian CPU
+
+# Bắt buộc consent khi chấm điểm: national_id phải có consent active cho bank_code + scope
+CONSENT_ENFORCE = os.getenv("CONSENT_ENFORCE", "0") == "1"
+
+# Số phần tử tối đa trong 1 lần gọi bulk grant / revoke consent
+CONSENT_BULK_MAX = int(os.getenv("CONSENT_BULK_MAX", "200000"))
+
+# Token cho view giám sát được tra ngược pseudonym -> national_id (rỗng = tắt)
+SUPERVISOR_TOKEN = os.getenv("SUPERVISOR_TOKEN", "")
+
 # Những trạng thái loan được coi là "bad"
 BAD_STATUSES = {
     "Charged Off",
@@ -47,6 +131,9 @@ class ScoreRequest(BaseModel):
     grade: Optional[str] = None  # A,B,C...
     home_ownership: Optional[str] = None
     purpose: Optional[str] = None
+    # Dùng khi CONSENT_ENFORCE=1: ngân hàng gọi + phạm vi dữ liệu cần consent
+    bank_code: Optional[str] = None
+    scope: Literal["credit_history", "utility", "income"] = "credit_history"
 
 
 class ScoreResponse(BaseModel):
@@ -58,6 +145,15 @@ class ScoreResponse(BaseModel):
     audit_id: str
 
 
+class ScoreBatchRequest(BaseModel):
+    items: List[ScoreRequest]
+
+
+class ScoreBatchResponse(BaseModel):
+    count: int
+    results: List[ScoreResponse]  # cùng thứ tự với items
+
+
 class ConsentGrantRequest(BaseModel):
     national_id: str
     bank_code: str
@@ -68,7 +164,7 @@ class ConsentGrantRequest(BaseModel):
 
 class Consent(BaseModel):
     consent_id: str
-    national_id: str
+    national_id: Optional[str] = None  # ID do caller gửi; None khi request không mang (revoke)
     bank_code: str
     scope_credit_history: bool
     scope_utility: bool
@@ -76,6 +172,7 @@ class Consent(BaseModel):
     status: str
     granted_at: datetime
     valid_until: datetime
+    citizen_ref: Optional[str] = None  # pseudonym dùng trong store / audit
 
 
 class ComplaintCreate(BaseModel):
@@ -93,6 +190,37 @@ class Complaint(BaseModel):
     status: str
 
 
+class LiveWindow(BaseModel):
+    window: str                # "1m" / "1h" / "1d"
+    start: datetime
+    end: datetime
+    count: int
+    mean_pd: float             # PD % trung bình
+    grade_bucket_distribution: Dict[str, int]
+    grade_counts: Dict[str, int]
+
+
+class LiveWindowPair(BaseModel):
+    current: LiveWindow        # window đang chạy
+    previous: LiveWindow       # window vừa đóng
+
+
+class LiveDashboardSummary(BaseModel):
+    generated_at: datetime
+    windows: Dict[str, LiveWindowPair]
+
+
+class AuditLogPage(BaseModel):
+    count: int
+    items: List[Dict[str, Any]]
+    next_cursor: Optional[int] = None
+
+
+class ModelInfo(BaseModel):
+    version: str
+    manifest: Dict[str, Any]
+
+
 class DashboardSummary(BaseModel):
     train_total: int
     train_bad_rate: float
@@ -102,17 +230,47 @@ class DashboardSummary(BaseModel):
 
 
 # =====================================================================
-# 3. In-memory “database” cho demo consent / complaint
+# 3. Lưu trữ consent / complaint (SQLite dùng chung giữa các worker, xem state_db.py)
 # =====================================================================
 
-CONSENTS: Dict[str, List[Consent]] = {}
-COMPLAINTS: Dict[str, List[Complaint]] = {}
+# national_id không lưu thô: consent / complaint / audit / index consent đều
+# khoá theo pseudonym HMAC (xem pseudonym.py). citizen_ref chỉ băm (chấm điểm,
+# tra cứu); chỉ grant consent / tạo khiếu nại mới enroll vào vault tra ngược.
+PSEUDONYMIZER = Pseudonymizer(vault=PseudonymVault())
+citizen_ref = PSEUDONYMIZER.pseudonymize
+
+CONSENT_STORE = ConsentStore()
+CONSENT_EXPIRY = ConsentExpiry(CONSENT_STORE)
+CONSENT_INDEX = ActiveConsentIndex()
+CONSENT_FEED = ConsentChangeFeed(CONSENT_STORE)
+COMPLAINT_STORE = ComplaintStore()
+
+# Audit ledger append-only (data/audit_log.jsonl, xem audit_ledger.py)
+AUDIT_LEDGER = AuditLedger()
+# index offset / thời gian cạnh file log (<log>.index.db, xem audit_index.py)
+AUDIT_INDEX = AuditIndex(AUDIT_LEDGER.path)
+AUDIT_QUERY_MAX = int(os.getenv("AUDIT_QUERY_MAX", "1000"))
+
+
+def audit_consent(action: str, consent: Dict[str, Any]) -> None:
+    AUDIT_LEDGER.append(
+        action,
+        audit_id=generate_audit_id(),
+        national_id=consent["national_id"],
+        bank_code=consent["bank_code"],
+        consent_id=consent["consent_id"],
+        status=consent["status"],
+        valid_until=consent["valid_until"],
+    )
 
 # =====================================================================
 # 4. ML: train model từ dữ liệu thật
 # =====================================================================
 
-MODEL: Optional[Pipeline] = None
+# Scorer phục vụ hot path (CompiledScorer, hoặc PipelineScorer nếu parity lỗi)
+SCORER = None
+MODEL_VERSION: Optional[str] = None
+MODEL_MANIFEST: Optional[Dict[str, Any]] = None
 
 FEATURE_NUM = [
     "loan_amnt",
@@ -136,62 +294,175 @@ FEATURE_CAT = [
     "purpose",
 ]
 
+# Cột gốc trong CSV LendingClub cần cho train (term/int_rate/revol_util được parse lại)
+RAW_USECOLS = [
+    "loan_amnt",
+    "term",
+    "int_rate",
+    "installment",
+    "annual_inc",
+    "dti",
+    "delinq_2yrs",
+    "inq_last_6mths",
+    "open_acc",
+    "pub_rec",
+    "revol_bal",
+    "revol_util",
+    "total_acc",
+    "grade",
+    "home_ownership",
+    "purpose",
+    "loan_status",
+]
+
 DASHBOARD_CACHE: Optional[DashboardSummary] = None
 
 
 def generate_consent_id() -> str:
-    return "CON-" + datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+    return new_id("CON-")
 
 
 def generate_audit_id() -> str:
-    return "A-" + datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+    return new_id("A-")
 
 
 def generate_ticket_id() -> str:
-    return "TKT-" + datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+    return new_id("TKT-")
+
+
+def _parse_unique_tokens(col: pd.Series, parse, dtype: str = NUM_DTYPE) -> np.ndarray:
+    """Parse cột chuỗi LendingClub → mảng `dtype` chỉ trên các giá trị distinct.
+
+    Cột term / int_rate / revol_util chỉ có vài trăm giá trị khác nhau trên hàng
+    triệu dòng: factorize (hash, không regex) rồi parse phần unique và tra bảng
+    theo mã – không tạo mảng string tạm cỡ cả cột.
+
+    dtype theo cache cột (data_cache.NUM_DTYPE): mặc định float64 để "7.97%"
+    ra đúng giá trị model / CompiledScorer đã train và kiểm parity;
+    DATA_CACHE_FLOAT32=1 → float32 (nửa bộ nhớ, chấp nhận sai số làm tròn).
+    """
+    if pd.api.types.is_numeric_dtype(col.dtype):
+        return col.to_numpy(dtype=dtype)
+    codes, uniques = pd.factorize(col, use_na_sentinel=True)
+    parsed = parse(pd.Series(np.asarray(uniques, dtype=object)).astype(str))
+    lut = np.append(parsed.to_numpy(dtype=dtype), np.array([np.nan], dtype=dtype))  # mã -1 → NaN
+    return lut[codes]
+
+
+def _parse_term(uniques: pd.Series) -> pd.Series:
+    # " 36 months" -> 36
+    return pd.to_numeric(uniques.str.extract(r"(\d+)", expand=False), errors="coerce")
+
+
+def _parse_percent(uniques: pd.Series) -> pd.Series:
+    # "7.97%" -> 7.97
+    return pd.to_numeric(uniques.str.replace("%", "", regex=False).str.strip(), errors="coerce")
+
+
+# Đọc các cột cần parse dạng category để read_csv tự gom giá trị trùng
+PARSE_DTYPES = {"term": "category", "int_rate": "category", "revol_util": "category"}
 
 
 def _prepare_df_basic(df: pd.DataFrame) -> pd.DataFrame:
     """Chuẩn hóa các cột cần thiết (term, int_rate, revol_util...)."""
     df = df.copy()
+    n = len(df)
 
     # term: "36 months" -> 36
     if "term" in df.columns:
-        df["term_months"] = (
-            df["term"].astype(str).str.extract(r"(\d+)").astype(float)
-        )
+        df["term_months"] = _parse_unique_tokens(df["term"], _parse_term)
     else:
-        df["term_months"] = np.nan
+        df["term_months"] = np.full(n, np.nan)
 
     # int_rate: "7.97%" -> 7.97
     if "int_rate" in df.columns:
-        df["int_rate_num"] = (
-            df["int_rate"].astype(str)
-            .str.replace("%", "", regex=False)
-            .astype(float)
-        )
+        df["int_rate_num"] = _parse_unique_tokens(df["int_rate"], _parse_percent)
     else:
-        df["int_rate_num"] = np.nan
+        df["int_rate_num"] = np.full(n, np.nan)
 
     # revol_util: "53.3%" -> 53.3
     if "revol_util" in df.columns:
-        df["revol_util_num"] = (
-            df["revol_util"].astype(str)
-            .str.replace("%", "", regex=False)
-            .astype(float)
-        )
+        df["revol_util_num"] = _parse_unique_tokens(df["revol_util"], _parse_percent)
     else:
-        df["revol_util_num"] = np.nan
+        df["revol_util_num"] = np.full(n, np.nan)
 
     return df
 
 
-def load_and_train_model() -> Pipeline:
+def open_prepared_data(path: str) -> PreparedData:
+    """Cache cột của file CSV (build 1 lần, sau đó chỉ memory-map)."""
+    return open_prepared(
+        path,
+        RAW_USECOLS,
+        FEATURE_NUM,
+        FEATURE_CAT + ["loan_status"],
+        _prepare_df_basic,
+        chunksize=TRAIN_CHUNKSIZE,
+    )
+
+
+def read_prepared(path: str, nrows: Optional[int] = None) -> pd.DataFrame:
+    """nrows dòng đầu của file, đã qua _prepare_df_basic (qua cache cột nếu bật)."""
+    if USE_DATA_CACHE:
+        return open_prepared_data(path).frame(stop=nrows)
+    return _prepare_df_basic(pd.read_csv(path, nrows=nrows, dtype=PARSE_DTYPES))
+
+
+def summarize_labels(loan_status: pd.Series, grade: Optional[pd.Series]) -> Dict[str, Any]:
+    """total / bad_rate / grade_breakdown (vector hoá, không groupby từng nhóm)."""
+    labelled = loan_status.notna().to_numpy()
+    y = loan_status[labelled].isin(BAD_STATUSES).to_numpy()
+    total = int(labelled.sum())
+
+    grade_breakdown: Dict[str, Dict[str, float]] = {}
+    if grade is not None:
+        codes, grades = pd.factorize(grade[labelled], sort=True)  # -1 = thiếu grade
+        hit = codes >= 0
+        counts = np.bincount(codes[hit], minlength=len(grades))
+        bads = np.bincount(codes[hit], weights=y[hit], minlength=len(grades))
+        for g, cnt, bad in zip(grades, counts, bads):
+            grade_breakdown[str(g)] = {
+                "count": int(cnt),
+                "bad_rate": float(bad / cnt) if cnt > 0 else 0.0,
+            }
+
+    return {
+        "total": total,
+        "bad_rate": float(y.mean()) if total > 0 else 0.0,
+        "grade_breakdown": grade_breakdown,
+    }
+
+
+def summarize_file(path: str, nrows: Optional[int]) -> Dict[str, Any]:
+    """Chỉ đọc loan_status + grade của file (dùng cho tập test ở thread song song)."""
+    if not os.path.exists(path):
+        return summarize_labels(pd.Series([], dtype=object), None)
+    if USE_DATA_CACHE:
+        df = open_prepared_data(path).frame(stop=nrows, columns=["loan_status", "grade"])
+    else:
+        df = pd.read_csv(
+            path,
+            nrows=nrows,
+            usecols=lambda c: c in ("loan_status", "grade"),
+            dtype="category",
+        )
+    return summarize_labels(df["loan_status"], df["grade"] if "grade" in df.columns else None)
+
+
+def data_fingerprint(path: str) -> Dict[str, Any]:
+    """size/mtime/sha256 của file; lấy lại từ cache cột nếu có để khỏi hash lại cả file."""
+    if USE_DATA_CACHE:
+        return open_prepared_data(path).manifest["source"]
+    return file_fingerprint(path)
+
+
+def load_and_train_model() -> Tuple[Pipeline, Dict[str, Any]]:
+    """Train Pipeline; tổng hợp dashboard của tập train ngay trên cùng DataFrame."""
     print(f"[ML] Loading train data from {DATA_TRAIN_PATH} ...")
-    df = pd.read_csv(DATA_TRAIN_PATH, nrows=MAX_TRAIN_ROWS)
-    df = _prepare_df_basic(df)
+    df = read_prepared(DATA_TRAIN_PATH, nrows=MAX_TRAIN_ROWS)
 
     # target y: 1 = xấu (bad), 0 = tốt
+    train_summary = summarize_labels(df["loan_status"], df.get("grade"))
     df = df[df["loan_status"].notna()]
     df["y_bad"] = df["loan_status"].isin(BAD_STATUSES).astype(int)
 
@@ -236,124 +507,358 @@ def load_and_train_model() -> Pipeline:
     print("[ML] Training model...")
     pipe.fit(X, y)
     print("[ML] Training done.")
-    return pipe
+    return pipe, {"train_rows": len(X), "summary": train_summary}
 
 
-def build_dashboard_summary(model: Pipeline) -> DashboardSummary:
-    """Tạo summary cho màn hình giám sát (train + test)."""
-    print("[ML] Building dashboard summary...")
-    df_train = pd.read_csv(DATA_TRAIN_PATH, nrows=MAX_TRAIN_ROWS)
-    df_test = pd.read_csv(DATA_TEST_PATH, nrows=MAX_TEST_ROWS)
+def build_dashboard_summary(train: Dict[str, Any], test: Dict[str, Any]) -> DashboardSummary:
+    """Tạo summary cho màn hình giám sát (train + test) từ kết quả summarize_labels."""
+    return DashboardSummary(
+        train_total=train["total"],
+        train_bad_rate=train["bad_rate"],
+        test_total=test["total"],
+        test_bad_rate=test["bad_rate"],
+        grade_breakdown=train["grade_breakdown"],
+    )
 
-    def label_bad(df):
-        df = df[df["loan_status"].notna()].copy()
-        df["y_bad"] = df["loan_status"].isin(BAD_STATUSES).astype(int)
-        return df
 
-    df_train = label_bad(df_train)
-    df_test = label_bad(df_test)
+# Ngưỡng PD (%) → grade bucket, dùng np.searchsorted cho cả batch
+GRADE_BUCKET_EDGES = np.array([5.0, 15.0, 30.0])
+GRADE_BUCKET_LABELS = [
+    "Hạng 01 - Rất tốt / Grade 01 - Excellent",
+    "Hạng 02 - Khá / Grade 02 - Very good",
+    "Hạng 03 - Tốt / Grade 03 - Good",
+    "Hạng 04 - Rủi ro / Grade 04 - Risky",
+]
 
-    train_total = len(df_train)
-    test_total = len(df_test)
-    train_bad_rate = float(df_train["y_bad"].mean()) if train_total > 0 else 0.0
-    test_bad_rate = float(df_test["y_bad"].mean()) if test_total > 0 else 0.0
+GRADE_BUCKET_INDEX = {label: i for i, label in enumerate(GRADE_BUCKET_LABELS)}
 
-    grade_breakdown: Dict[str, Dict[str, float]] = {}
-    for grade, group in df_train.groupby("grade"):
-        grade_breakdown[str(grade)] = {
-            "count": int(len(group)),
-            "bad_rate": float(group["y_bad"].mean()) if len(group) > 0 else 0.0,
-        }
+# Factor song ngữ: (khi điều kiện sai, khi điều kiện đúng)
+FACTOR_DTI_VI = (
+    "Tỷ lệ nợ / thu nhập (DTI) ở mức chấp nhận được.",
+    "Tỷ lệ nợ / thu nhập (DTI) đang khá cao (> 40%).",
+)
+FACTOR_DTI_EN = (
+    "Debt-to-income ratio is acceptable.",
+    "Debt-to-income ratio is relatively high (> 40%).",
+)
+FACTOR_AMOUNT_VI = (
+    "Khoản vay ở mức phổ biến cho khách hàng bán lẻ.",
+    "Quy mô khoản vay lớn, cần xem xét kỹ dòng tiền trả nợ.",
+)
+FACTOR_AMOUNT_EN = (
+    "Loan amount is within typical retail range.",
+    "Requested loan amount is large; repayment capacity should be carefully reviewed.",
+)
+FACTOR_TENOR_VI = (
+    "Thời hạn vay trung bình (≤ 36 tháng).",
+    "Thời hạn vay dài, rủi ro thu nhập dài hạn cao hơn.",
+)
+FACTOR_TENOR_EN = (
+    "Medium-term loan tenure (≤ 36 months).",
+    "Long loan tenure, higher long-term income risk.",
+)
 
-    summary = DashboardSummary(
-        train_total=train_total,
-        train_bad_rate=train_bad_rate,
-        test_total=test_total,
-        test_bad_rate=test_bad_rate,
-        grade_breakdown=grade_breakdown,
+# 8 tổ hợp (dti_high, amount_large, tenor_long) -> (factors_vi, factors_en), chỉ số = d*4 + a*2 + t.
+# List dựng 1 lần, dùng chung cho mọi ScoreResponse (không sửa tại chỗ).
+SCORE_FACTORS = [
+    (
+        [FACTOR_DTI_VI[d], FACTOR_AMOUNT_VI[a], FACTOR_TENOR_VI[t]],
+        [FACTOR_DTI_EN[d], FACTOR_AMOUNT_EN[a], FACTOR_TENOR_EN[t]],
     )
-    print("[ML] Dashboard summary ready.")
-    return summary
+    for d in (0, 1)
+    for a in (0, 1)
+    for t in (0, 1)
+]
 
 
-def score_one(req: ScoreRequest, model: Pipeline) -> ScoreResponse:
-    """Convert request -> features giống train, dự đoán PD."""
-    import math
-
-    row = {
-        "loan_amnt": req.loan_amount,
-        "term_months": req.loan_tenor_months,
-        "int_rate_num": np.nan,
-        "installment": np.nan,
-        "annual_inc": req.annual_income,
-        "dti": req.dti,
-        "delinq_2yrs": np.nan,
-        "inq_last_6mths": np.nan,
-        "open_acc": np.nan,
-        "pub_rec": np.nan,
-        "revol_bal": np.nan,
-        "revol_util_num": np.nan,
-        "total_acc": np.nan,
-        "grade": req.grade,
-        "home_ownership": req.home_ownership,
-        "purpose": req.purpose,
+def _optional_floats(values) -> np.ndarray:
+    return np.array([np.nan if v is None else v for v in values], dtype=float)
+
+
+def requests_to_arrays(reqs: List[ScoreRequest]):
+    """Request → (ma trận numeric theo FEATURE_NUM, list cột categorical theo FEATURE_CAT)."""
+    n = len(reqs)
+    num = np.full((n, len(FEATURE_NUM)), np.nan)
+    num[:, FEATURE_NUM.index("loan_amnt")] = [r.loan_amount for r in reqs]
+    num[:, FEATURE_NUM.index("term_months")] = [r.loan_tenor_months for r in reqs]
+    num[:, FEATURE_NUM.index("annual_inc")] = _optional_floats(r.annual_income for r in reqs)
+    num[:, FEATURE_NUM.index("dti")] = _optional_floats(r.dti for r in reqs)
+    cats = [
+        [r.grade for r in reqs],
+        [r.home_ownership for r in reqs],
+        [r.purpose for r in reqs],
+    ]
+    return num, cats
+
+
+def build_scorer(model: Pipeline):
+    """Compile Pipeline thành scorer NumPy và kiểm tra parity trước khi phục vụ."""
+    scorer = compile_pipeline(model, FEATURE_NUM, FEATURE_CAT)
+    max_diff = check_parity(scorer, model, make_probe_frame(scorer))
+    if max_diff > SCORER_PARITY_TOL:
+        print(
+            f"[ML] WARNING: compiled scorer parity failed (max |dPD| = {max_diff:.3e}), "
+            "fallback to sklearn Pipeline."
+        )
+        return PipelineScorer(model, FEATURE_NUM, FEATURE_CAT)
+    print(f"[ML] Compiled scorer ready (parity max |dPD| = {max_diff:.3e}).")
+    return scorer
+
+
+def train_and_save_artifact(
+    activate: bool = True,
+    streaming: bool = False,
+    chunksize: int = TRAIN_CHUNKSIZE,
+    epochs: int = 1,
+) -> str:
+    """Train từ CSV, build dashboard rồi ghi artifact version mới vào model store.
+
+    streaming=True: train out-of-core trên toàn bộ file (SGD + partial_fit),
+    không giới hạn MAX_TRAIN_ROWS.
+    """
+    # tập test chỉ phục vụ dashboard → đọc ở thread song song trong lúc train
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        test_job = pool.submit(
+            lambda: (
+                data_fingerprint(DATA_TEST_PATH) if os.path.exists(DATA_TEST_PATH) else None,
+                summarize_file(DATA_TEST_PATH, MAX_TEST_ROWS),
+            )
+        )
+        train_fp = data_fingerprint(DATA_TRAIN_PATH)
+
+        if streaming:
+            model = None
+            chunk_source, prepare = None, _prepare_df_basic
+            if USE_DATA_CACHE:
+                data = open_prepared_data(DATA_TRAIN_PATH)
+
+                def chunk_source():
+                    return data.iter_frames(chunksize)
+
+                def prepare(df):
+                    return df  # cache đã chuẩn hoá sẵn
+
+            scorer, train_info = train_streaming(
+                DATA_TRAIN_PATH,
+                RAW_USECOLS,
+                FEATURE_NUM,
+                FEATURE_CAT,
+                BAD_STATUSES,
+                prepare,
+                chunksize=chunksize,
+                epochs=epochs,
+                chunk_source=chunk_source,
+                breakdown_feature="grade",
+            )
+            breakdown = train_info.pop("breakdown")
+            train_rows = train_info["train_rows"]
+            train_summary = {
+                "total": train_rows,
+                "bad_rate": train_info["train_bad"] / train_rows if train_rows else 0.0,
+                "grade_breakdown": {
+                    str(g): {"count": cnt, "bad_rate": bad / cnt if cnt else 0.0}
+                    for g, (cnt, bad) in sorted(breakdown.items())
+                },
+            }
+            model_info = {
+                "model_type": "sklearn.SGDClassifier(log_loss)",
+                "train_mode": "streaming",
+                "streaming": train_info,
+            }
+        else:
+            model, train_info = load_and_train_model()
+            train_rows = train_info["train_rows"]
+            train_summary = train_info["summary"]
+            scorer = build_scorer(model)
+            model_info = {
+                "model_type": "sklearn.LogisticRegression",
+                "train_mode": "in_memory",
+                "max_train_rows": MAX_TRAIN_ROWS,
+            }
+
+        test_fp, test_summary = test_job.result()
+
+    dashboard = build_dashboard_summary(train_summary, test_summary)
+    print("[ML] Dashboard summary ready.")
+
+    manifest = {
+        **model_info,
+        "feature_num": FEATURE_NUM,
+        "feature_cat": FEATURE_CAT,
+        "bad_statuses": sorted(BAD_STATUSES),
+        "train_rows": train_rows,
+        "train_data": train_fp,
+        "test_data": test_fp,
     }
+    version = save_artifact(
+        new_version(train_fp["sha256"], "sgd" if model_info["train_mode"] == "streaming" else "lr"),
+        scorer,
+        model,
+        dashboard.model_dump(),
+        manifest,
+        activate=activate,
+    )
+    print(f"[ML] Saved model artifact {version} to {MODEL_STORE_DIR}.")
+    return version
+
+
+def load_model_state(version: Optional[str] = None) -> bool:
+    """Load artifact (mặc định LATEST) vào state toàn cục của API."""
+    global SCORER, DASHBOARD_CACHE, MODEL_VERSION, MODEL_MANIFEST
+
+    artifact = load_artifact(version)
+    if artifact is None:
+        print(
+            f"[ML] No model artifact in {MODEL_STORE_DIR}. "
+            "Run `python train_pb025_model.py` to train one."
+        )
+        return False
+
+    SCORER = artifact.scorer
+    DASHBOARD_CACHE = (
+        DashboardSummary(**artifact.dashboard) if artifact.dashboard is not None else None
+    )
+    MODEL_VERSION = artifact.version
+    MODEL_MANIFEST = artifact.manifest
+    SCORE_CACHE.clear()
+    print(f"[ML] Loaded model artifact {artifact.version}.")
+    return True
 
-    X = pd.DataFrame([row], columns=FEATURE_NUM + FEATURE_CAT)
-    proba = model.predict_proba(X)[0]  # [p_good, p_bad]
-    pd_bad = float(proba[1]) * 100.0
+
+def score_batch(reqs: List[ScoreRequest], scorer: CompiledScorer) -> List[ScoreResponse]:
+    """Chấm điểm cả batch bằng 1 lần gọi scorer, kết quả giữ đúng thứ tự input."""
+    if not reqs:
+        return []
+
+    num, cats = requests_to_arrays(reqs)
+    p_bad = scorer.predict_proba_bad(num, cats)
+    pd_bad = p_bad * 100.0
 
     # score_raw = logit(p_bad)
     eps = 1e-6
-    p = min(max(proba[1], eps), 1 - eps)
-    score_raw = float(math.log(p / (1 - p)))
+    p = np.clip(p_bad, eps, 1 - eps)
+    score_raw = np.log(p / (1 - p))
 
     # Map PD → grade bucket
-    if pd_bad < 5:
-        grade_bucket = "Hạng 01 - Rất tốt / Grade 01 - Excellent"
-    elif pd_bad < 15:
-        grade_bucket = "Hạng 02 - Khá / Grade 02 - Very good"
-    elif pd_bad < 30:
-        grade_bucket = "Hạng 03 - Tốt / Grade 03 - Good"
-    else:
-        grade_bucket = "Hạng 04 - Rủi ro / Grade 04 - Risky"
+    bucket_idx = np.searchsorted(GRADE_BUCKET_EDGES, pd_bad, side="right")
+
+    # NaN so sánh luôn False → dti thiếu được coi là chấp nhận được
+    dti_high = num[:, FEATURE_NUM.index("dti")] > 40
+    amount_large = num[:, FEATURE_NUM.index("loan_amnt")] > 500_000_000
+    tenor_long = num[:, FEATURE_NUM.index("term_months")] > 36
+    factor_idx = (dti_high * 4 + amount_large * 2 + tenor_long).tolist()
+
+    # giá trị đã đúng kiểu (float / str / list[str]) → model_construct, bỏ validate
+    results: List[ScoreResponse] = []
+    for raw, pd_i, bucket, f in zip(score_raw.tolist(), pd_bad.tolist(), bucket_idx.tolist(), factor_idx):
+        factors_vi, factors_en = SCORE_FACTORS[f]
+        results.append(
+            ScoreResponse.model_construct(
+                score_raw=raw,
+                pd=pd_i,
+                grade_bucket=GRADE_BUCKET_LABELS[bucket],
+                factors_vi=factors_vi,
+                factors_en=factors_en,
+                audit_id=generate_audit_id(),
+            )
+        )
+    return results
 
-    factors_vi: List[str] = []
-    factors_en: List[str] = []
 
-    if req.dti is not None and req.dti > 40:
-        factors_vi.append("Tỷ lệ nợ / thu nhập (DTI) đang khá cao (> 40%).")
-        factors_en.append("Debt-to-income ratio is relatively high (> 40%).")
-    else:
-        factors_vi.append("Tỷ lệ nợ / thu nhập (DTI) ở mức chấp nhận được.")
-        factors_en.append("Debt-to-income ratio is acceptable.")
+def score_one(req: ScoreRequest, scorer: CompiledScorer) -> ScoreResponse:
+    """Convert request -> features giống train, dự đoán PD."""
+    return score_batch([req], scorer)[0]
 
-    if req.loan_amount > 500_000_000:
-        factors_vi.append("Quy mô khoản vay lớn, cần xem xét kỹ dòng tiền trả nợ.")
-        factors_en.append(
-            "Requested loan amount is large; repayment capacity should be carefully reviewed."
-        )
-    else:
-        factors_vi.append("Khoản vay ở mức phổ biến cho khách hàng bán lẻ.")
-        factors_en.append("Loan amount is within typical retail range.")
 
-    if req.loan_tenor_months > 36:
-        factors_vi.append("Thời hạn vay dài, rủi ro thu nhập dài hạn cao hơn.")
-        factors_en.append("Long loan tenure, higher long-term income risk.")
-    else:
-        factors_vi.append("Thời hạn vay trung bình (≤ 36 tháng).")
-        factors_en.append("Medium-term loan tenure (≤ 36 months).")
-
-    return ScoreResponse(
-        score_raw=score_raw,
-        pd=pd_bad,
-        grade_bucket=grade_bucket,
-        factors_vi=factors_vi,
-        factors_en=factors_en,
-        audit_id=generate_audit_id(),
+def _score_batch_current(reqs: List[ScoreRequest]) -> List[ScoreResponse]:
+    # đọc SCORER lúc chạy batch để /api/v1/model/reload có hiệu lực ngay
+    return score_batch(reqs, SCORER)
+
+
+SCORE_BATCHER = MicroBatcher(
+    _score_batch_current,
+    max_batch=SCORE_BATCH_MAX,
+    window_ms=SCORE_BATCH_WINDOW_MS,
+)
+
+SCORE_CACHE = ScoreCache(maxsize=SCORE_CACHE_SIZE, ttl_seconds=SCORE_CACHE_TTL_S)
+
+# Dashboard realtime từ traffic chấm điểm (1 phút / 1 giờ / 1 ngày)
+LIVE_DASHBOARD = LiveDashboard(GRADE_BUCKET_LABELS)
+
+# Shadow: PD của cả 2 engine tra cùng bảng pd_band (band + policy) của bảng luật
+PD_BAND = load_rules()["pd_band"]
+_PD_BAND_POLICY_ID = np.unique(PD_BAND.field("policy"), return_inverse=True)[1]
+SHADOW_STATS = DisagreementStats(PD_BAND.field("band"))
+
+
+def _shadow_compare(items: List[Tuple[ScoreRequest, float]]) -> None:
+    """items = (request, PD % của model) → chấm lại bằng engine synthetic, cộng dồn sai lệch."""
+    primary_pd = np.fromiter((pd for _, pd in items), dtype=np.float64, count=len(items))
+    shadow = synthetic_score_many([req for req, _ in items])
+    primary_band = PD_BAND.indices(primary_pd / 100.0)
+    shadow_band = shadow["band"]
+    SHADOW_STATS.record_many(
+        primary_pd,
+        shadow["pd_12m"] * 100.0,
+        primary_band,
+        shadow_band,
+        _PD_BAND_POLICY_ID[primary_band],
+        _PD_BAND_POLICY_ID[shadow_band],
     )
 
 
+SHADOW = ShadowScorer(
+    _shadow_compare,
+    max_queue=SHADOW_QUEUE_MAX,
+    max_batch=SHADOW_BATCH_MAX,
+    max_share=SHADOW_MAX_SHARE,
+    sample=SHADOW_SAMPLE,
+)
+
+
+def score_cache_key(req: ScoreRequest, model_version: Optional[str]) -> tuple:
+    """Key = các field model dùng (đã chuẩn hoá kiểu) + model version; bỏ national_id."""
+    return (
+        model_version,
+        float(req.loan_amount),
+        int(req.loan_tenor_months),
+        None if req.annual_income is None else float(req.annual_income),
+        None if req.dti is None else float(req.dti),
+        req.grade,
+        req.home_ownership,
+        req.purpose,
+    )
+
+
+# Fallback không có orjson: ghép template, nhãn hạng / danh sách factor đã encode sẵn
+_SCORE_JSON = '{"score_raw":%r,"pd":%r,"grade_bucket":%s,"factors_vi":%s,"factors_en":%s,"audit_id":%s}'
+_SCORE_FRAGMENTS = Fragments([*GRADE_BUCKET_LABELS, *(lst for pair in SCORE_FACTORS for lst in pair)])
+
+
+def encode_score(r: ScoreResponse) -> str:
+    """ScoreResponse → JSON, cùng output với json.dumps của JSONResponse."""
+    frag = _SCORE_FRAGMENTS
+    return _SCORE_JSON % (
+        r.score_raw, r.pd, frag(r.grade_bucket), frag(r.factors_vi), frag(r.factors_en), quote(r.audit_id)
+    )
+
+
+class ScoreJSONResponse(FastJSONResponse):
+    """Response cho /api/v1/score(/batch): encode thẳng ScoreResponse, bỏ bước
+    validate lại + jsonable_encoder của FastAPI (model chỉ gồm str / float / list[str])."""
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, ScoreResponse):
+            return dumps(content.__dict__) if HAVE_ORJSON else encode_score(content).encode("utf-8")
+        if isinstance(content, ScoreBatchResponse):
+            if HAVE_ORJSON:
+                return dumps({"count": content.count, "results": [r.__dict__ for r in content.results]})
+            body = '{"count":%d,"results":[%s]}' % (content.count, ",".join(map(encode_score, content.results)))
+            return body.encode("utf-8")
+        return super().render(content)
+
+
 # =====================================================================
 # 5. FastAPI app + endpoints
 # =====================================================================
@@ -368,21 +873,229 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Khởi động: train model + build dashboard
-MODEL = load_and_train_model()
-DASHBOARD_CACHE = build_dashboard_summary(MODEL)
+# Khởi động: load artifact LATEST; store trống chỉ train khi bật MODEL_TRAIN_IF_MISSING
+if not load_model_state() and MODEL_TRAIN_IF_MISSING:
+    if os.path.exists(DATA_TRAIN_PATH):
+        # --workers N: chỉ 1 worker train, các worker còn lại chờ rồi load bản đó
+        with train_lock():
+            if latest_version() is None:
+                train_and_save_artifact()
+        load_model_state()
+    else:
+        print(f"[ML] WARNING: {DATA_TRAIN_PATH} not found, /api/v1/score unavailable until a model is trained.")
+
+
+def _log_consent_expired(consent: Dict[str, Any]) -> None:
+    print(f"[CONSENT] {consent['consent_id']} expired (valid_until={consent['valid_until']}).")
+    # thread nền, không có request để trả 503 → chờ tới khi queue audit có chỗ
+    while True:
+        try:
+            audit_consent("consent_expire", consent)
+            return
+        except AuditUnavailable:
+            continue
+
+
+CONSENT_INDEX.add_many(CONSENT_STORE.iter_active())
+
+
+def sync_consent_state() -> None:
+    """Áp grant / revoke / expiry do worker khác ghi vào cache của worker này."""
+    changed = CONSENT_FEED.poll()
+    if changed is None:
+        CONSENT_INDEX.rebuild(CONSENT_STORE.iter_active())
+        return
+    for consent in changed:
+        CONSENT_INDEX.apply(consent)
+        if consent["status"] == "active":
+            CONSENT_EXPIRY.schedule(consent["consent_id"], consent["valid_until"])
+
+CONSENT_EXPIRY.add_listener(_log_consent_expired)
+CONSENT_EXPIRY.add_listener(CONSENT_INDEX.remove)
+AUDIT_LEDGER.start()
+CONSENT_EXPIRY.start()
+if SCORE_SHADOW:
+    SHADOW.start()
+
+
+def audit_score(req: ScoreRequest, result: ScoreResponse, wait: bool = True) -> None:
+    append = AUDIT_LEDGER.append if wait else AUDIT_LEDGER.append_nowait
+    append(
+        "score",
+        audit_id=result.audit_id,
+        national_id=citizen_ref(req.national_id),
+        bank_code=req.bank_code,
+        model_version=MODEL_VERSION,
+        pd=result.pd,
+        score_raw=result.score_raw,
+        grade_bucket=result.grade_bucket,
+    )
+
+
+def require_supervisor(token: Optional[str]) -> None:
+    """403 nếu header X-Supervisor-Token không khớp SUPERVISOR_TOKEN (rỗng = tắt hẳn)."""
+    if not SUPERVISOR_TOKEN or not token or not hmac.compare_digest(token.encode(), SUPERVISOR_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Supervisor token required")
+
+
+def require_consent(req: ScoreRequest) -> None:
+    """403 nếu CONSENT_ENFORCE bật mà không có consent active cho (national_id, bank_code, scope)."""
+    if not CONSENT_ENFORCE:
+        return
+    if not req.bank_code:
+        raise HTTPException(status_code=400, detail="bank_code is required when consent is enforced")
+    sync_consent_state()
+    if not CONSENT_INDEX.allows(citizen_ref(req.national_id), req.bank_code, req.scope):
+        raise HTTPException(
+            status_code=403,
+            detail=f"No active '{req.scope}' consent for this national_id and bank {req.bank_code}",
+        )
+
+
+@app.exception_handler(AuditUnavailable)
+def audit_unavailable_handler(request: Request, exc: AuditUnavailable):
+    # không ghi được audit thì không trả kết quả (không bao giờ bỏ bản ghi)
+    return JSONResponse(status_code=503, content={"detail": f"Audit ledger unavailable: {exc}"}, headers={"Retry-After": "1"})
 
 
 @app.get("/health")
 def health():
+    if not AUDIT_LEDGER.healthy():
+        return JSONResponse(
+            status_code=503,
+            content={"status": "degraded", "time": datetime.utcnow().isoformat(), "audit_ledger": AUDIT_LEDGER.stats()},
+        )
     return {"status": "ok", "time": datetime.utcnow()}
 
 
-@app.post("/api/v1/score", response_model=ScoreResponse)
-def api_score(request: ScoreRequest):
-    if MODEL is None:
+def _cached_score(key: Tuple) -> Optional[ScoreResponse]:
+    cached = SCORE_CACHE.get(key)
+    if cached is None:
+        return None
+    # cache hit: bỏ qua model nhưng vẫn cấp audit_id mới cho lần gọi này
+    return cached.model_copy(update={"audit_id": generate_audit_id()})
+
+
+def _after_score(request: ScoreRequest, result: ScoreResponse, wait: bool = True) -> None:
+    """wait=False trên event loop: queue audit đầy → 503 ngay, không chặn loop."""
+    audit_score(request, result, wait)
+    LIVE_DASHBOARD.record(result.pd, GRADE_BUCKET_INDEX[result.grade_bucket], request.grade)
+    if SCORE_SHADOW:
+        SHADOW.submit((request, result.pd))
+
+
+def _score_direct(request: ScoreRequest) -> ScoreResponse:
+    """Đường không micro-batch, chạy trong threadpool: consent (SQLite) + model."""
+    require_consent(request)
+    key = score_cache_key(request, MODEL_VERSION)
+    result = _cached_score(key)
+    if result is None:
+        result = score_one(request, SCORER)
+        SCORE_CACHE.put(key, result)
+    _after_score(request, result)
+    return result
+
+
+@app.post("/api/v1/score", response_model=ScoreResponse, response_class=ScoreJSONResponse)
+async def api_score(request: ScoreRequest):
+    if SCORER is None:
+        raise HTTPException(status_code=500, detail="Model not loaded")
+    if not SCORE_MICROBATCH:
+        return ScoreJSONResponse(await run_in_threadpool(_score_direct, request))
+
+    # micro-batch: event loop chỉ tra cache + chờ batcher; đọc SQLite (change
+    # feed consent) đẩy sang threadpool để WAL chậm không chặn cả worker
+    if CONSENT_ENFORCE:
+        await run_in_threadpool(require_consent, request)
+    key = score_cache_key(request, MODEL_VERSION)
+    result = _cached_score(key)
+    if result is None:
+        result = await SCORE_BATCHER.submit(request)
+        SCORE_CACHE.put(key, result)
+    _after_score(request, result, wait=False)
+    return ScoreJSONResponse(result)
+
+
+@app.post("/api/v1/score/batch", response_model=ScoreBatchResponse, response_class=ScoreJSONResponse)
+def api_score_batch(request: ScoreBatchRequest):
+    """Chấm điểm hàng loạt (re-scoring danh mục) trong 1 lần gọi model."""
+    if SCORER is None:
+        raise HTTPException(status_code=500, detail="Model not loaded")
+    if len(request.items) > MAX_BATCH_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(request.items)} > {MAX_BATCH_ITEMS}",
+        )
+    for i, item in enumerate(request.items):
+        try:
+            require_consent(item)
+        except HTTPException as e:
+            raise HTTPException(status_code=e.status_code, detail=f"items[{i}]: {e.detail}")
+    results = score_batch(request.items, SCORER)
+    LIVE_DASHBOARD.record_many(
+        [r.pd for r in results],
+        [GRADE_BUCKET_INDEX[r.grade_bucket] for r in results],
+        [item.grade for item in request.items],
+    )
+    for item, result in zip(request.items, results):
+        audit_score(item, result)
+    if SCORE_SHADOW:
+        SHADOW.submit_many((item, result.pd) for item, result in zip(request.items, results))
+    return ScoreJSONResponse(ScoreBatchResponse.model_construct(count=len(results), results=results))
+
+
+@app.get("/api/v1/metrics")
+def metrics():
+    """Số liệu vận hành: micro-batcher, score cache, consent expiry / index, audit ledger."""
+    return {
+        "score_batcher": SCORE_BATCHER.stats(),
+        "score_cache": SCORE_CACHE.stats(),
+        "consent_expiry": CONSENT_EXPIRY.stats(),
+        "consent_index": CONSENT_INDEX.stats(),
+        "audit_ledger": AUDIT_LEDGER.stats(),
+        "pseudonym": PSEUDONYMIZER.stats(),
+        "shadow": SHADOW.stats(),
+    }
+
+
+@app.get("/api/v1/shadow/stats")
+def shadow_stats():
+    """Sai lệch model (engine chính) so với engine synthetic (shadow) trên traffic chấm điểm."""
+    return {
+        "enabled": SCORE_SHADOW,
+        "primary": MODEL_VERSION,
+        "shadow": "synthetic",
+        "rules_version": load_rules().version,
+        **SHADOW.stats(),
+        "disagreement": SHADOW_STATS.snapshot(),
+    }
+
+
+@app.get("/api/v1/model", response_model=ModelInfo)
+def model_info():
+    if MODEL_VERSION is None:
         raise HTTPException(status_code=500, detail="Model not loaded")
-    return score_one(request, MODEL)
+    return ModelInfo(version=MODEL_VERSION, manifest=MODEL_MANIFEST)
+
+
+@app.post("/api/v1/model/reload", response_model=ModelInfo)
+def model_reload(version: Optional[str] = None, x_supervisor_token: Optional[str] = Header(None)):
+    """Load lại artifact LATEST (hoặc version chỉ định) mà không restart worker (cần SUPERVISOR_TOKEN)."""
+    require_supervisor(x_supervisor_token)
+    try:
+        loaded = load_model_state(version)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Model version not found: {version}")
+    if not loaded:
+        raise HTTPException(status_code=404, detail="No model artifact available")
+    return ModelInfo(version=MODEL_VERSION, manifest=MODEL_MANIFEST)
+
+
+def _consent_out(row: Dict[str, Any], national_id: Optional[str]) -> Consent:
+    """Row trong store (khoá theo pseudonym) → Consent trả về: national_id là ID
+    caller đã gửi (không tra vault – vault chỉ dành cho endpoint giám sát),
+    pseudonym ở citizen_ref."""
+    return Consent(**{**row, "national_id": national_id, "citizen_ref": row["national_id"]})
 
 
 @app.post("/api/v1/consent/grant", response_model=Consent)
@@ -398,31 +1111,234 @@ def grant_consent(req: ConsentGrantRequest):
         granted_at=datetime.utcnow(),
         valid_until=datetime.utcnow() + timedelta(days=30),
     )
-    CONSENTS.setdefault(req.national_id, []).append(consent)
+    consent.citizen_ref = PSEUDONYMIZER.enroll(req.national_id)
+    row = consent.model_dump(exclude={"citizen_ref"})
+    row["national_id"] = consent.citizen_ref  # lưu / index / audit theo pseudonym
+    CONSENT_STORE.grant(row)
+    CONSENT_INDEX.add(row)
+    CONSENT_EXPIRY.schedule(consent.consent_id, consent.valid_until)
+    audit_consent("consent_grant", row)
     return consent
 
 
 @app.post("/api/v1/consent/{consent_id}/revoke", response_model=Consent)
 def revoke_consent(consent_id: str):
-    for national_id, lst in CONSENTS.items():
-        for c in lst:
-            if c.consent_id == consent_id:
-                c.status = "revoked"
-                return c
-    raise HTTPException(status_code=404, detail="Consent not found")
+    row = CONSENT_STORE.revoke(consent_id)
+    if row is None:
+        raise HTTPException(status_code=404, detail="Consent not found")
+    CONSENT_INDEX.remove(row)
+    audit_consent("consent_revoke", row)
+    return _consent_out(row, None)  # request chỉ có consent_id
 
 
 @app.get("/api/v1/consent/{national_id}/latest", response_model=Consent)
 def get_latest_consent(national_id: str):
-    history = CONSENTS.get(national_id)
-    if not history:
+    row = CONSENT_STORE.latest(citizen_ref(national_id))
+    if row is None:
         raise HTTPException(status_code=404, detail="No consent found for this national_id")
-    return history[-1]
+    return _consent_out(row, national_id)
 
 
 @app.get("/api/v1/consent/{national_id}/history", response_model=List[Consent])
 def get_consent_history(national_id: str):
-    return CONSENTS.get(national_id, [])
+    return [_consent_out(row, national_id) for row in CONSENT_STORE.history(citizen_ref(national_id))]
+
+
+# ---- Bulk consent: body là JSON array hoặc NDJSON, kết quả trả về dạng NDJSON stream ----
+
+def _is_ndjson(request: Request) -> bool:
+    content_type = request.headers.get("content-type", "")
+    return "ndjson" in content_type or "jsonl" in content_type
+
+
+def _bulk_records(body: bytes, ndjson: bool) -> List[Tuple[Any, Optional[str]]]:
+    """Tách body thành các phần tử: (object, None) hoặc (None, lỗi parse)."""
+    if not ndjson:
+        try:
+            data = json.loads(body or b"[]")
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid JSON: {e}")
+        if not isinstance(data, list):
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+        records = [(obj, None) for obj in data]
+    else:
+        records = []
+        for line in body.splitlines():
+            if not line.strip():
+                continue
+            try:
+                records.append((json.loads(line), None))
+            except ValueError as e:
+                records.append((None, f"Invalid JSON: {e}"))
+    if len(records) > CONSENT_BULK_MAX:
+        raise HTTPException(status_code=413, detail=f"Too many items: {len(records)} > {CONSENT_BULK_MAX}")
+    return records
+
+
+def _validation_message(e: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, err['loc'])) or 'item'}: {err['msg']}" for err in e.errors())
+
+
+CONSENT_GRANT_LIST = TypeAdapter(List[ConsentGrantRequest])
+
+
+@contextmanager
+def _gc_paused():
+    """Tạm tắt cyclic GC khi tạo hàng chục nghìn object không vòng tham chiếu
+    (model/dict của 1 lô bulk) – nếu không, GC thế hệ 2 quét lại cả heap nhiều lần."""
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+
+def _bulk_grant_requests(body: bytes, ndjson: bool) -> List[Tuple[Any, Optional[str]]]:
+    """(ConsentGrantRequest, None) hoặc (None, lỗi) cho từng phần tử."""
+    payload = body
+    if ndjson:
+        payload = b"[" + b",".join(line for line in body.splitlines() if line.strip()) + b"]"
+    try:
+        # đường nhanh: validate cả lô trong pydantic-core
+        reqs = CONSENT_GRANT_LIST.validate_json(payload)
+    except ValidationError:
+        reqs = None  # có phần tử lỗi → validate từng phần tử để báo lỗi đúng index
+    if reqs is not None:
+        if len(reqs) > CONSENT_BULK_MAX:
+            raise HTTPException(status_code=413, detail=f"Too many items: {len(reqs)} > {CONSENT_BULK_MAX}")
+        return [(req, None) for req in reqs]
+
+    out: List[Tuple[Any, Optional[str]]] = []
+    for obj, error in _bulk_records(body, ndjson):
+        if error is None:
+            try:
+                out.append((ConsentGrantRequest.model_validate(obj), None))
+                continue
+            except ValidationError as e:
+                error = _validation_message(e)
+        out.append((None, error))
+    return out
+
+
+def _bulk_grant(items: List[Tuple[Any, Optional[str]]]) -> List[Dict[str, Any]]:
+    granted_at = datetime.utcnow()
+    valid_until = granted_at + timedelta(days=30)
+    results: List[Dict[str, Any]] = []
+    rows: List[Dict[str, Any]] = []
+    refs = iter(PSEUDONYMIZER.enroll_many([req.national_id for req, error in items if error is None]))
+    for i, (req, error) in enumerate(items):
+        if error is not None:
+            results.append({"index": i, "ok": False, "error": error})
+            continue
+        row = {
+            "consent_id": generate_consent_id(),
+            "national_id": next(refs),
+            "bank_code": req.bank_code,
+            "scope_credit_history": req.scope_credit_history,
+            "scope_utility": req.scope_utility,
+            "scope_income": req.scope_income,
+            "status": "active",
+            "granted_at": granted_at,
+            "valid_until": valid_until,
+        }
+        rows.append(row)
+        results.append({"index": i, "ok": True, "consent": dict(row, national_id=req.national_id, citizen_ref=row["national_id"])})
+
+    CONSENT_STORE.grant_many(rows)  # 1 transaction cho cả lô
+    CONSENT_INDEX.add_many(rows)
+    for row in rows:
+        CONSENT_EXPIRY.schedule(row["consent_id"], valid_until)
+        audit_consent("consent_grant", row)
+    return results
+
+
+def _bulk_revoke(records: List[Tuple[Any, Optional[str]]]) -> List[Dict[str, Any]]:
+    results: List[Optional[Dict[str, Any]]] = [None] * len(records)
+    ids: List[str] = []
+    positions: List[int] = []
+    for i, (obj, error) in enumerate(records):
+        # phần tử là "CON-..." hoặc {"consent_id": "CON-..."}
+        consent_id = obj.get("consent_id") if isinstance(obj, dict) else obj
+        if error is None and not isinstance(consent_id, str):
+            error = "Expected a consent_id string or {\"consent_id\": ...}"
+        if error is not None:
+            results[i] = {"index": i, "ok": False, "error": error}
+            continue
+        ids.append(consent_id)
+        positions.append(i)
+
+    rows = CONSENT_STORE.revoke_many(ids)
+    for i, consent_id, row in zip(positions, ids, rows):
+        if row is None:
+            results[i] = {"index": i, "ok": False, "consent_id": consent_id, "error": "Consent not found"}
+        else:
+            CONSENT_INDEX.remove(row)
+            audit_consent("consent_revoke", row)
+            results[i] = {"index": i, "ok": True, "consent": dict(row, national_id=None, citizen_ref=row["national_id"])}
+    return results
+
+
+_CONSENT_LINE = (
+    '{"index":%d,"ok":true,"consent":{"consent_id":%s,"national_id":%s,"bank_code":%s,'
+    '"scope_credit_history":%s,"scope_utility":%s,"scope_income":%s,"status":%s,'
+    '"granted_at":"%s","valid_until":"%s","citizen_ref":%s}}\n'
+)
+_JSON_BOOL = {True: "true", False: "false"}
+
+
+def _json_str(value: Optional[str]) -> str:
+    return "null" if value is None else encode_basestring_ascii(value)
+
+
+def _ndjson_stream(results: List[Dict[str, Any]], chunk: int = 1000):
+    """Kết quả bulk → NDJSON theo từng khối; dòng consent thành công ghép theo
+    template (cùng output với json.dumps nhưng nhanh hơn nhiều)."""
+    iso: Dict[datetime, str] = {}  # bulk grant: cả lô chung granted_at / valid_until
+    quote = encode_basestring_ascii
+    encode = json.JSONEncoder(default=lambda o: o.isoformat(), separators=(",", ":")).encode
+
+    def line(r: Dict[str, Any]) -> str:
+        c = r.get("consent")
+        if c is None:
+            return encode(r) + "\n"
+        granted_at = iso.get(c["granted_at"]) or iso.setdefault(c["granted_at"], c["granted_at"].isoformat())
+        valid_until = iso.get(c["valid_until"]) or iso.setdefault(c["valid_until"], c["valid_until"].isoformat())
+        return _CONSENT_LINE % (
+            r["index"], quote(c["consent_id"]), _json_str(c["national_id"]), quote(c["bank_code"]),
+            _JSON_BOOL[c["scope_credit_history"]], _JSON_BOOL[c["scope_utility"]], _JSON_BOOL[c["scope_income"]],
+            quote(c["status"]), granted_at, valid_until, quote(c["citizen_ref"]),
+        )
+
+    for start in range(0, len(results), chunk):
+        yield "".join(line(r) for r in results[start:start + chunk])
+
+
+@app.post("/api/v1/consent/grant/bulk")
+async def grant_consent_bulk(request: Request):
+    """Cấp nhiều consent trong 1 transaction; kết quả từng phần tử (theo index) dạng NDJSON."""
+    body, ndjson = await request.body(), _is_ndjson(request)
+
+    def run():
+        with _gc_paused():
+            return _bulk_grant(_bulk_grant_requests(body, ndjson))
+
+    results = await run_in_threadpool(run)
+    return StreamingResponse(_ndjson_stream(results), media_type="application/x-ndjson")
+
+
+@app.post("/api/v1/consent/revoke/bulk")
+async def revoke_consent_bulk(request: Request):
+    """Revoke nhiều consent_id trong 1 transaction; kết quả từng phần tử dạng NDJSON."""
+    body, ndjson = await request.body(), _is_ndjson(request)
+
+    def run():
+        with _gc_paused():
+            return _bulk_revoke(_bulk_records(body, ndjson))
+
+    results = await run_in_threadpool(run)
+    return StreamingResponse(_ndjson_stream(results), media_type="application/x-ndjson")
 
 
 @app.post("/api/v1/complaint", response_model=Complaint)
@@ -435,13 +1351,83 @@ def create_complaint(req: ComplaintCreate):
         created_at=datetime.utcnow(),
         status="received",
     )
-    COMPLAINTS.setdefault(req.national_id, []).append(comp)
+    ref = PSEUDONYMIZER.enroll(comp.national_id)
+    COMPLAINT_STORE.create({**comp.model_dump(), "national_id": ref})
+    AUDIT_LEDGER.append(
+        "complaint_create",
+        audit_id=generate_audit_id(),
+        national_id=ref,
+        ticket_id=comp.ticket_id,
+        complaint_type=comp.complaint_type,
+    )
     return comp
 
 
 @app.get("/api/v1/complaint/{national_id}", response_model=List[Complaint])
 def list_complaints(national_id: str):
-    return COMPLAINTS.get(national_id, [])
+    return [
+        Complaint(**{**row, "national_id": national_id})
+        for row in COMPLAINT_STORE.list_for(citizen_ref(national_id))
+    ]
+
+
+@app.get("/api/v1/audit/verify")
+def audit_verify(full: bool = True, x_supervisor_token: Optional[str] = Header(None)):
+    """Kiểm tra chuỗi hash của audit ledger (cần SUPERVISOR_TOKEN).
+
+    Mặc định băm lại toàn bộ ledger; full=false tin footer của segment đã niêm
+    phong (kết quả có "partial": true, chỉ đảm bảo phần đã băm lại)."""
+    require_supervisor(x_supervisor_token)
+    AUDIT_LEDGER.flush()
+    return verify_audit_log(AUDIT_LEDGER.path, full=full)
+
+
+@app.get("/api/v1/audit/logs", response_model=AuditLogPage)
+def audit_logs(
+    national_id: Optional[str] = None,
+    audit_id: Optional[str] = None,
+    bank_code: Optional[str] = None,
+    action: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = Query(20, ge=1),
+    cursor: Optional[int] = Query(None, ge=0),
+    order: Literal["desc", "asc"] = "desc",
+    x_supervisor_token: Optional[str] = Header(None),
+):
+    """Tra cứu audit log qua index (không đọc cả file; cần SUPERVISOR_TOKEN); trang sau dùng next_cursor."""
+    require_supervisor(x_supervisor_token)
+    try:
+        items, next_cursor = AUDIT_INDEX.query(
+            national_id=citizen_ref(national_id) if national_id else None,
+            audit_id=audit_id,
+            bank_code=bank_code,
+            action=action,
+            since=since,
+            until=until,
+            limit=min(limit, AUDIT_QUERY_MAX),
+            cursor=cursor,
+            order=order,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return AuditLogPage(count=len(items), items=items, next_cursor=next_cursor)
+
+
+@app.get("/api/v1/supervisor/citizen/{pseudonym}")
+def reveal_citizen(pseudonym: str, x_supervisor_token: Optional[str] = Header(None)):
+    """Tra ngược pseudonym -> national_id, chỉ cho view giám sát có SUPERVISOR_TOKEN; mỗi lần tra đều ghi audit."""
+    require_supervisor(x_supervisor_token)
+    national_id = PSEUDONYMIZER.reveal(pseudonym)
+    AUDIT_LEDGER.append(
+        "pseudonym_reveal",
+        audit_id=generate_audit_id(),
+        national_id=pseudonym,
+        found=national_id is not None,
+    )
+    if national_id is None:
+        raise HTTPException(status_code=404, detail="Unknown pseudonym")
+    return {"pseudonym": pseudonym, "national_id": national_id}
 
 
 @app.get("/api/v1/dashboard/summary", response_model=DashboardSummary)
@@ -449,3 +1435,12 @@ def dashboard_summary():
     if DASHBOARD_CACHE is None:
         raise HTTPException(status_code=500, detail="Dashboard not ready")
     return DASHBOARD_CACHE
+
+
+@app.get("/api/v1/dashboard/live", response_model=LiveDashboardSummary)
+def dashboard_live():
+    """Số liệu realtime từ traffic chấm điểm của worker này (tumbling window)."""
+    return LiveDashboardSummary(
+        generated_at=datetime.utcnow(),
+        windows=LIVE_DASHBOARD.snapshot(),
+    )
@@ -0,0 +1,140 @@
+"""
+Micro-batching cho các request chấm điểm đơn lẻ.
+
+Các lời gọi đến đồng thời trong 1 cửa sổ ngắn (vd 2 ms) hoặc đến khi đủ
+max_batch được gom lại thành 1 lần gọi model vector hoá; mỗi caller nhận
+lại đúng kết quả của mình qua asyncio.Future.
+"""
+
+import asyncio
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+
+class Histogram:
+    """Histogram đếm theo bucket cận trên (le_1, le_2, le_4, ...)."""
+
+    def __init__(self, bounds: List[int]):
+        self.bounds = list(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)  # bucket cuối = +Inf
+        self.total = 0
+        self.sum = 0
+
+    def observe(self, value: int) -> None:
+        for i, b in enumerate(self.bounds):
+            if value <= b:
+                break
+        else:
+            i = len(self.bounds)
+        self.counts[i] += 1
+        self.total += 1
+        self.sum += value
+
+    def snapshot(self) -> Dict[str, Any]:
+        buckets = {f"le_{b}": c for b, c in zip(self.bounds, self.counts)}
+        buckets["le_inf"] = self.counts[-1]
+        return {
+            "count": self.total,
+            "mean": (self.sum / self.total) if self.total else 0.0,
+            "buckets": buckets,
+        }
+
+
+def _pow2_bounds(limit: int) -> List[int]:
+    bounds, b = [], 1
+    while b < limit:
+        bounds.append(b)
+        b *= 2
+    bounds.append(limit)
+    return bounds
+
+
+class MicroBatcher:
+    """Gom request vào batch rồi gọi fn(items) -> results (cùng thứ tự) trong thread pool."""
+
+    def __init__(self, fn: Callable[[List[Any]], List[Any]], max_batch: int = 64, window_ms: float = 2.0):
+        self.fn = fn
+        self.max_batch = max(1, int(max_batch))
+        self.window = max(0.0, float(window_ms)) / 1000.0
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._full: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self._lock = threading.Lock()
+        self.batch_size_hist = Histogram(_pow2_bounds(self.max_batch))
+        self.queue_depth_hist = Histogram(_pow2_bounds(max(self.max_batch * 4, 1)))
+        self.max_queue_depth = 0
+        self.errors = 0
+
+    def _ensure_started(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._task is not None and not self._task.done():
+            return
+        # lần đầu, hoặc event loop đã đổi (vd. test client) → khởi tạo lại
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._full = asyncio.Event()
+        self._task = loop.create_task(self._run())
+
+    async def submit(self, item: Any) -> Any:
+        self._ensure_started()
+        fut = self._loop.create_future()
+        self._queue.put_nowait((item, fut))
+        if self._queue.qsize() >= self.max_batch - 1:
+            self._full.set()
+        return await fut
+
+    async def _run(self) -> None:
+        queue, full = self._queue, self._full
+        while True:
+            first = await queue.get()
+
+            # chờ hết cửa sổ hoặc tới khi đủ max_batch, tuỳ cái nào đến trước
+            if self.window > 0 and queue.qsize() < self.max_batch - 1:
+                full.clear()
+                try:
+                    await asyncio.wait_for(full.wait(), timeout=self.window)
+                except asyncio.TimeoutError:
+                    pass
+
+            depth = queue.qsize() + 1
+            batch = [first]
+            while len(batch) < self.max_batch and not queue.empty():
+                batch.append(queue.get_nowait())
+            batch = [(item, fut) for item, fut in batch if not fut.cancelled()]
+
+            with self._lock:
+                self.queue_depth_hist.observe(depth)
+                self.batch_size_hist.observe(len(batch))
+                self.max_queue_depth = max(self.max_queue_depth, depth)
+            if not batch:
+                continue
+
+            items = [item for item, _ in batch]
+            try:
+                results = await self._loop.run_in_executor(None, self.fn, items)
+            except Exception as ex:  # noqa: BLE001 – trả lỗi về cho từng caller
+                with self._lock:
+                    self.errors += 1
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(ex)
+                continue
+
+            for (_, fut), res in zip(batch, results):
+                if not fut.done():
+                    fut.set_result(res)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_batch": self.max_batch,
+                "window_ms": self.window * 1000.0,
+                "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+                "max_queue_depth": self.max_queue_depth,
+                "errors": self.errors,
+                "batch_size": self.batch_size_hist.snapshot(),
+                "queue_depth_at_dispatch": self.queue_depth_hist.snapshot(),
+            }
@@ -0,0 +1,190 @@
+"""
+Model artifact store cho PB-025.
+
+Mỗi lần train (qua CLI train_pb025_model.py) sinh 1 thư mục version:
+
+    <MODEL_STORE_DIR>/<version>/
+        manifest.json     # feature list, số dòng train, hash dữ liệu, ...
+        scorer.npz        # tham số compiled scorer (load trong vài ms)
+        pipeline.joblib   # sklearn Pipeline gốc (parity / fallback)
+        dashboard.json    # DashboardSummary tính lúc train
+
+File LATEST trỏ tới version đang active. API chỉ đọc artifact; chỉ train
+lúc khởi động khi bật rõ MODEL_TRAIN_IF_MISSING=1, và khi đó các worker
+train lần lượt dưới train_lock() (worker sau thấy LATEST đã có thì bỏ qua).
+"""
+
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: không khoá giữa các process
+    fcntl = None
+
+import joblib
+
+from compiled_scorer import CompiledScorer, PipelineScorer
+
+MODEL_STORE_DIR = os.getenv("MODEL_STORE_DIR", "artifacts")
+
+MANIFEST_FILE = "manifest.json"
+SCORER_FILE = "scorer.npz"
+PIPELINE_FILE = "pipeline.joblib"
+DASHBOARD_FILE = "dashboard.json"
+LATEST_FILE = "LATEST"
+LOCK_FILE = ".train.lock"
+
+
+class ModelArtifact:
+    """Artifact đã load: scorer phục vụ API + dashboard + manifest."""
+
+    def __init__(self, version: str, manifest: Dict[str, Any], scorer, dashboard: Optional[Dict[str, Any]]):
+        self.version = version
+        self.manifest = manifest
+        self.scorer = scorer
+        self.dashboard = dashboard
+
+
+def file_fingerprint(path: str) -> Dict[str, Any]:
+    """size + mtime + sha256 của file dữ liệu (đọc theo block 1MB)."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    st = os.stat(path)
+    return {
+        "path": path,
+        "size": st.st_size,
+        "mtime": st.st_mtime,
+        "sha256": h.hexdigest(),
+    }
+
+
+def _write_json_atomic(path: str, obj: Any) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False, indent=2, default=str)
+    os.replace(tmp, path)
+
+
+@contextmanager
+def train_lock(store_dir: Optional[str] = None) -> Iterator[None]:
+    """flock độc quyền trên <store_dir>/.train.lock: 1 process train tại 1 thời điểm."""
+    store_dir = store_dir or MODEL_STORE_DIR
+    os.makedirs(store_dir, exist_ok=True)
+    with open(os.path.join(store_dir, LOCK_FILE), "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def new_version(data_sha256: str, kind: str = "lr") -> str:
+    """<kind>-<thời điểm UTC>-<sha256 dữ liệu[:8]>; kind = loại model (lr / sgd)."""
+    return kind + "-" + datetime.utcnow().strftime("%Y%m%d-%H%M%S") + "-" + data_sha256[:8]
+
+
+def save_artifact(
+    version: str,
+    scorer,
+    pipeline,
+    dashboard: Optional[Dict[str, Any]],
+    manifest: Dict[str, Any],
+    activate: bool = True,
+    store_dir: Optional[str] = None,
+) -> str:
+    """Ghi artifact vào <store_dir>/<version>/ và (tuỳ chọn) trỏ LATEST tới nó."""
+    store_dir = store_dir or MODEL_STORE_DIR
+    vdir = os.path.join(store_dir, version)
+    os.makedirs(vdir, exist_ok=False)
+
+    manifest = dict(manifest)
+    manifest["version"] = version
+    manifest["created_at"] = datetime.utcnow().isoformat() + "Z"
+
+    if isinstance(scorer, CompiledScorer):
+        scorer.save(os.path.join(vdir, SCORER_FILE))
+        manifest["scorer"] = "compiled"
+    else:
+        manifest["scorer"] = "pipeline"
+    if pipeline is not None:
+        joblib.dump(pipeline, os.path.join(vdir, PIPELINE_FILE))
+    if dashboard is not None:
+        _write_json_atomic(os.path.join(vdir, DASHBOARD_FILE), dashboard)
+    # manifest ghi cuối cùng: thư mục thiếu manifest = artifact dở dang
+    _write_json_atomic(os.path.join(vdir, MANIFEST_FILE), manifest)
+
+    if activate:
+        activate_version(version, store_dir)
+    return version
+
+
+def activate_version(version: str, store_dir: Optional[str] = None) -> None:
+    store_dir = store_dir or MODEL_STORE_DIR
+    _check_version(version, store_dir)
+    tmp = os.path.join(store_dir, LATEST_FILE + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(version + "\n")
+    os.replace(tmp, os.path.join(store_dir, LATEST_FILE))
+
+
+def latest_version(store_dir: Optional[str] = None) -> Optional[str]:
+    path = os.path.join(store_dir or MODEL_STORE_DIR, LATEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read().strip() or None
+
+
+def list_versions(store_dir: Optional[str] = None) -> List[str]:
+    store_dir = store_dir or MODEL_STORE_DIR
+    if not os.path.isdir(store_dir):
+        return []
+    # sắp theo thời điểm train (bỏ tiền tố loại model), không theo tên
+    return sorted(
+        (v for v in os.listdir(store_dir) if os.path.exists(os.path.join(store_dir, v, MANIFEST_FILE))),
+        key=lambda v: (v.split("-", 1)[-1], v),
+    )
+
+
+def _check_version(version: str, store_dir: str) -> None:
+    # version phải là 1 thư mục artifact có sẵn: chặn "../x" / đường dẫn tuyệt đối
+    # trước khi os.path.join + joblib.load (unpickle)
+    if version not in list_versions(store_dir):
+        raise FileNotFoundError(f"Artifact version not found: {version}")
+
+
+def load_artifact(version: Optional[str] = None, store_dir: Optional[str] = None) -> Optional[ModelArtifact]:
+    """Load artifact (mặc định version LATEST). Trả về None nếu store chưa có gì."""
+    store_dir = store_dir or MODEL_STORE_DIR
+    version = version or latest_version(store_dir)
+    if version is None:
+        return None
+    _check_version(version, store_dir)
+    vdir = os.path.join(store_dir, version)
+    with open(os.path.join(vdir, MANIFEST_FILE), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    if manifest.get("scorer") == "compiled":
+        scorer = CompiledScorer.load(os.path.join(vdir, SCORER_FILE))
+    else:
+        scorer = PipelineScorer(
+            joblib.load(os.path.join(vdir, PIPELINE_FILE)),
+            manifest["feature_num"],
+            manifest["feature_cat"],
+        )
+
+    dashboard = None
+    dashboard_path = os.path.join(vdir, DASHBOARD_FILE)
+    if os.path.exists(dashboard_path):
+        with open(dashboard_path, "r", encoding="utf-8") as f:
+            dashboard = json.load(f)
+    return ModelArtifact(version, manifest, scorer, dashboard)
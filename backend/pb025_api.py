@@ -1,10 +1,19 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Sequence, Tuple
 from datetime import datetime
 import math
-import hashlib
-import uuid
+import os
+
+import numpy as np
+
+from fast_json import HAVE_ORJSON, FastJSONResponse, Fragments, dumps, quote
+from ids import new_id
+from pseudonym import Pseudonymizer
+from rule_engine import load_rules
+
+# Số hồ sơ tối đa trong 1 lần gọi /api/v1/score/batch
+MAX_BATCH_ITEMS = int(os.getenv("MAX_BATCH_ITEMS", "100000"))
 
 app = FastAPI(
     title="PB-025 Scoring API (demo)",
@@ -28,16 +37,64 @@ class ScoreRequest(BaseModel):
     purpose: Optional[str] = None
 
 
+class ScoreBatchRequest(BaseModel):
+    items: List[ScoreRequest]
+
+
 # ==========
 #  Helpers
 # ==========
 
+# HMAC có khoá + LRU cho CCCD hay gặp (xem pseudonym.py); API demo không lưu
+# gì nên không cần vault tra ngược
+PSEUDONYMIZER = Pseudonymizer()
+
+
 def _hash_citizen(national_id: Optional[str]) -> str:
-    if not national_id:
-        national_id = "anonymous"
-    h = hashlib.sha256(national_id.encode("utf-8")).hexdigest()
-    # rút gọn cho dễ nhìn
-    return h[:12]
+    return PSEUDONYMIZER.pseudonymize(national_id or "anonymous")
+
+
+# Luật chấm điểm / chính sách lấy từ bảng luật có version (rule_engine.py),
+# biên dịch 1 lần lúc load – dùng chung cho bản scalar và bản vector
+RULES = load_rules()
+_GRADE_FACTOR = RULES["grade_factor"]
+_PD_BAND = RULES["pd_band"]
+_BANDS = _PD_BAND.field("band")
+_POLICIES = _PD_BAND.field("policy")
+
+
+def _build_factors(high_dti: bool, large: bool, low_grade: bool) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    # factors tiếng Việt
+    factors_vi = []
+    if high_dti:
+        factors_vi.append("DTI cao (>60%) – rủi ro gánh nặng nợ.")
+    if large:
+        factors_vi.append("Khoản vay lớn – cần thẩm định bổ sung.")
+    if low_grade:
+        factors_vi.append("CIC-like grade thấp (D/E).")
+    if not factors_vi:
+        factors_vi.append("Hồ sơ nằm trong ngưỡng rủi ro chấp nhận được.")
+
+    # factors tiếng Anh
+    factors_en = [
+        "High DTI (>60%) – debt burden risk." if high_dti else "",
+        "Large exposure amount – require extra checks." if large else "",
+        "Low CIC-like grade (D/E)." if low_grade else "",
+    ]
+    factors_en = [f for f in factors_en if f] or ["Risk level acceptable for demo."]
+    return tuple(factors_vi), tuple(factors_en)
+
+
+# 8 tổ hợp (DTI cao, khoản vay lớn, grade D/E) -> (factors_vi, factors_en), chỉ số = bitmask.
+# List dựng 1 lần, dùng chung cho mọi kết quả (không sửa tại chỗ).
+_FACTORS = [
+    tuple(list(f) for f in _build_factors(bool(m & 1), bool(m & 2), bool(m & 4))) for m in range(8)
+]
+MODEL_VERSION = "demo-2025-11"
+
+
+def _factor_mask(dti: float, amount: float, grade: Optional[str]) -> int:
+    return (dti > 0.6) | (amount > 500_000_000) << 1 | ((grade or "").upper() in ("D", "E")) << 2
 
 
 def _synthetic_score(req: ScoreRequest) -> Dict[str, Any]:
@@ -58,13 +115,7 @@ def _synthetic_score(req: ScoreRequest) -> Dict[str, Any]:
     if tenor > 36:
         base_pd += (tenor - 36) * 0.001
 
-    grade_factor = {
-        "A": -0.03,
-        "B": -0.01,
-        "C": 0.02,
-        "D": 0.05,
-        "E": 0.08,
-    }.get((req.grade or "C").upper(), 0.0)
+    grade_factor = _GRADE_FACTOR.lookup((req.grade or "C").upper())
 
     base_pd += grade_factor
     base_pd = max(0.005, min(base_pd, 0.7))
@@ -75,51 +126,15 @@ def _synthetic_score(req: ScoreRequest) -> Dict[str, Any]:
     credit_score = 800 - logit * 120
     credit_score = max(300, min(900, credit_score))
 
-    # risk band
-    if base_pd < 0.03:
-        band = "A"
-    elif base_pd < 0.06:
-        band = "B"
-    elif base_pd < 0.12:
-        band = "C"
-    elif base_pd < 0.25:
-        band = "D"
-    else:
-        band = "E"
-
-    # policy demo
-    if band in ("A", "B"):
-        policy = "PHÊ DUYỆT (demo)"
-    elif band == "C":
-        policy = "PHÊ DUYỆT có điều kiện (demo)"
-    elif band == "D":
-        policy = "XEM XÉT THÊM – YÊU CẦU TÀI SẢN BẢO ĐẢM (demo)"
-    else:
-        policy = "TỪ CHỐI / GIẢM HẠN MỨC (demo)"
-
-    # factors tiếng Việt
-    factors_vi = []
-    if dti > 0.6:
-        factors_vi.append("DTI cao (>60%) – rủi ro gánh nặng nợ.")
-    if amount > 500_000_000:
-        factors_vi.append("Khoản vay lớn – cần thẩm định bổ sung.")
-    if (req.grade or "").upper() in ("D", "E"):
-        factors_vi.append("CIC-like grade thấp (D/E).")
-    if not factors_vi:
-        factors_vi.append("Hồ sơ nằm trong ngưỡng rủi ro chấp nhận được.")
+    # risk band + policy demo
+    band_idx = _PD_BAND.index(base_pd)
+    band = _BANDS[band_idx]
+    policy = _POLICIES[band_idx]
 
-    # factors tiếng Anh
-    factors_en = [
-        "High DTI (>60%) – debt burden risk." if dti > 0.6 else "",
-        "Large exposure amount – require extra checks."
-        if amount > 500_000_000
-        else "",
-        "Low CIC-like grade (D/E)." if (req.grade or "").upper() in ("D", "E") else "",
-    ]
-    factors_en = [f for f in factors_en if f] or ["Risk level acceptable for demo."]
+    factors_vi, factors_en = _FACTORS[_factor_mask(dti, amount, req.grade)]
 
     citizen_hash = _hash_citizen(req.national_id)
-    audit_id = f"A-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6].upper()}"
+    audit_id = new_id("A-")
 
     # trả cả field old + new để UI dùng thoải mái
     result = {
@@ -133,12 +148,156 @@ def _synthetic_score(req: ScoreRequest) -> Dict[str, Any]:
         "policy_decision": policy,
         "factors_vi": factors_vi,
         "factors_en": factors_en,
-        "model_version": "demo-2025-11",
+        "model_version": MODEL_VERSION,
+        "rules_version": RULES.version,
         "generated_at": datetime.utcnow().isoformat() + "Z",
     }
     return result
 
 
+def _synthetic_score_arrays(
+    amount: np.ndarray,
+    tenor: np.ndarray,
+    annual_income: np.ndarray,
+    dti_pct: np.ndarray,
+    grade: Sequence[Optional[str]],
+) -> Dict[str, np.ndarray]:
+    """
+    Bản vector hoá của _synthetic_score: chấm cả mảng hồ sơ trong 1 lượt.
+    annual_income / dti_pct: NaN = không có. Kết quả trùng từng bit với bản
+    scalar (cùng thứ tự phép tính; log lấy từ math.log vì np.log có thể lệch
+    1 ulp so với libm).
+    """
+    amount = np.asarray(amount, dtype=np.float64)
+    tenor = np.asarray(tenor, dtype=np.int64)
+    tenor = np.where(tenor == 0, 36, tenor)  # `loan_tenor_months or 36`
+    income = np.asarray(annual_income, dtype=np.float64)
+    dti_pct = np.asarray(dti_pct, dtype=np.float64)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dti = np.where(
+            income > 0,
+            amount / income,
+            np.where((dti_pct != 0) & ~np.isnan(dti_pct), dti_pct / 100.0, 0.4),
+        )
+
+    base_pd = 0.05 + 0.0000000003 * amount
+    base_pd = base_pd + np.maximum(dti - 0.3, 0) * 0.4
+    base_pd = np.where(tenor > 36, base_pd + (tenor - 36) * 0.001, base_pd)
+
+    grade_upper = [(g or "").upper() for g in grade]
+    base_pd = base_pd + _GRADE_FACTOR.lookup_many([g or "C" for g in grade_upper]).astype(np.float64)
+    base_pd = np.clip(base_pd, 0.005, 0.7)
+
+    odds = base_pd / (1 - base_pd)
+    logit = np.fromiter(map(math.log, odds.tolist()), dtype=np.float64, count=len(odds))
+    credit_score = np.clip(800 - logit * 120, 300, 900)
+
+    low_grade = np.fromiter((g in ("D", "E") for g in grade_upper), dtype=bool, count=len(grade_upper))
+    return {
+        "pd_12m": base_pd,
+        "logit": logit,
+        "credit_score": np.rint(credit_score).astype(np.int64),
+        "band": _PD_BAND.indices(base_pd),
+        "factor_mask": (dti > 0.6) | (amount > 500_000_000) << 1 | low_grade << 2,
+    }
+
+
+def synthetic_score_many(reqs: Sequence[Any]) -> Dict[str, np.ndarray]:
+    """_synthetic_score_arrays cho list request (ScoreRequest của API này hoặc
+    của main.py – cùng tên field); main.py dùng cho shadow scoring."""
+    n = len(reqs)
+    nan = math.nan
+    return _synthetic_score_arrays(
+        np.fromiter((r.loan_amount for r in reqs), dtype=np.float64, count=n),
+        np.fromiter((r.loan_tenor_months or 36 for r in reqs), dtype=np.int64, count=n),
+        np.fromiter((nan if r.annual_income is None else r.annual_income for r in reqs), dtype=np.float64, count=n),
+        np.fromiter((nan if r.dti is None else r.dti for r in reqs), dtype=np.float64, count=n),
+        [r.grade for r in reqs],
+    )
+
+
+def _synthetic_score_batch(reqs: List[ScoreRequest]) -> List[Dict[str, Any]]:
+    """Chấm điểm nhiều hồ sơ qua _synthetic_score_arrays; mỗi phần tử giống hệt _synthetic_score."""
+    s = synthetic_score_many(reqs)
+    generated_at = datetime.utcnow().isoformat() + "Z"
+    results = []
+    for req, pd_12m, logit, score, band, mask in zip(
+        reqs,
+        s["pd_12m"].tolist(),
+        s["logit"].tolist(),
+        s["credit_score"].tolist(),
+        s["band"].tolist(),
+        s["factor_mask"].tolist(),
+    ):
+        factors_vi, factors_en = _FACTORS[mask]
+        results.append(
+            {
+                "citizen_hash": _hash_citizen(req.national_id),
+                "audit_id": new_id("A-"),
+                "pd_12m": round(pd_12m, 4),
+                "pd": round(pd_12m * 100, 2),
+                "score_raw": round(logit, 4),
+                "credit_score": score,
+                "grade_bucket": _BANDS[band],
+                "policy_decision": _POLICIES[band],
+                "factors_vi": factors_vi,
+                "factors_en": factors_en,
+                "model_version": MODEL_VERSION,
+                "rules_version": RULES.version,
+                "generated_at": generated_at,
+            }
+        )
+    return results
+
+
+# Fallback không có orjson: ghép template, các chuỗi / danh sách factor cố định đã encode sẵn
+_SCORE_JSON = (
+    '{"citizen_hash":%s,"audit_id":%s,"pd_12m":%r,"pd":%r,"score_raw":%r,"credit_score":%d,'
+    '"grade_bucket":%s,"policy_decision":%s,"factors_vi":%s,"factors_en":%s,'
+    '"model_version":%s,"rules_version":%s,"generated_at":%s}'
+)
+_SCORE_FRAGMENTS = Fragments(
+    [*_BANDS, *_POLICIES, *(lst for pair in _FACTORS for lst in pair), MODEL_VERSION, RULES.version]
+)
+
+
+def _encode_score(r: Dict[str, Any]) -> str:
+    """Kết quả _synthetic_score → JSON, cùng output với json.dumps của JSONResponse."""
+    frag = _SCORE_FRAGMENTS
+    return _SCORE_JSON % (
+        quote(r["citizen_hash"]), quote(r["audit_id"]), r["pd_12m"], r["pd"], r["score_raw"], r["credit_score"],
+        frag(r["grade_bucket"]), frag(r["policy_decision"]), frag(r["factors_vi"]), frag(r["factors_en"]),
+        frag(r["model_version"]), frag(r["rules_version"]), quote(r["generated_at"]),
+    )
+
+
+class SyntheticScoreResponse(FastJSONResponse):
+    """Response cho dict của _synthetic_score (chỉ gồm str / float / int / list[str]):
+    orjson nếu có, không thì template; bỏ qua jsonable_encoder."""
+
+    def render(self, content: Any) -> bytes:
+        if HAVE_ORJSON:
+            return dumps(content)
+        try:
+            return _encode_score(content).encode("utf-8")
+        except (KeyError, TypeError):
+            return super().render(content)
+
+
+class SyntheticScoreBatchResponse(FastJSONResponse):
+    """{"count", "results": [kết quả _synthetic_score, ...]}."""
+
+    def render(self, content: Any) -> bytes:
+        if HAVE_ORJSON:
+            return dumps(content)
+        try:
+            body = '{"count":%d,"results":[%s]}' % (content["count"], ",".join(map(_encode_score, content["results"])))
+        except (KeyError, TypeError):
+            return super().render(content)
+        return body.encode("utf-8")
+
+
 # ==========
 #  Endpoints
 # ==========
@@ -148,10 +307,22 @@ def health() -> str:
     return "OK"
 
 
-@app.post("/api/v1/score")
+@app.post("/api/v1/score", response_class=SyntheticScoreResponse)
 def score_endpoint(req: ScoreRequest):
     """Endpoint chính cho Banker Portal."""
-    return _synthetic_score(req)
+    return SyntheticScoreResponse(_synthetic_score(req))
+
+
+@app.post("/api/v1/score/batch", response_class=SyntheticScoreBatchResponse)
+def score_batch_endpoint(request: ScoreBatchRequest):
+    """Chấm điểm hàng loạt bằng bản vector hoá (fallback / load test)."""
+    if len(request.items) > MAX_BATCH_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(request.items)} > {MAX_BATCH_ITEMS}",
+        )
+    results = _synthetic_score_batch(request.items)
+    return SyntheticScoreBatchResponse({"count": len(results), "results": results})
 
 
 @app.get("/api/v1/dashboard/summary")
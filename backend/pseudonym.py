@@ -0,0 +1,231 @@
+"""
+Pseudonym hoá national_id (CCCD) cho PB-025.
+
+    pseudonym = hex(HMAC-SHA256(key, national_id))[:PSEUDONYM_HEX]
+
+- Có khoá: không dò ngược được bằng cách băm thử cả không gian CCCD (12 số)
+  nếu không có key – khác với SHA-256 không khoá.
+- Ổn định: cùng key → cùng pseudonym ở mọi worker / mọi lần chạy → dùng làm
+  khoá lưu trữ (consent, complaint, audit) và để join dữ liệu offline.
+- ID hay gặp được nhớ trong LRU (PSEUDONYM_CACHE) → hot path không băm lại.
+
+Key lấy từ PB025_PSEUDONYM_KEY (hex); không có thì đọc / tạo 1 lần file
+PSEUDONYM_KEY_PATH (mọi worker dùng chung). Mất key = mất khả năng tra lại
+pseudonym của cùng 1 CCCD.
+
+Tra ngược pseudonym → national_id chỉ qua PseudonymVault (file SQLite riêng,
+PSEUDONYM_VAULT_PATH) và chỉ endpoint giám sát có token mới gọi (main.py).
+Vault chỉ ghi CCCD đã có consent / khiếu nại (enroll); chấm điểm, tra cứu
+dùng pseudonymize() – chỉ băm, không ghi gì.
+
+Batch offline (nhiều process):
+    python pseudonym.py loans.csv loans_pseudo.csv --column national_id --workers 8
+"""
+
+import argparse
+import hashlib
+import os
+import secrets
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
+
+from state_db import SQLiteStore
+
+PSEUDONYM_KEY_PATH = os.getenv("PSEUDONYM_KEY_PATH", os.path.join("data", "pseudonym.key"))
+PSEUDONYM_VAULT_PATH = os.getenv("PSEUDONYM_VAULT_PATH", os.path.join("data", "pb025_pseudonym_vault.db"))
+PSEUDONYM_HEX = int(os.getenv("PSEUDONYM_HEX", "32"))  # 128 bit
+PSEUDONYM_CACHE = int(os.getenv("PSEUDONYM_CACHE", "200000"))
+PSEUDONYM_BATCH_CHUNK = 200_000
+
+
+def load_key(path: str = PSEUDONYM_KEY_PATH) -> bytes:
+    """Key HMAC: env PB025_PSEUDONYM_KEY (hex) > file key > tạo file key mới."""
+    env_key = os.getenv("PB025_PSEUDONYM_KEY")
+    if env_key:
+        return bytes.fromhex(env_key)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    try:
+        # O_EXCL: nhiều worker khởi động cùng lúc → chỉ 1 process tạo key
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        for _ in range(50):
+            with open(path, "r", encoding="ascii") as f:
+                key = f.read().strip()
+            if key:
+                return bytes.fromhex(key)
+            time.sleep(0.1)  # process khác vừa tạo file, chưa ghi xong
+        raise RuntimeError(f"Pseudonym key file {path} is empty")
+    key = secrets.token_bytes(32)
+    with os.fdopen(fd, "w", encoding="ascii") as f:
+        f.write(key.hex())
+    print(f"[PSEUDONYM] Generated new key at {path} – set PB025_PSEUDONYM_KEY in production.")
+    return key
+
+
+_IPAD = bytes(x ^ 0x36 for x in range(256))
+_OPAD = bytes(x ^ 0x5C for x in range(256))
+
+
+def _pads(key: bytes) -> Tuple[Any, Any]:
+    """Trạng thái SHA-256 sau khối key^ipad / key^opad (HMAC, RFC 2104).
+
+    Mỗi lần băm chỉ copy 2 trạng thái này thay vì khởi tạo HMAC từ key
+    (nhanh gấp ~2 lần hmac.digest với chuỗi ngắn như CCCD)."""
+    if len(key) > 64:
+        key = hashlib.sha256(key).digest()
+    key = key.ljust(64, b"\0")
+    return hashlib.sha256(key.translate(_IPAD)), hashlib.sha256(key.translate(_OPAD))
+
+
+def _hash_all(pads: Tuple[Any, Any], hex_len: int, ids: Iterable[str]) -> List[str]:
+    inner, outer = pads
+    out = []
+    for x in ids:
+        i = inner.copy()
+        i.update(x.encode("utf-8"))
+        o = outer.copy()
+        o.update(i.digest())
+        out.append(o.hexdigest()[:hex_len])
+    return out
+
+
+# ---- batch nhiều process: key gửi 1 lần cho mỗi worker qua initializer ----
+
+_POOL_PADS: Tuple[Any, Any] = (None, None)
+_POOL_HEX = PSEUDONYM_HEX
+
+
+def _pool_init(key: bytes, hex_len: int) -> None:
+    global _POOL_PADS, _POOL_HEX
+    _POOL_PADS, _POOL_HEX = _pads(key), hex_len
+
+
+def _pool_chunk(ids: List[str]) -> List[str]:
+    return _hash_all(_POOL_PADS, _POOL_HEX, ids)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pseudonyms (
+    pseudonym   TEXT PRIMARY KEY,
+    national_id TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+class PseudonymVault(SQLiteStore):
+    """Bảng pseudonym -> national_id, file riêng để phân quyền truy cập riêng."""
+
+    schema = _SCHEMA
+
+    def __init__(self, path: Optional[str] = None):
+        super().__init__(path or PSEUDONYM_VAULT_PATH)
+
+    def add_many(self, pairs: Iterable[Tuple[str, str]]) -> None:
+        with self._transaction() as conn:
+            conn.executemany("INSERT OR IGNORE INTO pseudonyms VALUES (?, ?)", pairs)
+
+    def reveal(self, pseudonym: str) -> Optional[str]:
+        row = self._conn().execute(
+            "SELECT national_id FROM pseudonyms WHERE pseudonym = ?", (pseudonym,)
+        ).fetchone()
+        return row[0] if row else None
+
+
+class Pseudonymizer:
+    def __init__(
+        self,
+        key: Optional[bytes] = None,
+        vault: Optional[PseudonymVault] = None,
+        cache_size: int = PSEUDONYM_CACHE,
+        hex_len: int = PSEUDONYM_HEX,
+    ):
+        self._key = key or load_key()
+        self._pads = _pads(self._key)
+        self.vault = vault
+        self.hex_len = hex_len
+        # LRU: chỉ lần gặp đầu (cache miss) mới băm; không I/O (hot path chấm điểm)
+        self.pseudonymize = lru_cache(maxsize=cache_size)(self._compute)
+
+    def _compute(self, national_id: str) -> str:
+        return _hash_all(self._pads, self.hex_len, (national_id,))[0]
+
+    def pseudonymize_many(self, national_ids: Sequence[str]) -> List[str]:
+        """Cả lô trong process này, chỉ băm."""
+        return _hash_all(self._pads, self.hex_len, national_ids)
+
+    def enroll(self, national_id: str) -> str:
+        """Pseudonym + ghi cặp (pseudonym, national_id) vào vault – chỉ dùng ở
+        đường consent / khiếu nại cần tra ngược."""
+        pseudonym = self.pseudonymize(national_id)
+        if self.vault is not None:
+            self.vault.add_many([(pseudonym, national_id)])
+        return pseudonym
+
+    def enroll_many(self, national_ids: Sequence[str]) -> List[str]:
+        """Như enroll() cho cả lô, ghi vault 1 transaction (bulk consent)."""
+        out = self.pseudonymize_many(national_ids)
+        if self.vault is not None and out:
+            self.vault.add_many(zip(out, national_ids))
+        return out
+
+    def pseudonymize_batch(
+        self,
+        national_ids: Sequence[str],
+        processes: Optional[int] = None,
+        chunk_size: int = PSEUDONYM_BATCH_CHUNK,
+    ) -> List[str]:
+        """Hàng triệu ID cho join offline: chia khối qua process pool (không ghi vault)."""
+        if processes == 1 or len(national_ids) <= chunk_size:
+            return _hash_all(self._pads, self.hex_len, national_ids)
+        chunks = [list(national_ids[i:i + chunk_size]) for i in range(0, len(national_ids), chunk_size)]
+        out: List[str] = []
+        with ProcessPoolExecutor(processes, initializer=_pool_init, initargs=(self._key, self.hex_len)) as pool:
+            for part in pool.map(_pool_chunk, chunks):
+                out.extend(part)
+        return out
+
+    def reveal(self, pseudonym: str) -> Optional[str]:
+        """pseudonym -> national_id. Chỉ dùng cho view giám sát đã xác thực."""
+        return self.vault.reveal(pseudonym) if self.vault is not None else None
+
+    def stats(self) -> dict:
+        info = self.pseudonymize.cache_info()
+        lookups = info.hits + info.misses
+        return {
+            "cache_size": info.currsize,
+            "cache_max": info.maxsize,
+            "hit_rate": round(info.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def main():
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description="Pseudonymize a national_id column for offline joins")
+    parser.add_argument("src", help="CSV đầu vào")
+    parser.add_argument("dst", help="CSV đầu ra (cột national_id thay bằng pseudonym)")
+    parser.add_argument("--column", default="national_id")
+    parser.add_argument("--workers", type=int, default=None, help="số process (mặc định = số CPU)")
+    parser.add_argument("--chunksize", type=int, default=1_000_000, help="số dòng đọc mỗi lần")
+    args = parser.parse_args()
+
+    p = Pseudonymizer()
+    t0 = time.perf_counter()
+    rows = 0
+    with ProcessPoolExecutor(args.workers, initializer=_pool_init, initargs=(p._key, p.hex_len)) as pool:
+        for i, df in enumerate(pd.read_csv(args.src, dtype={args.column: str}, chunksize=args.chunksize)):
+            ids = df[args.column].fillna("").tolist()
+            parts = [ids[j:j + PSEUDONYM_BATCH_CHUNK] for j in range(0, len(ids), PSEUDONYM_BATCH_CHUNK)]
+            df[args.column] = [x for part in pool.map(_pool_chunk, parts) for x in part]
+            df.to_csv(args.dst, mode="w" if i == 0 else "a", header=i == 0, index=False)
+            rows += len(df)
+    dt = time.perf_counter() - t0
+    print(f"[PSEUDONYM] {rows} rows in {dt:.1f}s ({rows / dt:,.0f} rows/s) -> {args.dst}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Rule engine PB-025: bảng luật có version (rules/<version>.json) được biên
+dịch 1 lần lúc load thành mảng ngưỡng, dùng chung cho API (pb025_api.py) và
+banker portal (frontend/app.py).
+
+Loại bảng:
+- threshold : "default" + các bin tăng dần. {"from": x} = giá trị >= x,
+              {"above": x} = giá trị > x. Biên dịch thành 1 mảng ngưỡng để
+              tra bằng bisect (1 hồ sơ) / np.searchsorted (cả mảng).
+- category  : map giá trị -> kết quả, có "default".
+- decision  : danh sách luật theo thứ tự, luật đầu tiên khớp thắng
+              (np.select cho cả mảng).
+
+Đổi luật = thêm file version mới, không sửa code.
+"""
+
+import bisect
+import json
+import math
+import operator
+import os
+from functools import lru_cache
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+RULES_DIR = os.getenv("PB025_RULES_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "rules"))
+PB025_RULES_VERSION = os.getenv("PB025_RULES_VERSION", "PB025_BANK_V1.0")
+
+_OPS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+
+class ThresholdTable:
+    def __init__(self, name: str, spec: Dict[str, Any]):
+        self.name = name
+        self.input = spec.get("input", name)
+        edges: List[float] = []
+        values = [spec["default"]]
+        for b in spec["bins"]:
+            if "from" in b:
+                edge = float(b["from"])
+            elif "above" in b:
+                edge = math.nextafter(float(b["above"]), math.inf)  # x > a  <=>  x >= nextafter(a)
+            else:
+                raise ValueError(f"Rule table {name}: bin needs 'from' or 'above': {b}")
+            if edges and edge <= edges[-1]:
+                raise ValueError(f"Rule table {name}: bins must be strictly increasing")
+            edges.append(edge)
+            values.append(b["value"])
+        self.edges = tuple(edges)
+        self.edges_array = np.asarray(edges, dtype=np.float64)
+        self.values = tuple(values)
+        # kết quả là số → tra mảng trực tiếp
+        self.values_array = np.asarray(values) if all(isinstance(v, (int, float)) for v in values) else None
+
+    def index(self, x: float) -> int:
+        return bisect.bisect_right(self.edges, x)
+
+    def indices(self, xs) -> np.ndarray:
+        return np.searchsorted(self.edges_array, np.asarray(xs, dtype=np.float64), side="right")
+
+    def lookup(self, x: float) -> Any:
+        return self.values[bisect.bisect_right(self.edges, x)]
+
+    def lookup_many(self, xs) -> np.ndarray:
+        if self.values_array is None:
+            raise TypeError(f"Rule table {self.name} has non-numeric values; use indices() + field()")
+        return self.values_array[self.indices(xs)]
+
+    def field(self, key: str) -> Tuple[Any, ...]:
+        """Cột `key` của các kết quả dạng object, theo chỉ số bin."""
+        return tuple(v[key] for v in self.values)
+
+
+class CategoryTable:
+    def __init__(self, name: str, spec: Dict[str, Any]):
+        self.name = name
+        self.input = spec.get("input", name)
+        self.mapping = dict(spec["map"])
+        self.default = spec["default"]
+
+    def lookup(self, x: Any) -> Any:
+        return self.mapping.get(x, self.default)
+
+    def lookup_many(self, xs: Sequence[Any]) -> np.ndarray:
+        get, default = self.mapping.get, self.default
+        return np.asarray([get(x, default) for x in xs])
+
+
+class DecisionTable:
+    def __init__(self, name: str, spec: Dict[str, Any]):
+        self.name = name
+        # mỗi luật: [(input, op, ngưỡng), ...] – điều kiện AND
+        self.rules: List[List[Tuple[str, str, Any]]] = []
+        values = []
+        for rule in spec["rules"]:
+            conds = []
+            for field, (op, threshold) in rule["when"].items():
+                if op not in _OPS:
+                    raise ValueError(f"Rule table {name}: unknown operator {op!r}")
+                conds.append((field, op, threshold))
+            self.rules.append(conds)
+            values.append(rule["value"])
+        values.append(spec["default"])
+        self.values = tuple(values)
+
+    def index(self, **inputs: Any) -> int:
+        for i, conds in enumerate(self.rules):
+            if all(_OPS[op](inputs[field], t) for field, op, t in conds):
+                return i
+        return len(self.rules)
+
+    def indices(self, **inputs) -> np.ndarray:
+        arrays = {k: np.asarray(v) for k, v in inputs.items()}
+        n = len(next(iter(arrays.values())))
+        conditions = []
+        for conds in self.rules:
+            mask = np.ones(n, dtype=bool)
+            for field, op, t in conds:
+                mask &= _OPS[op](arrays[field], t)
+            conditions.append(mask)
+        return np.select(conditions, np.arange(len(self.rules)), default=len(self.rules))
+
+    def lookup(self, **inputs: Any) -> Any:
+        return self.values[self.index(**inputs)]
+
+    def field(self, key: str) -> Tuple[Any, ...]:
+        return tuple(v[key] for v in self.values)
+
+
+_TABLE_TYPES = {"threshold": ThresholdTable, "category": CategoryTable, "decision": DecisionTable}
+
+
+class RuleSet:
+    def __init__(self, spec: Dict[str, Any]):
+        self.version = spec["version"]
+        self.constants = dict(spec.get("constants", {}))
+        self.tables = {}
+        for name, table in spec["tables"].items():
+            kind = table.get("type")
+            if kind not in _TABLE_TYPES:
+                raise ValueError(f"Rule table {name}: unknown type {kind!r}")
+            self.tables[name] = _TABLE_TYPES[kind](name, table)
+
+    def __getitem__(self, name: str):
+        return self.tables[name]
+
+
+@lru_cache(maxsize=None)
+def load_rules(version: str = PB025_RULES_VERSION) -> RuleSet:
+    """Đọc + biên dịch bảng luật theo version (cache theo process)."""
+    path = os.path.join(RULES_DIR, f"{version}.json")
+    with open(path, "r", encoding="utf-8") as f:
+        spec = json.load(f)
+    if spec.get("version") != version:
+        raise ValueError(f"Rule file {path} declares version {spec.get('version')!r}, expected {version!r}")
+    rules = RuleSet(spec)
+    print(f"[RULES] Loaded {version}: {len(rules.tables)} tables")
+    return rules
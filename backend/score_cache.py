@@ -0,0 +1,81 @@
+"""
+Cache kết quả chấm điểm (LRU + TTL).
+
+Key do caller dựng từ các field có ảnh hưởng tới model + model version,
+nên cùng 1 hồ sơ gửi lại nhiều lần sẽ không phải chạy model lại.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+class ScoreCache:
+    """LRU có hạn dùng (TTL), an toàn giữa các thread."""
+
+    def __init__(self, maxsize: int = 100_000, ttl_seconds: float = 300.0):
+        self.maxsize = max(0, int(maxsize))
+        self.ttl = float(ttl_seconds)
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if not self.enabled:
+            return
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Xoá toàn bộ cache (vd. khi reload model)."""
+        with self._lock:
+            self._data.clear()
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
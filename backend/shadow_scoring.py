@@ -0,0 +1,218 @@
+"""
+Shadow scoring: engine chính trả lời request, engine phụ chấm lại cùng hồ sơ
+ngoài critical path để so sánh quyết định trên traffic thật.
+
+- submit(): chỉ append vào hàng đợi có giới hạn, không chờ; đầy thì bỏ hồ sơ
+  (đếm dropped) chứ không bao giờ chặn request chính.
+- 1 thread nền lấy tối đa max_batch hồ sơ mỗi lượt, gọi fn(batch) (engine
+  phụ vector hoá + cộng dồn sai lệch vào DisagreementStats).
+- Trần cứng: batch ngắn (giữ GIL ít) và sau mỗi batch tốn t giây thread nghỉ
+  t·(1/max_share − 1) → engine phụ dùng tối đa max_share thời gian của
+  process. Traffic vượt ngân sách này bị bỏ ở hàng đợi, không dồn lên p99
+  của engine chính.
+"""
+
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+# cận trên các bucket |ΔPD| (điểm %)
+PD_DIFF_BOUNDS = (0.5, 1.0, 2.0, 5.0, 10.0, 20.0)
+
+
+class DisagreementStats:
+    """Tổng hợp gọn sai lệch engine chính / engine phụ (O(1) bộ nhớ theo traffic)."""
+
+    def __init__(self, band_labels: Sequence[str], bounds: Sequence[float] = PD_DIFF_BOUNDS):
+        self.band_labels = list(band_labels)
+        self.bounds = np.asarray(bounds, dtype=np.float64)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        n_bands = len(self.band_labels)
+        with self._lock:
+            self.count = 0
+            self.pd_abs_sum = 0.0
+            self.pd_diff_sum = 0.0
+            self.pd_sq_sum = 0.0
+            self.pd_abs_max = 0.0
+            self.pd_hist = np.zeros(len(self.bounds) + 1, dtype=np.int64)
+            self.band_matrix = np.zeros((n_bands, n_bands), dtype=np.int64)  # [chính, phụ]
+            self.policy_disagree = 0
+
+    def record_many(
+        self,
+        primary_pd: np.ndarray,
+        shadow_pd: np.ndarray,
+        primary_band: np.ndarray,
+        shadow_band: np.ndarray,
+        primary_policy: np.ndarray,
+        shadow_policy: np.ndarray,
+    ) -> None:
+        """PD tính bằng %, band = chỉ số trong band_labels, policy = id bất kỳ (so sánh bằng)."""
+        diff = np.asarray(shadow_pd, dtype=np.float64) - np.asarray(primary_pd, dtype=np.float64)
+        abs_diff = np.abs(diff)
+        hist = np.bincount(np.searchsorted(self.bounds, abs_diff, side="left"), minlength=len(self.bounds) + 1)
+        n_bands = len(self.band_labels)
+        matrix = np.bincount(
+            np.asarray(primary_band) * n_bands + np.asarray(shadow_band), minlength=n_bands * n_bands
+        ).reshape(n_bands, n_bands)
+        policy_disagree = int(np.count_nonzero(np.asarray(primary_policy) != np.asarray(shadow_policy)))
+        with self._lock:
+            self.count += len(diff)
+            self.pd_abs_sum += float(abs_diff.sum())
+            self.pd_diff_sum += float(diff.sum())
+            self.pd_sq_sum += float(np.dot(diff, diff))
+            if len(diff):
+                self.pd_abs_max = max(self.pd_abs_max, float(abs_diff.max()))
+            self.pd_hist += hist
+            self.band_matrix += matrix
+            self.policy_disagree += policy_disagree
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            n = self.count
+            band_agree = int(np.trace(self.band_matrix))
+            hist = {f"le_{b:g}": int(c) for b, c in zip(self.bounds, self.pd_hist)}
+            hist["le_inf"] = int(self.pd_hist[-1])
+            labels = self.band_labels
+            return {
+                "compared": n,
+                "pd_pp": {
+                    "mean_abs": self.pd_abs_sum / n if n else 0.0,
+                    "mean_diff": self.pd_diff_sum / n if n else 0.0,  # phụ − chính
+                    "rmse": (self.pd_sq_sum / n) ** 0.5 if n else 0.0,
+                    "max_abs": self.pd_abs_max,
+                    "abs_buckets": hist,
+                },
+                "band": {
+                    "disagree": n - band_agree,
+                    "rate": (n - band_agree) / n if n else 0.0,
+                    # "chính>phụ" -> số hồ sơ, chỉ các ô khác 0
+                    "matrix": {
+                        f"{labels[i]}>{labels[j]}": int(c)
+                        for (i, j), c in np.ndenumerate(self.band_matrix)
+                        if c
+                    },
+                },
+                "policy": {
+                    "disagree": self.policy_disagree,
+                    "rate": self.policy_disagree / n if n else 0.0,
+                },
+            }
+
+
+class ShadowScorer:
+    """Hàng đợi có giới hạn + 1 thread nền gọi fn(batch) với trần CPU max_share."""
+
+    def __init__(
+        self,
+        fn: Callable[[List[Any]], None],
+        max_queue: int = 10000,
+        max_batch: int = 256,
+        max_share: float = 0.05,
+        sample: float = 1.0,
+    ):
+        self.fn = fn
+        self.max_queue = max(1, int(max_queue))
+        self.max_batch = max(1, int(max_batch))
+        self.max_share = min(max(float(max_share), 1e-3), 1.0)
+        self.sample = float(sample)
+
+        self._queue: deque = deque()
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started_at: Optional[float] = None
+
+        self.submitted = 0
+        self.dropped = 0
+        self.sampled_out = 0
+        self.scored = 0
+        self.errors = 0
+        self.batches = 0
+        self.busy_s = 0.0
+
+    def submit(self, item: Any) -> bool:
+        """Đưa 1 hồ sơ vào hàng đợi shadow; False nếu bị lấy mẫu bỏ qua / hàng đợi đầy."""
+        return self.submit_many((item,)) == 1
+
+    def submit_many(self, items: Iterable[Any]) -> int:
+        items = list(items)
+        sample = self.sample
+        kept = [x for x in items if random.random() < sample] if sample < 1.0 else items
+        with self._cond:
+            self.sampled_out += len(items) - len(kept)
+            room = self.max_queue - len(self._queue)
+            accepted = kept[:room] if room > 0 else []
+            self._queue.extend(accepted)
+            self.submitted += len(accepted)
+            self.dropped += len(kept) - len(accepted)
+            if accepted:
+                self._cond.notify()
+        return len(accepted)
+
+    def _loop(self) -> None:
+        pause_factor = 1.0 / self.max_share - 1.0
+        while True:
+            with self._cond:
+                while not self._queue and not self._stop.is_set():
+                    self._cond.wait()
+                if self._stop.is_set():
+                    return
+                take = min(len(self._queue), self.max_batch)
+                batch = [self._queue.popleft() for _ in range(take)]
+            t0 = time.perf_counter()
+            try:
+                self.fn(batch)
+            except Exception as e:
+                self.errors += 1
+                print(f"[SHADOW] Shadow batch of {len(batch)} failed: {e}")
+            busy = time.perf_counter() - t0
+            self.busy_s += busy
+            self.batches += 1
+            self.scored += len(batch)
+            # trần CPU: bận `busy` giây → nghỉ sao cho bận / (bận + nghỉ) <= max_share
+            if pause_factor > 0 and self._stop.wait(busy * pause_factor):
+                return
+
+    def start(self) -> None:
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._started_at = time.monotonic()
+            self._thread = threading.Thread(target=self._loop, name="shadow-scoring", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stop.set()
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            queue_depth = len(self._queue)
+        uptime = time.monotonic() - self._started_at if self._started_at is not None else 0.0
+        return {
+            "running": self._thread is not None,
+            "sample": self.sample,
+            "max_share": self.max_share,
+            "queue_depth": queue_depth,
+            "queue_max": self.max_queue,
+            "submitted": self.submitted,
+            "sampled_out": self.sampled_out,
+            "dropped": self.dropped,
+            "scored": self.scored,
+            "batches": self.batches,
+            "errors": self.errors,
+            "busy_share": self.busy_s / uptime if uptime > 0 else 0.0,
+        }
@@ -0,0 +1,54 @@
+"""
+SQLite dùng chung giữa các uvicorn worker (consent, complaint).
+
+Mọi worker mở cùng 1 file ở chế độ WAL: đọc không chặn ghi, mỗi lần đọc
+thấy mọi transaction đã commit của worker khác → dữ liệu nhất quán khi chạy
+`uvicorn main:app --workers N`. Mỗi thread 1 connection riêng.
+"""
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+STATE_DB_PATH = os.getenv("STATE_DB_PATH", os.path.join("data", "pb025_state.db"))
+
+
+class SQLiteStore:
+    """Lớp nền: connection theo thread + transaction + tạo schema lúc mở."""
+
+    schema = ""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or STATE_DB_PATH
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._conn().executescript(self.schema)  # IF NOT EXISTS: an toàn khi nhiều worker cùng khởi động
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, cached_statements=256)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA cache_size=-32768")  # 32MB page cache: index B-tree của bảng lớn
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def data_version(self) -> int:
+        """Đổi mỗi khi connection KHÁC (worker / thread khác) commit vào file."""
+        return self._conn().execute("PRAGMA data_version").fetchone()[0]
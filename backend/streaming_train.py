@@ -0,0 +1,293 @@
+"""
+Train out-of-core cho PB-025 trên toàn bộ lịch sử khoản vay.
+
+Đọc CSV theo chunk (chỉ usecols cần thiết, dtype gọn), bộ nhớ bị chặn bởi
+chunksize chứ không phụ thuộc kích thước file:
+
+  Pass 1: median (bottom-k sample), mean/var sau impute (Welford/Chan),
+          mode + vocabulary của cột categorical, số mẫu mỗi lớp.
+  Pass 2: SGDClassifier(loss="log_loss", average=True).partial_fit từng chunk,
+          class_weight "balanced" tính sẵn từ pass 1.
+
+Kết quả là CompiledScorer (cùng định dạng với model train in-memory).
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import SGDClassifier
+
+from compiled_scorer import CompiledScorer
+from data_cache import read_chunks
+
+# Nguồn chunk: hàm không tham số trả về iterable DataFrame (gọi lại mỗi pass)
+ChunkSource = Callable[[], Iterable[pd.DataFrame]]
+
+class _RunningMoments:
+    """count / mean / M2 gộp theo từng chunk (thuật toán Chan et al.)."""
+
+    def __init__(self, n_features: int):
+        self.count = np.zeros(n_features)
+        self.mean = np.zeros(n_features)
+        self.m2 = np.zeros(n_features)
+
+    def merge(self, count: np.ndarray, mean: np.ndarray, m2: np.ndarray) -> None:
+        total = self.count + count
+        safe = np.where(total > 0, total, 1.0)
+        delta = mean - self.mean
+        self.mean = self.mean + delta * count / safe
+        self.m2 = self.m2 + m2 + delta ** 2 * self.count * count / safe
+        self.count = total
+
+    def update(self, x: np.ndarray) -> None:
+        """x: (n, d), NaN = thiếu (bỏ qua)."""
+        obs = ~np.isnan(x)
+        count = obs.sum(axis=0).astype(float)
+        safe = np.where(count > 0, count, 1.0)
+        mean = np.where(obs, x, 0.0).sum(axis=0) / safe
+        m2 = np.where(obs, (x - mean) ** 2, 0.0).sum(axis=0)
+        self.merge(count, mean, m2)
+
+
+class _BottomKSample:
+    """Mẫu ngẫu nhiên đều kích thước k mỗi cột (giữ k khoá ngẫu nhiên nhỏ nhất)."""
+
+    def __init__(self, n_features: int, k: int, seed: int = 0):
+        self.k = k
+        self.rng = np.random.default_rng(seed)
+        self.keys = [np.empty(0) for _ in range(n_features)]
+        self.values = [np.empty(0) for _ in range(n_features)]
+
+    def update(self, x: np.ndarray) -> None:
+        for j in range(x.shape[1]):
+            col = x[:, j]
+            col = col[~np.isnan(col)]
+            keys = np.concatenate([self.keys[j], self.rng.random(len(col))])
+            values = np.concatenate([self.values[j], col])
+            if len(keys) > self.k:
+                keep = np.argpartition(keys, self.k)[: self.k]
+                keys, values = keys[keep], values[keep]
+            self.keys[j], self.values[j] = keys, values
+
+    def medians(self) -> np.ndarray:
+        return np.array([np.median(v) if len(v) else np.nan for v in self.values])
+
+
+def _labelled(chunk: pd.DataFrame, prepare: Callable, bad_statuses) -> Tuple[pd.DataFrame, np.ndarray]:
+    chunk = chunk[chunk["loan_status"].notna()]
+    chunk = prepare(chunk)
+    y = chunk["loan_status"].isin(bad_statuses).to_numpy(dtype=np.int8)
+    return chunk, y
+
+
+def _cat_values(chunk: pd.DataFrame, name: str) -> pd.Series:
+    if name not in chunk.columns:
+        return pd.Series([np.nan] * len(chunk), index=chunk.index, dtype=object)
+    return chunk[name].astype(object)
+
+
+def _num_matrix(chunk: pd.DataFrame, num_features: List[str]) -> np.ndarray:
+    cols = [
+        chunk[c].to_numpy(dtype=float) if c in chunk.columns else np.full(len(chunk), np.nan)
+        for c in num_features
+    ]
+    return np.column_stack(cols) if cols else np.empty((len(chunk), 0))
+
+
+def compute_stats(
+    chunk_source: ChunkSource,
+    num_features: List[str],
+    cat_features: List[str],
+    bad_statuses,
+    prepare: Callable,
+    median_sample: int,
+    breakdown_feature: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Pass 1: thống kê impute/scale/vocabulary + số mẫu mỗi lớp.
+
+    breakdown_feature: nếu có, đếm thêm {giá trị: [count, bad]} cho cột đó
+    ngay trong pass này (vd. grade cho dashboard) – không phải đọc lại file.
+    """
+    moments = _RunningMoments(len(num_features))
+    sample = _BottomKSample(len(num_features), median_sample)
+    cat_counts: List[Dict[str, int]] = [{} for _ in cat_features]
+    breakdown: Dict[str, List[int]] = {}
+    n_rows, n_bad = 0, 0
+
+    for chunk in chunk_source():
+        chunk, y = _labelled(chunk, prepare, bad_statuses)
+        if not len(chunk):
+            continue
+        n_rows += len(chunk)
+        n_bad += int(y.sum())
+
+        x = _num_matrix(chunk, num_features)
+        moments.update(x)
+        sample.update(x)
+
+        for j, name in enumerate(cat_features):
+            counts = _cat_values(chunk, name).value_counts(dropna=True)
+            acc = cat_counts[j]
+            for value, cnt in counts.items():
+                acc[value] = acc.get(value, 0) + int(cnt)
+
+        if breakdown_feature is not None:
+            codes, uniques = pd.factorize(_cat_values(chunk, breakdown_feature))
+            hit = codes >= 0
+            counts = np.bincount(codes[hit], minlength=len(uniques))
+            bads = np.bincount(codes[hit], weights=y[hit], minlength=len(uniques))
+            for value, cnt, bad in zip(uniques, counts, bads):
+                acc = breakdown.setdefault(value, [0, 0])
+                acc[0] += int(cnt)
+                acc[1] += int(bad)
+
+    if n_rows == 0:
+        raise ValueError("No labelled rows in training data")
+
+    medians = sample.medians()
+
+    # gộp các giá trị được impute bằng median (như SimpleImputer → StandardScaler)
+    n_missing = n_rows - moments.count
+    fill = np.where(np.isnan(medians), 0.0, medians)
+    moments.merge(n_missing, fill, np.zeros(len(num_features)))
+    var = moments.m2 / np.maximum(moments.count, 1.0)
+    scale = np.sqrt(var)
+    scale[scale == 0] = 1.0
+
+    cat_fill: List[Optional[str]] = []
+    cat_vocab: List[List[str]] = []
+    for acc in cat_counts:
+        if not acc:
+            cat_fill.append(None)
+            cat_vocab.append([])
+            continue
+        # mode; hoà thì lấy giá trị nhỏ nhất như SimpleImputer(most_frequent)
+        top = max(acc.values())
+        cat_fill.append(min(v for v, c in acc.items() if c == top))
+        cat_vocab.append(sorted(acc))
+
+    return {
+        "n_rows": n_rows,
+        "n_bad": n_bad,
+        "num_fill": medians,
+        "num_mean": moments.mean,
+        "num_scale": scale,
+        "cat_fill": cat_fill,
+        "cat_vocab": cat_vocab,
+        "breakdown": breakdown,
+    }
+
+
+def _design_matrix(
+    chunk: pd.DataFrame,
+    num_features: List[str],
+    cat_features: List[str],
+    stats: Dict[str, Any],
+) -> np.ndarray:
+    keep = ~np.isnan(stats["num_fill"])
+    x = _num_matrix(chunk, num_features)[:, keep]
+    x = np.where(np.isnan(x), stats["num_fill"][keep], x)
+    x = (x - stats["num_mean"][keep]) / stats["num_scale"][keep]
+    blocks = [x]
+    for j, name in enumerate(cat_features):
+        fill_value, vocab = stats["cat_fill"][j], stats["cat_vocab"][j]
+        if fill_value is None:
+            continue
+        values = _cat_values(chunk, name).fillna(fill_value)
+        codes = pd.Categorical(values, categories=vocab).codes  # -1 = giá trị lạ
+        onehot = np.zeros((len(chunk), len(vocab)))
+        hit = codes >= 0
+        onehot[np.nonzero(hit)[0], codes[hit]] = 1.0
+        blocks.append(onehot)
+    return np.hstack(blocks)
+
+
+def train_streaming(
+    path: str,
+    usecols: List[str],
+    num_features: List[str],
+    cat_features: List[str],
+    bad_statuses,
+    prepare: Callable,
+    chunksize: int = 200_000,
+    epochs: int = 1,
+    alpha: float = 1e-5,
+    median_sample: int = 200_000,
+    seed: int = 42,
+    chunk_source: Optional[ChunkSource] = None,
+    breakdown_feature: Optional[str] = None,
+) -> Tuple[CompiledScorer, Dict[str, Any]]:
+    """Train SGD logistic trên toàn file, trả về (CompiledScorer, thông tin train).
+
+    Mặc định đọc CSV theo chunk; chunk_source cho phép đọc từ nguồn khác
+    (vd. cache cột đã chuẩn hoá – khi đó prepare là hàm identity).
+    """
+    if chunk_source is None:
+        def chunk_source():
+            return read_chunks(path, usecols, chunksize)
+
+    print(f"[ML] Streaming pass 1 (stats) over {path} ...")
+    stats = compute_stats(
+        chunk_source, num_features, cat_features, bad_statuses, prepare, median_sample,
+        breakdown_feature=breakdown_feature,
+    )
+    n_rows, n_bad = stats["n_rows"], stats["n_bad"]
+    n_good = n_rows - n_bad
+    # class_weight="balanced": n / (n_classes * n_c)
+    class_weight = {
+        0: n_rows / (2.0 * max(n_good, 1)),
+        1: n_rows / (2.0 * max(n_bad, 1)),
+    }
+
+    clf = SGDClassifier(
+        loss="log_loss",
+        penalty="l2",
+        alpha=alpha,
+        class_weight=class_weight,
+        average=True,  # ASGD: hệ số trung bình ổn định hơn nhiều khi chỉ chạy 1-2 epoch
+        random_state=seed,
+    )
+    rng = np.random.default_rng(seed)
+    for epoch in range(epochs):
+        print(f"[ML] Streaming pass {epoch + 2} (partial_fit, epoch {epoch + 1}/{epochs}) ...")
+        for chunk in chunk_source():
+            chunk, y = _labelled(chunk, prepare, bad_statuses)
+            if not len(chunk):
+                continue
+            X = _design_matrix(chunk, num_features, cat_features, stats)
+            order = rng.permutation(len(y))  # file xếp theo thời gian → xáo trong chunk
+            clf.partial_fit(X[order], y[order], classes=np.array([0, 1]))
+
+    coef = clf.coef_[0]
+    n_num_kept = int((~np.isnan(stats["num_fill"])).sum())
+    cat_coef: List[np.ndarray] = []
+    offset = n_num_kept
+    for fill_value, vocab in zip(stats["cat_fill"], stats["cat_vocab"]):
+        width = 0 if fill_value is None else len(vocab)
+        cat_coef.append(coef[offset:offset + width])
+        offset += width
+
+    keep = ~np.isnan(stats["num_fill"])
+    scorer = CompiledScorer(
+        num_features=num_features,
+        cat_features=cat_features,
+        num_fill=stats["num_fill"],
+        num_mean=stats["num_mean"][keep],
+        num_scale=stats["num_scale"][keep],
+        num_coef=coef[:n_num_kept],
+        cat_fill=stats["cat_fill"],
+        cat_vocab=stats["cat_vocab"],
+        cat_coef=cat_coef,
+        intercept=float(clf.intercept_[0]),
+    )
+    info = {
+        "train_rows": n_rows,
+        "train_bad": n_bad,
+        "breakdown": stats["breakdown"],
+        "chunksize": chunksize,
+        "epochs": epochs,
+        "alpha": alpha,
+    }
+    print(f"[ML] Streaming training done ({n_rows} rows).")
+    return scorer, info
@@ -0,0 +1,15 @@
+import os
+import sys
+import tempfile
+
+# module backend nằm phẳng trong backend/ (chạy như uvicorn main:app)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# đường dẫn mặc định đọc lúc import module → trỏ vào thư mục tạm, không ghi vào backend/data
+_STATE_DIR = tempfile.mkdtemp(prefix="pb025-tests-")
+os.environ.setdefault("PB025_PSEUDONYM_KEY", "00" * 32)
+os.environ.setdefault("STATE_DB_PATH", os.path.join(_STATE_DIR, "pb025_state.db"))
+os.environ.setdefault("AUDIT_LOG_PATH", os.path.join(_STATE_DIR, "audit_log.jsonl"))
+os.environ.setdefault("PSEUDONYM_VAULT_PATH", os.path.join(_STATE_DIR, "pb025_pseudonym_vault.db"))
+os.environ.setdefault("MODEL_STORE_DIR", os.path.join(_STATE_DIR, "artifacts"))
+os.environ.setdefault("DATA_CACHE_DIR", os.path.join(_STATE_DIR, "cache"))
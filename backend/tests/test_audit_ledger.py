@@ -0,0 +1,110 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from audit_ledger import GENESIS_HASH, AuditLedger, AuditUnavailable, line_body, line_hash, verify
+from audit_segments import list_segments
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        return [line.rstrip(b"\n") for line in f]
+
+
+def test_append_writes_hash_chain(tmp_path):
+    path = str(tmp_path / "audit_log.jsonl")
+    ledger = AuditLedger(path, fsync=False)
+    ledger.start()
+    for i in range(500):
+        ledger.append("score", national_id=f"nid-{i}", i=i)
+    ledger.flush()
+    ledger.close()
+    assert ledger.stats()["written"] == 500
+
+    prev = GENESIS_HASH
+    lines = _read(path)
+    for n, line in enumerate(lines, 1):
+        record = json.loads(line)
+        assert record["seq"] == n and record["i"] == n - 1  # đúng thứ tự append
+        assert line_hash(line) == hashlib.sha256(prev.encode() + line_body(line)).hexdigest()
+        prev = line_hash(line)
+    assert verify(path)["last_hash"] == prev
+
+
+def test_two_writers_share_one_chain(tmp_path):
+    # 2 ledger cùng file (như 2 uvicorn worker): flock + đọc lại đuôi file
+    path = str(tmp_path / "audit_log.jsonl")
+    a, b = AuditLedger(path, fsync=False, batch_max=7), AuditLedger(path, fsync=False, batch_max=5)
+    a.start()
+    b.start()
+    threads = [
+        threading.Thread(target=lambda ledger=ledger, w=w: [ledger.append("score", w=w, i=i) for i in range(400)])
+        for w, ledger in enumerate((a, b))
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    a.close()
+    b.close()
+    result = verify(path)
+    assert result["ok"] and result["records"] == 800
+    records = [json.loads(line) for line in _read(path)]
+    assert [r["seq"] for r in records] == list(range(1, 801))
+    for w in (0, 1):
+        assert [r["i"] for r in records if r["w"] == w] == list(range(400))
+
+
+def test_rotation_continues_chain(tmp_path):
+    path = str(tmp_path / "audit_log.jsonl")
+    ledger = AuditLedger(path, fsync=False, segment_bytes=8 * 1024, batch_max=16)
+    ledger.start()
+    for i in range(1000):
+        ledger.append("consent_grant", consent_id=f"CON-{i}", i=i)
+    ledger.flush()
+    ledger.close()
+    deadline = time.monotonic() + 10.0
+    while not all(seg.sealed for seg in list_segments(path)) and time.monotonic() < deadline:
+        time.sleep(0.02)  # nén segment chạy ở thread riêng
+    segments = list_segments(path)
+    assert len(segments) >= 3 and ledger.rotations == len(segments)
+    assert all(seg.sealed for seg in segments)
+    # seq liền mạch qua ranh giới segment, file đang ghi nối tiếp segment cuối
+    expected = 1
+    for seg in segments:
+        assert seg.footer["first_seq"] == expected
+        expected = seg.footer["last_seq"] + 1
+    active = _read(path) if os.path.exists(path) else []
+    assert [json.loads(line)["seq"] for line in active] == list(range(expected, 1001))
+    result = verify(path)
+    assert result["ok"] and result["records"] == 1000 and not result["partial"]
+
+
+def test_full_queue_applies_backpressure(tmp_path):
+    ledger = AuditLedger(str(tmp_path / "audit_log.jsonl"), queue_max=2, fsync=False, append_timeout=0.05)
+    ledger.append("score", i=0)
+    ledger.append("score", i=1)
+    # writer chưa chạy: queue đầy → từ chối thay vì bỏ bản ghi
+    with pytest.raises(AuditUnavailable):
+        ledger.append("score", i=2)
+    with pytest.raises(AuditUnavailable):
+        ledger.append_nowait("score", i=2)
+    assert ledger.stats()["rejected"] == 2
+    assert not ledger.healthy()
+
+    # writer giải phóng chỗ trong lúc append đang chờ → bản ghi được nhận
+    ledger.append_timeout = 5.0
+    t = threading.Timer(0.1, ledger.start)
+    t.start()
+    t0 = time.monotonic()
+    ledger.append("score", i=2)
+    assert time.monotonic() - t0 >= 0.05
+    ledger.flush()
+    ledger.close()
+    t.join()
+    result = verify(ledger.path)
+    assert result["ok"] and result["records"] == 3
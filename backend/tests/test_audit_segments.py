@@ -0,0 +1,135 @@
+import gzip
+import json
+import os
+import time
+
+import pytest
+
+from audit_index import AuditIndex
+from audit_ledger import AuditLedger, verify
+from audit_segments import BloomFilter, list_segments
+
+
+def _wait_sealed(path, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        segments = list_segments(path)
+        if segments and all(seg.sealed for seg in segments):
+            return segments
+        time.sleep(0.02)
+    raise AssertionError("segments not sealed in time")
+
+
+@pytest.fixture
+def rotated_ledger(tmp_path):
+    """Ledger 3000 bản ghi, xoay nhiều segment; 50 bản ghi cuối chắc chắn ở file đang ghi."""
+    path = str(tmp_path / "audit_log.jsonl")
+    ledger = AuditLedger(path, segment_bytes=64 * 1024, fsync=False)
+    ledger.start()
+    for i in range(2950):
+        ledger.append("score", national_id=f"nid-{i % 200}", bank_code="VCB", i=i)
+    ledger.flush()
+    _wait_sealed(path)
+    ledger.segment_bytes = 1 << 30  # không xoay thêm
+    for i in range(2950, 3000):
+        ledger.append("score", national_id=f"nid-{i % 200}", bank_code="VCB", i=i)
+    ledger.flush()
+    yield path, ledger
+    ledger.close()
+
+
+def test_verify_after_rotation(rotated_ledger):
+    path, ledger = rotated_ledger
+    segments = list_segments(path)
+    assert len(segments) >= 2
+    assert ledger.rotations == len(segments)
+
+    fast = verify(path, full=False)
+    full = verify(path)
+    assert fast["ok"] and full["ok"]
+    assert fast["records"] == full["records"] == 3000
+    assert fast["last_hash"] == full["last_hash"]
+    assert fast["trusted_segments"] == len(segments) and fast["partial"]
+    assert full["trusted_segments"] == 0 and not full["partial"]
+
+
+def test_verify_detects_tampering_in_active_file(rotated_ledger):
+    path, _ = rotated_ledger
+    with open(path, "rb") as f:
+        lines = f.readlines()
+    lines[-20] = lines[-20].replace(b'"i":', b'"i":1', 1)
+    with open(path, "wb") as f:
+        f.writelines(lines)
+
+    result = verify(path)
+    assert not result["ok"]
+    assert result["file"] == os.path.basename(path)
+    assert result["first_bad_line"] == 3000 - 20 + 1
+
+
+def test_verify_detects_broken_footer_link(rotated_ledger):
+    path, _ = rotated_ledger
+    first = list_segments(path)[0]
+    fpath = first.path[: -len(".jsonl.gz")] + ".footer.json"
+    with open(fpath) as f:
+        footer = json.load(f)
+    footer["last_hash"] = "0" * 64
+    with open(fpath, "w") as f:
+        json.dump(footer, f)
+
+    # incremental: dòng đầu segment sau không còn nối với footer
+    fast = verify(path, full=False)
+    assert not fast["ok"]
+    assert fast["first_bad_line"] == first.footer["records"] + 1
+    # full: hash băm lại lệch footer ngay ở segment đầu
+    full = verify(path)
+    assert not full["ok"] and full["reason"] == "footer"
+
+
+def test_verify_detects_tampering_inside_sealed_segment(rotated_ledger):
+    path, _ = rotated_ledger
+    first = list_segments(path)[0]
+    with gzip.open(first.path, "rb") as f:
+        lines = f.readlines()
+    middle = len(lines) // 2
+    lines[middle] = lines[middle].replace(b'"i":', b'"i":1', 1)
+    with gzip.open(first.path, "wb") as f:
+        f.writelines(lines)
+
+    result = verify(path)
+    assert not result["ok"]
+    assert result["file"] == os.path.basename(first.path)
+    assert result["first_bad_line"] == middle + 1
+    # incremental không băm lại segment → chỉ báo ok kèm partial
+    fast = verify(path, full=False)
+    assert fast["ok"] and fast["partial"]
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter.for_capacity(1000, fp=0.01)
+    present = [f"nid-{i}" for i in range(1000)]
+    for nid in present:
+        bloom.add(nid)
+    assert all(nid in bloom for nid in present)
+
+    absent = [f"other-{i}" for i in range(10000)]
+    false_hits = sum(nid in bloom for nid in absent)
+    assert false_hits < len(absent) * 0.03
+
+    restored = BloomFilter.from_dict(json.loads(json.dumps(bloom.to_dict())))
+    assert all(nid in restored for nid in present)
+
+
+def test_segment_bloom_prunes_lookups(rotated_ledger):
+    path, _ = rotated_ledger
+    segments = list_segments(path)
+    assert all(seg.may_match(None, None, "nid-7") for seg in segments)
+    assert not any(seg.may_match(None, None, "nid-missing-0") for seg in segments)
+
+    index = AuditIndex(path)
+    hits, _ = index.query(national_id="nid-7", limit=100)
+    assert len(hits) == 15  # 3000 bản ghi / 200 national_id
+    assert {r["national_id"] for r in hits} == {"nid-7"}
+    assert [r["i"] for r in hits] == sorted((r["i"] for r in hits), reverse=True)
+    misses, cursor = index.query(national_id="nid-missing-0")
+    assert misses == [] and cursor is None
@@ -0,0 +1,37 @@
+import threading
+from datetime import datetime, timedelta
+
+from complaint_store import ComplaintStore
+
+
+def _complaint(ticket_id, national_id="ref-1", created_at=None):
+    return {
+        "ticket_id": ticket_id,
+        "national_id": national_id,
+        "complaint_type": "score_dispute",
+        "description": "Điểm tín dụng không đúng",
+        "created_at": created_at or datetime.utcnow(),
+        "status": "received",
+    }
+
+
+def test_list_for_citizen_in_created_order(tmp_path):
+    store = ComplaintStore(str(tmp_path / "state.db"))
+    t0 = datetime.utcnow()
+    store.create(_complaint("TCK-2", created_at=t0 + timedelta(seconds=1)))
+    store.create(_complaint("TCK-1", created_at=t0))
+    store.create(_complaint("TCK-3", national_id="ref-2", created_at=t0))
+    listed = store.list_for("ref-1")
+    assert [c["ticket_id"] for c in listed] == ["TCK-1", "TCK-2"]
+    assert listed[0] == _complaint("TCK-1", created_at=t0)
+    assert store.list_for("ref-unknown") == []
+
+
+def test_visible_from_another_worker(tmp_path):
+    # 2 store cùng file (2 uvicorn worker); ghi từ thread khác (threadpool)
+    path = str(tmp_path / "state.db")
+    writer, reader = ComplaintStore(path), ComplaintStore(path)
+    t = threading.Thread(target=lambda: writer.create(_complaint("TCK-1")))
+    t.start()
+    t.join()
+    assert [c["ticket_id"] for c in reader.list_for("ref-1")] == ["TCK-1"]
@@ -0,0 +1,64 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+
+@pytest.fixture(scope="module")
+def client():
+    return TestClient(main.app)
+
+
+def _lines(resp):
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    return [json.loads(line) for line in resp.text.splitlines()]
+
+
+def test_bulk_grant_then_revoke(client):
+    items = [
+        {"national_id": "001099000001", "bank_code": "VCB", "scope_income": True},
+        {"national_id": "001099000002"},  # thiếu bank_code
+        {"national_id": "001099000003", "bank_code": "TCB"},
+    ]
+    granted = _lines(client.post("/api/v1/consent/grant/bulk", json=items))
+    assert [r["index"] for r in granted] == [0, 1, 2]
+    assert [r["ok"] for r in granted] == [True, False, True]
+    assert "bank_code" in granted[1]["error"]
+    first = granted[0]["consent"]
+    assert first["national_id"] == "001099000001"
+    assert first["citizen_ref"] == main.citizen_ref("001099000001")
+    assert first["scope_income"] and first["status"] == "active"
+    assert main.CONSENT_INDEX.allows(first["citizen_ref"], "VCB", "income")
+
+    # NDJSON, phần tử là chuỗi hoặc object; id lạ / dòng hỏng báo theo index
+    body = "\n".join([
+        json.dumps(first["consent_id"]),
+        json.dumps({"consent_id": granted[2]["consent"]["consent_id"]}),
+        json.dumps("CON-missing"),
+        "{not json",
+    ])
+    revoked = _lines(client.post(
+        "/api/v1/consent/revoke/bulk", content=body, headers={"content-type": "application/x-ndjson"}
+    ))
+    assert [r["ok"] for r in revoked] == [True, True, False, False]
+    assert revoked[0]["consent"]["status"] == "revoked"
+    # revoke không mang national_id → không tra ngược vault
+    assert revoked[0]["consent"]["national_id"] is None
+    assert revoked[0]["consent"]["citizen_ref"] == first["citizen_ref"]
+    assert revoked[2]["error"] == "Consent not found"
+    assert not main.CONSENT_INDEX.allows(first["citizen_ref"], "VCB", "income")
+
+
+def test_bulk_line_template_escapes_strings(client):
+    # dòng consent ghép theo template, không qua json.dumps → phải escape đúng
+    granted = _lines(client.post("/api/v1/consent/grant/bulk", json=[{"national_id": "Nguyễn\"1", "bank_code": "VCB"}]))
+    consent = main.Consent(**granted[0]["consent"])
+    assert consent.national_id == "Nguyễn\"1"
+
+
+def test_bulk_rejects_non_array(client):
+    resp = client.post("/api/v1/consent/grant/bulk", json={"national_id": "x"})
+    assert resp.status_code == 400
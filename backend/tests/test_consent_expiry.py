@@ -0,0 +1,75 @@
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from consent_expiry import ConsentExpiry
+from consent_store import ConsentStore
+
+
+def _consent(consent_id, valid_until, national_id="ref-1", bank_code="VCB"):
+    return {
+        "consent_id": consent_id,
+        "national_id": national_id,
+        "bank_code": bank_code,
+        "scope_credit_history": True,
+        "scope_utility": False,
+        "scope_income": False,
+        "status": "active",
+        "granted_at": datetime.utcnow(),
+        "valid_until": valid_until,
+    }
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ConsentStore(str(tmp_path / "state.db"))
+
+
+def test_expires_exactly_at_valid_until(store):
+    now = datetime.utcnow()
+    due = now + timedelta(hours=2)
+    expiry = ConsentExpiry(store, horizon=timedelta(hours=1))
+    fired = []
+    expiry.add_listener(fired.append)
+    expiry.run_due(now)  # nạp tầm nhìn 1 giờ, chưa có gì
+    store.grant(_consent("CON-1", due))
+    expiry.schedule("CON-1", due)  # ngoài tầm nhìn → để lần nạp sau
+    assert expiry.stats()["scheduled"] == 0
+
+    assert expiry.run_due(due - timedelta(microseconds=1)) == 0
+    assert fired == []
+    assert expiry.run_due(due) == 1
+    assert [c["consent_id"] for c in fired] == ["CON-1"]
+    assert fired[0]["status"] == "expired"
+    assert store.get("CON-1")["status"] == "expired"
+    assert expiry.run_due(due + timedelta(hours=1)) == 0  # không phát lại
+
+
+def test_revoked_consent_does_not_fire(store):
+    now = datetime.utcnow()
+    expiry = ConsentExpiry(store)
+    fired = []
+    expiry.add_listener(fired.append)
+    expiry.run_due(now)
+    store.grant(_consent("CON-1", now + timedelta(minutes=5)))
+    expiry.schedule("CON-1", now + timedelta(minutes=5))
+    store.revoke("CON-1")
+    assert expiry.run_due(now + timedelta(minutes=10)) == 0
+    assert fired == [] and store.get("CON-1")["status"] == "revoked"
+
+
+def test_background_thread_wakes_at_deadline(store):
+    expiry = ConsentExpiry(store)
+    fired = threading.Event()
+    expiry.add_listener(lambda c: fired.set())
+    expiry.start()
+    try:
+        due = datetime.utcnow() + timedelta(milliseconds=300)
+        store.grant(_consent("CON-1", due))
+        expiry.schedule("CON-1", due)
+        assert fired.wait(5.0)
+        assert datetime.utcnow() >= due
+        assert expiry.stats()["expired"] == 1
+    finally:
+        expiry.stop()
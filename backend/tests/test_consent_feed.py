@@ -0,0 +1,108 @@
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+import consent_store
+from consent_index import ActiveConsentIndex
+from consent_store import ConsentChangeFeed, ConsentStore
+
+
+def _consent(consent_id, national_id="ref-1", bank_code="VCB", days=30):
+    now = datetime.utcnow()
+    return {
+        "consent_id": consent_id,
+        "national_id": national_id,
+        "bank_code": bank_code,
+        "scope_credit_history": True,
+        "scope_utility": False,
+        "scope_income": True,
+        "status": "active",
+        "granted_at": now,
+        "valid_until": now + timedelta(days=days),
+    }
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "state.db")
+
+
+class Worker:
+    """1 "worker": store + change feed + index consent active trong bộ nhớ."""
+
+    def __init__(self, path):
+        self.store = ConsentStore(path)
+        self.index = ActiveConsentIndex()
+        self.index.rebuild(self.store.iter_active())
+        self.feed = ConsentChangeFeed(self.store)
+
+    def sync(self):
+        changed = self.feed.poll()
+        if changed is None:
+            self.index.rebuild(self.store.iter_active())
+        else:
+            for consent in changed:
+                self.index.apply(consent)
+        return changed
+
+
+def test_change_feed_invalidates_other_worker(db_path):
+    writer, reader = Worker(db_path), Worker(db_path)
+    assert reader.sync() == []
+
+    writer.store.grant(_consent("CON-1"))
+    changed = reader.sync()
+    assert [c["consent_id"] for c in changed] == ["CON-1"]
+    assert reader.index.allows("ref-1", "VCB", "credit_history")
+    assert not reader.index.allows("ref-1", "VCB", "utility")
+
+    writer.store.revoke("CON-1")
+    changed = reader.sync()
+    assert [(c["consent_id"], c["status"]) for c in changed] == [("CON-1", "revoked")]
+    assert not reader.index.allows("ref-1", "VCB", "credit_history")
+
+    # không có gì mới: không trả lại thay đổi cũ
+    assert reader.sync() == []
+
+
+def test_change_feed_sees_writes_from_another_thread(db_path):
+    # cùng 1 store nhưng mỗi thread 1 connection (như threadpool của FastAPI)
+    worker = Worker(db_path)
+    t = threading.Thread(target=lambda: worker.store.grant_many([_consent(f"CON-{i}") for i in range(5)]))
+    t.start()
+    t.join()
+    changed = worker.sync()
+    assert sorted(c["consent_id"] for c in changed) == [f"CON-{i}" for i in range(5)]
+    assert worker.index.stats()["entries"] == 5 * 2  # 2 scope mỗi consent
+
+    done = []
+    t = threading.Thread(target=lambda: done.append(worker.store.revoke_many(["CON-0", "CON-3", "CON-x"])))
+    t.start()
+    t.join()
+    assert [r and r["status"] for r in done[0]] == ["revoked", "revoked", None]
+    worker.sync()
+    assert worker.index.stats()["entries"] == 3 * 2
+
+
+def test_change_feed_rebuilds_after_pruned_log(db_path):
+    writer, reader = Worker(db_path), Worker(db_path)
+    for i in range(10):
+        writer.store.grant(_consent(f"CON-{i}", national_id=f"ref-{i}"))
+    writer.store.prune_changes(keep=2)
+
+    assert reader.sync() is None  # tụt quá mốc đã cắt → dựng lại
+    assert all(reader.index.allows(f"ref-{i}", "VCB", "income") for i in range(10))
+    writer.store.revoke("CON-4")
+    assert [c["consent_id"] for c in reader.sync()] == ["CON-4"]
+
+
+def test_change_log_pruned_on_write_without_polling(db_path, monkeypatch):
+    monkeypatch.setattr(consent_store, "CONSENT_CHANGES_KEEP", 100)
+    store = ConsentStore(db_path)
+    pruned = []
+    monkeypatch.setattr(store, "prune_changes", lambda: pruned.append(store.last_change()))
+    for i in range(35):
+        store.grant(_consent(f"CON-{i}"))
+    # ngưỡng KEEP // 10 = 10 thay đổi → cắt ở lần ghi thứ 11, 22, 33
+    assert pruned == [11, 22, 33]
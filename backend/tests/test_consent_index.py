@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+
+from consent_index import ActiveConsentIndex
+from consent_store import ConsentStore
+
+
+def _consent(consent_id, national_id="ref-1", bank_code="VCB", valid_until=None, **scopes):
+    return {
+        "consent_id": consent_id,
+        "national_id": national_id,
+        "bank_code": bank_code,
+        "scope_credit_history": scopes.get("credit_history", True),
+        "scope_utility": scopes.get("utility", False),
+        "scope_income": scopes.get("income", False),
+        "status": "active",
+        "granted_at": datetime.utcnow(),
+        "valid_until": valid_until or datetime.utcnow() + timedelta(days=30),
+    }
+
+
+def test_grant_then_revoke_misses():
+    index = ActiveConsentIndex()
+    consent = _consent("CON-1", income=True)
+    index.add(consent)
+    assert index.allows("ref-1", "VCB", "credit_history")
+    assert index.allows("ref-1", "VCB", "income")
+    assert not index.allows("ref-1", "VCB", "utility")
+    assert not index.allows("ref-1", "TCB", "credit_history")
+    assert not index.allows("ref-2", "VCB", "credit_history")
+
+    index.remove(dict(consent, status="revoked"))
+    assert not index.allows("ref-1", "VCB", "credit_history")
+    assert index.stats() == {"keys": 0, "entries": 0}
+
+
+def test_other_consent_for_same_key_still_allows():
+    index = ActiveConsentIndex()
+    first, second = _consent("CON-1"), _consent("CON-2")
+    index.add_many([first, second])
+    index.remove(first)
+    assert index.allows("ref-1", "VCB", "credit_history")
+    index.apply(dict(second, status="revoked"))
+    assert not index.allows("ref-1", "VCB", "credit_history")
+
+
+def test_past_valid_until_misses_before_expiry_runs():
+    index = ActiveConsentIndex()
+    valid_until = datetime.utcnow() + timedelta(hours=1)
+    index.add(_consent("CON-1", valid_until=valid_until))
+    assert index.allows("ref-1", "VCB", "credit_history", now=valid_until - timedelta(seconds=1))
+    assert not index.allows("ref-1", "VCB", "credit_history", now=valid_until)
+
+
+def test_rebuild_from_store(tmp_path):
+    store = ConsentStore(str(tmp_path / "state.db"))
+    store.grant_many([_consent(f"CON-{i}", national_id=f"ref-{i}") for i in range(4)])
+    store.revoke("CON-2")
+    index = ActiveConsentIndex()
+    index.add(_consent("CON-stale", national_id="ref-stale"))
+    assert index.rebuild(store.iter_active()) == 3
+    assert [index.allows(f"ref-{i}", "VCB", "credit_history") for i in range(4)] == [True, True, False, True]
+    assert not index.allows("ref-stale", "VCB", "credit_history")
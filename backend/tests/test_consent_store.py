@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from consent_store import ConsentStore
+
+
+def _consent(consent_id, national_id="ref-1", granted_at=None, days=30):
+    granted_at = granted_at or datetime.utcnow()
+    return {
+        "consent_id": consent_id,
+        "national_id": national_id,
+        "bank_code": "VCB",
+        "scope_credit_history": True,
+        "scope_utility": False,
+        "scope_income": True,
+        "status": "active",
+        "granted_at": granted_at,
+        "valid_until": granted_at + timedelta(days=days),
+    }
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ConsentStore(str(tmp_path / "state.db"))
+
+
+def test_grant_get_roundtrip(store):
+    consent = _consent("CON-1")
+    store.grant(consent)
+    assert store.get("CON-1") == consent
+    assert store.get("CON-missing") is None
+    assert store.count() == 1
+
+
+def test_latest_and_history_per_citizen(store):
+    t0 = datetime.utcnow() - timedelta(days=2)
+    store.grant_many([
+        _consent("CON-1", granted_at=t0),
+        _consent("CON-2", granted_at=t0 + timedelta(days=1)),
+        _consent("CON-3", national_id="ref-2", granted_at=t0),
+    ])
+    assert store.latest("ref-1")["consent_id"] == "CON-2"
+    assert [c["consent_id"] for c in store.history("ref-1")] == ["CON-1", "CON-2"]
+    assert store.latest("ref-unknown") is None and store.history("ref-unknown") == []
+
+
+def test_revoke_and_expire(store):
+    now = datetime.utcnow()
+    store.grant_many([_consent("CON-1"), _consent("CON-2", granted_at=now - timedelta(days=31))])
+    assert store.revoke("CON-1")["status"] == "revoked"
+    assert store.revoke("CON-1")["status"] == "revoked"  # revoke lại: idempotent
+    assert store.revoke("CON-missing") is None
+    assert store.expire("CON-1", now) is None  # revoke rồi thì không expire
+
+    # quá valid_until nhưng scheduler chưa chạy: đọc ra đã là expired, không còn trong iter_active
+    assert store.get("CON-2")["status"] == "expired"
+    assert [c["consent_id"] for c in store.iter_active()] == []
+    assert store.expire("CON-2", now)["status"] == "expired"
+    assert store.expire("CON-2", now) is None
+
+
+def test_due_between_uses_half_open_window(store):
+    now = datetime.utcnow()
+    store.grant_many([_consent(f"CON-{d}", granted_at=now, days=d) for d in (1, 2, 3)])
+    store.revoke("CON-2")
+    due = store.due_between(now + timedelta(days=1), now + timedelta(days=3))
+    assert [cid for _, cid in due] == ["CON-3"]
+    assert [cid for _, cid in store.due_between(None, now + timedelta(days=1))] == ["CON-1"]
@@ -0,0 +1,33 @@
+import threading
+from datetime import datetime, timedelta, timezone
+
+from ids import id_timestamp, new_id
+
+
+def test_ids_are_unique_and_increasing():
+    ids = [new_id("A-") for _ in range(100_000)]
+    assert len(set(ids)) == len(ids)
+    assert ids == sorted(ids)  # trong 1 process tăng nghiêm ngặt
+    assert all(len(x) == len("A-") + 11 + 8 + 10 for x in ids)
+
+
+def test_ids_unique_across_threads():
+    out = []
+
+    def work():
+        out.append([new_id("CON-") for _ in range(20_000)])
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    flat = [x for part in out for x in part]
+    assert len(set(flat)) == len(flat) == 8 * 20_000
+
+
+def test_id_timestamp_roundtrip():
+    before = datetime.now(timezone.utc) - timedelta(seconds=1)
+    value = new_id("TCK-")
+    after = datetime.now(timezone.utc) + timedelta(seconds=1)
+    assert before <= id_timestamp(value, "TCK-") <= after
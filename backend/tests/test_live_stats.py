@@ -0,0 +1,39 @@
+from live_stats import LiveDashboard
+
+LABELS = ["A", "B", "C", "D", "E"]
+T0 = 1_700_000_040.0  # đầu 1 phút (chia hết cho 60)
+
+
+def test_records_roll_into_tumbling_windows():
+    dash = LiveDashboard(LABELS, windows={"1m": 60})
+    dash.record(0.02, 0, "A", now=T0 + 1)
+    dash.record(0.10, 2, None, now=T0 + 59)
+    w = dash._windows["1m"]
+    assert w.current.start == T0
+    assert w.current.count == 2 and w.previous is None
+
+    # sang phút kế tiếp: window vừa rồi thành previous
+    dash.record(0.30, 4, "E", now=T0 + 60)
+    assert w.current.start == T0 + 60 and w.current.count == 1
+    prev = dash._window_dict("1m", 60, w.previous, T0)
+    assert prev["count"] == 2
+    assert abs(prev["mean_pd"] - 0.06) < 1e-12
+    assert prev["grade_bucket_distribution"] == {"A": 1, "B": 0, "C": 1, "D": 0, "E": 0}
+    assert prev["grade_counts"] == {"A": 1, "unknown": 1}
+
+    # bỏ qua 1 phút không traffic → window trước là rỗng
+    dash.record(0.05, 1, "B", now=T0 + 180)
+    assert w.previous is None
+
+
+def test_record_many_matches_record():
+    one, many = LiveDashboard(LABELS), LiveDashboard(LABELS)
+    pds, buckets, grades = [0.01, 0.2, 0.5], [0, 3, 4], ["A", "D", None]
+    for pd, bucket, grade in zip(pds, buckets, grades):
+        one.record(pd, bucket, grade)
+    many.record_many(pds, buckets, grades)
+    a, b = one.snapshot(), many.snapshot()
+    for name in ("1m", "1h", "1d"):
+        for key in ("count", "mean_pd", "grade_bucket_distribution", "grade_counts"):
+            assert a[name]["current"][key] == b[name]["current"][key]
+    assert b["1d"]["current"]["count"] == 3
@@ -0,0 +1,60 @@
+import asyncio
+import random
+
+import pytest
+
+from micro_batcher import Histogram, MicroBatcher
+
+
+def test_results_follow_submit_order():
+    calls = []
+
+    def fn(items):
+        calls.append(list(items))
+        return [x * 10 for x in items]
+
+    batcher = MicroBatcher(fn, max_batch=8, window_ms=5)
+
+    async def run():
+        async def one(x):
+            await asyncio.sleep(random.random() / 1000)  # đến lệch nhau trong cửa sổ
+            return x, await batcher.submit(x)
+
+        return await asyncio.gather(*(one(x) for x in range(50)))
+
+    random.seed(4)
+    results = asyncio.run(run())
+    assert all(res == x * 10 for x, res in results)
+    # gom thành lô, không lô nào vượt max_batch, mọi item chạy đúng 1 lần
+    assert len(calls) < 50
+    assert max(len(c) for c in calls) <= 8
+    assert sorted(x for c in calls for x in c) == list(range(50))
+    stats = batcher.stats()
+    assert stats["batch_size"]["count"] == len(calls) and stats["errors"] == 0
+
+
+def test_error_propagates_to_every_caller_in_batch():
+    def fn(items):
+        raise ValueError("model failed")
+
+    batcher = MicroBatcher(fn, max_batch=4, window_ms=5)
+
+    async def run():
+        return await asyncio.gather(*(batcher.submit(x) for x in range(4)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, ValueError) for r in results)
+    assert batcher.stats()["errors"] >= 1
+
+    # lỗi không làm batcher chết: event loop mới vẫn dùng được
+    batcher.fn = lambda items: [x + 1 for x in items]
+    assert asyncio.run(batcher.submit(1)) == 2
+
+
+def test_histogram_buckets():
+    hist = Histogram([1, 2, 4])
+    for v in (1, 2, 3, 4, 9):
+        hist.observe(v)
+    snap = hist.snapshot()
+    assert snap["buckets"] == {"le_1": 1, "le_2": 1, "le_4": 2, "le_inf": 1}
+    assert snap["count"] == 5 and snap["mean"] == pytest.approx(19 / 5)
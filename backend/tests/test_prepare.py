@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+
+from main import _parse_percent, _parse_term, _parse_unique_tokens, _prepare_df_basic
+
+
+def test_parse_lendingclub_strings():
+    df = pd.DataFrame({
+        "term": pd.Series([" 36 months", " 60 months", None, " 36 months"], dtype="category"),
+        "int_rate": ["7.97%", " 13.5% ", "bad", None],
+        "revol_util": [53.3, np.nan, 0.0, 100.0],  # cột đã là số: giữ nguyên
+    })
+    out = _prepare_df_basic(df)
+    np.testing.assert_array_equal(out["term_months"], [36, 60, np.nan, 36])
+    np.testing.assert_array_equal(out["int_rate_num"], [7.97, 13.5, np.nan, np.nan])
+    np.testing.assert_array_equal(out["revol_util_num"], [53.3, np.nan, 0.0, 100.0])
+
+
+def test_parse_dtype_follows_cache():
+    col = pd.Series(["7.97%", None, "7.97%"], dtype="category")
+    wide = _parse_unique_tokens(col, _parse_percent)
+    assert wide.dtype == np.float64 and wide[0] == 7.97  # mặc định: parity với model
+    narrow = _parse_unique_tokens(col, _parse_percent, "float32")
+    assert narrow.dtype == np.float32 and narrow[0] == np.float32(7.97) and np.isnan(narrow[1])
+    assert _parse_unique_tokens(pd.Series([36, 60]), _parse_term, "float32").dtype == np.float32
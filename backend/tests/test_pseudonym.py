@@ -0,0 +1,60 @@
+import hashlib
+import hmac
+import random
+
+import pytest
+
+from pseudonym import PseudonymVault, Pseudonymizer
+
+
+def _ids(n, seed=22):
+    rnd = random.Random(seed)
+    return [f"{rnd.randrange(10**12):012d}" for _ in range(n)] + ["", "Nguyễn-001", "x" * 200]
+
+
+def _reference(key, national_id, hex_len):
+    return hmac.new(key, national_id.encode("utf-8"), hashlib.sha256).hexdigest()[:hex_len]
+
+
+@pytest.mark.parametrize("key", [b"k", bytes(range(32)), b"\x01" * 64, bytes(range(100)) + b"long-key"])
+@pytest.mark.parametrize("hex_len", [16, 32, 64])
+def test_matches_stdlib_hmac(key, hex_len):
+    p = Pseudonymizer(key=key, hex_len=hex_len)
+    ids = _ids(200)
+    expected = [_reference(key, x, hex_len) for x in ids]
+    assert [p.pseudonymize(x) for x in ids] == expected
+    assert p.pseudonymize_many(ids) == expected
+
+
+def test_key_changes_pseudonym():
+    a = Pseudonymizer(key=b"\x01" * 32)
+    b = Pseudonymizer(key=b"\x02" * 32)
+    assert a.pseudonymize("001099012345") != b.pseudonymize("001099012345")
+
+
+def test_enroll_and_reveal(tmp_path):
+    vault = PseudonymVault(str(tmp_path / "vault.db"))
+    p = Pseudonymizer(key=b"\x07" * 32, vault=vault)
+
+    ref = p.enroll("001099012345")
+    assert ref == p.pseudonymize("001099012345")
+    assert p.reveal(ref) == "001099012345"
+    assert p.enroll("001099012345") == ref  # enroll lại không lỗi (INSERT OR IGNORE)
+
+    refs = p.enroll_many(["079200000001", "079200000002"])
+    assert [p.reveal(r) for r in refs] == ["079200000001", "079200000002"]
+
+    # chỉ băm thì không ghi vault
+    scored = p.pseudonymize("048300000009")
+    assert p.reveal(scored) is None
+    assert p.pseudonymize_many(["048300000010"]) and p.reveal(p.pseudonymize("048300000010")) is None
+    assert Pseudonymizer(key=b"\x07" * 32).reveal(ref) is None  # không có vault
+
+
+def test_batch_matches_many():
+    p = Pseudonymizer(key=bytes(range(70)))
+    ids = _ids(5000, seed=7)
+    expected = p.pseudonymize_many(ids)
+    assert p.pseudonymize_batch(ids, processes=1) == expected
+    # chia khối qua process pool: giữ đúng thứ tự
+    assert p.pseudonymize_batch(ids, processes=2, chunk_size=999) == expected
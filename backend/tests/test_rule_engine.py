@@ -0,0 +1,143 @@
+import math
+import random
+
+import numpy as np
+import pytest
+
+from rule_engine import load_rules
+
+POLICY_VERSION = "PB025_BANK_V1.0"
+
+
+# ---- luật banker portal bản if/else gốc (frontend/app.py trước bảng luật) ----
+
+def legacy_cic_grade(grade):
+    return {"A": 120, "B": 80, "C": 40, "D": 0, "E": -80}.get(grade, 0)
+
+
+def legacy_dti(dti):
+    if dti < 30: return 120
+    if 30 <= dti < 40: return 60
+    if 40 <= dti < 50: return 0
+    if 50 <= dti < 60: return -60
+    return -120
+
+
+def legacy_income(annual_income):
+    if annual_income > 500_000_000: return 80
+    if 300_000_000 <= annual_income <= 500_000_000: return 50
+    if 150_000_000 <= annual_income < 300_000_000: return 20
+    return -40
+
+
+def legacy_loan_vs_income(annual_income, loan_amount):
+    if annual_income <= 0:
+        return -80
+    ratio = loan_amount / annual_income
+    if ratio <= 2: return 40
+    if 2 < ratio <= 3: return 10
+    if 3 < ratio <= 5: return -30
+    return -80
+
+
+def legacy_home(home):
+    return {"OWN": 50, "MORTGAGE": 20, "RENT": -20}.get(home, 0)
+
+
+def legacy_tenure(months):
+    if 12 <= months <= 36: return 30
+    if 36 < months <= 60: return 10
+    if months > 60: return -20
+    return 0
+
+
+def legacy_purpose(purpose):
+    return {"personal": 20, "debt_consolidation": 10, "business": 0, "speculative": -40, "other": 0}.get(purpose, 0)
+
+
+def legacy_risk_flags(flags_count):
+    if flags_count <= 0: return 20
+    if flags_count == 1: return -10
+    return -40
+
+
+def legacy_score_grade(score):
+    if score >= 800: return ("A+", "🟢", "#16A34A")
+    if score >= 740: return ("A", "🟢", "#22C55E")
+    if score >= 670: return ("B", "🟡", "#EAB308")
+    if score >= 580: return ("C", "🟠", "#F97316")
+    if score >= 500: return ("D", "🔴", "#EF4444")
+    return ("E", "🔴", "#B91C1C")
+
+
+def legacy_decision(score, dti):
+    if score >= 740 and dti < 45:
+        return "APPROVE"
+    if score >= 670:
+        return "APPROVE_COND"
+    if score >= 580:
+        return "MANUAL_REVIEW"
+    return "DENY"
+
+
+@pytest.fixture(scope="module")
+def rules():
+    return load_rules(POLICY_VERSION)
+
+
+def _around(edges, extra=()):
+    """Giá trị ngay tại / sát 2 bên mỗi ngưỡng + vài giá trị ngẫu nhiên."""
+    out = list(extra)
+    for e in edges:
+        out += [e, math.nextafter(e, -math.inf), math.nextafter(e, math.inf), e - 1, e + 1]
+    return out
+
+
+def test_constants(rules):
+    assert rules.constants == {"base_score": 500, "score_min": 300, "score_max": 850}
+
+
+def test_threshold_tables_match_legacy(rules):
+    rnd = random.Random(21)
+    for dti in _around([30, 40, 50, 60], [0.0, 200.0] + [rnd.uniform(0, 120) for _ in range(2000)]):
+        assert rules["dti"].lookup(dti) == legacy_dti(dti), dti
+    for income in _around([150e6, 300e6, 500e6], [0.0] + [rnd.uniform(0, 1e9) for _ in range(2000)]):
+        assert rules["income"].lookup(income) == legacy_income(income), income
+    for months in range(0, 400):
+        assert rules["tenure"].lookup(months) == legacy_tenure(months), months
+    for flags in range(-2, 10):
+        assert rules["risk_flags"].lookup(flags) == legacy_risk_flags(flags), flags
+
+
+def test_loan_vs_income_matches_legacy(rules):
+    # frontend: ratio = loan / income, income <= 0 → inf
+    rnd = random.Random(22)
+    cases = [(0.0, 1e8), (-1.0, 1e8)] + [(1e8, r * 1e8) for r in _around([2, 3, 5], [0.0])]
+    cases += [(rnd.uniform(1e6, 1e9), rnd.uniform(0, 8e9)) for _ in range(2000)]
+    for income, loan in cases:
+        ratio = loan / income if income > 0 else math.inf
+        assert rules["loan_vs_income"].lookup(ratio) == legacy_loan_vs_income(income, loan), (income, loan)
+
+
+def test_category_tables_match_legacy(rules):
+    for grade in ["A", "B", "C", "D", "E", "F", "", "a"]:
+        assert rules["cic_grade"].lookup(grade) == legacy_cic_grade(grade)
+    for home in ["OWN", "MORTGAGE", "RENT", "OTHER", ""]:
+        assert rules["home"].lookup(home) == legacy_home(home)
+    for purpose in ["personal", "debt_consolidation", "business", "speculative", "other", "car"]:
+        assert rules["purpose"].lookup(purpose) == legacy_purpose(purpose)
+
+
+def test_score_grade_and_decision_match_legacy(rules):
+    for score in range(250, 901):
+        band = rules["score_grade"].lookup(score)
+        assert (band["grade"], band["icon"], band["color"]) == legacy_score_grade(score), score
+        for dti in (0.0, 44.99, 45.0, 80.0):
+            rec = rules["banker_decision"].lookup(score=score, dti_pct=dti)
+            assert rec["decision"] == legacy_decision(score, dti), (score, dti)
+
+
+def test_vectorized_lookup_matches_scalar(rules):
+    values = np.array(_around([30, 40, 50, 60], [0.0, 200.0]))
+    table = rules["dti"]
+    assert [table.values[i] for i in table.indices(values)] == [table.lookup(v) for v in values]
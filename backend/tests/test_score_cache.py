@@ -0,0 +1,38 @@
+import time
+
+from score_cache import ScoreCache
+
+
+def test_lru_evicts_least_recently_used():
+    cache = ScoreCache(maxsize=3, ttl_seconds=60)
+    for key in "abc":
+        cache.put(key, key.upper())
+    assert cache.get("a") == "A"  # a thành mới dùng nhất
+    cache.put("d", "D")
+    assert cache.get("b") is None
+    assert [cache.get(k) for k in "acd"] == ["A", "C", "D"]
+    stats = cache.stats()
+    assert stats["size"] == 3 and stats["evictions"] == 1
+    assert stats["hits"] == 4 and stats["misses"] == 1
+
+
+def test_entries_expire_after_ttl():
+    cache = ScoreCache(maxsize=10, ttl_seconds=0.05)
+    cache.put("a", 1)
+    assert cache.get("a") == 1
+    time.sleep(0.1)
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1 and cache.stats()["size"] == 0
+    cache.put("a", 2)  # put lại → hạn mới
+    assert cache.get("a") == 2
+
+
+def test_clear_and_disabled_cache():
+    cache = ScoreCache(maxsize=10)
+    cache.put("a", 1)
+    cache.clear()
+    assert cache.get("a") is None and cache.stats()["invalidations"] == 1
+
+    off = ScoreCache(maxsize=0)
+    off.put("a", 1)
+    assert not off.enabled and off.get("a") is None and off.stats()["misses"] == 0
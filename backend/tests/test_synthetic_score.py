@@ -0,0 +1,147 @@
+import math
+import random
+
+import pytest
+
+from pb025_api import _BANDS, _PD_BAND, ScoreRequest, _synthetic_score, _synthetic_score_batch, synthetic_score_many
+
+# các field không tất định (audit_id, thời điểm) hoặc mới thêm sau bản gốc
+_VOLATILE = {"audit_id", "generated_at", "citizen_hash", "rules_version"}
+
+
+def legacy_synthetic_score(req):
+    """_synthetic_score bản if/else gốc (trước bảng luật + vector hoá), bỏ phần hash / audit_id."""
+    amount = float(req.loan_amount)
+    tenor = int(req.loan_tenor_months or 36)
+
+    if req.annual_income and req.annual_income > 0:
+        dti = amount / req.annual_income
+    elif req.dti:
+        dti = float(req.dti) / 100.0
+    else:
+        dti = 0.4
+
+    base_pd = 0.05 + 0.0000000003 * amount
+    base_pd += max(dti - 0.3, 0) * 0.4
+    if tenor > 36:
+        base_pd += (tenor - 36) * 0.001
+
+    grade_factor = {
+        "A": -0.03,
+        "B": -0.01,
+        "C": 0.02,
+        "D": 0.05,
+        "E": 0.08,
+    }.get((req.grade or "C").upper(), 0.0)
+
+    base_pd += grade_factor
+    base_pd = max(0.005, min(base_pd, 0.7))
+
+    odds = base_pd / (1 - base_pd)
+    logit = math.log(odds)
+    credit_score = 800 - logit * 120
+    credit_score = max(300, min(900, credit_score))
+
+    if base_pd < 0.03:
+        band = "A"
+    elif base_pd < 0.06:
+        band = "B"
+    elif base_pd < 0.12:
+        band = "C"
+    elif base_pd < 0.25:
+        band = "D"
+    else:
+        band = "E"
+
+    if band in ("A", "B"):
+        policy = "PHÊ DUYỆT (demo)"
+    elif band == "C":
+        policy = "PHÊ DUYỆT có điều kiện (demo)"
+    elif band == "D":
+        policy = "XEM XÉT THÊM – YÊU CẦU TÀI SẢN BẢO ĐẢM (demo)"
+    else:
+        policy = "TỪ CHỐI / GIẢM HẠN MỨC (demo)"
+
+    factors_vi = []
+    if dti > 0.6:
+        factors_vi.append("DTI cao (>60%) – rủi ro gánh nặng nợ.")
+    if amount > 500_000_000:
+        factors_vi.append("Khoản vay lớn – cần thẩm định bổ sung.")
+    if (req.grade or "").upper() in ("D", "E"):
+        factors_vi.append("CIC-like grade thấp (D/E).")
+    if not factors_vi:
+        factors_vi.append("Hồ sơ nằm trong ngưỡng rủi ro chấp nhận được.")
+
+    factors_en = [
+        "High DTI (>60%) – debt burden risk." if dti > 0.6 else "",
+        "Large exposure amount – require extra checks." if amount > 500_000_000 else "",
+        "Low CIC-like grade (D/E)." if (req.grade or "").upper() in ("D", "E") else "",
+    ]
+    factors_en = [f for f in factors_en if f] or ["Risk level acceptable for demo."]
+
+    return {
+        "pd_12m": round(base_pd, 4),
+        "pd": round(base_pd * 100, 2),
+        "score_raw": round(logit, 4),
+        "credit_score": int(round(credit_score)),
+        "grade_bucket": band,
+        "policy_decision": policy,
+        "factors_vi": factors_vi,
+        "factors_en": factors_en,
+        "model_version": "demo-2025-11",
+    }
+
+
+def _requests(n, seed=20):
+    rnd = random.Random(seed)
+    amounts = [0.0, 1.0, 50e6, 500e6, 500_000_001.0, 2e9, 5e12]
+    out = []
+    for _ in range(n):
+        out.append(
+            ScoreRequest(
+                national_id=rnd.choice([None, f"{rnd.randrange(10**12):012d}"]),
+                loan_amount=rnd.choice(amounts) if rnd.random() < 0.2 else rnd.uniform(0, 3e9),
+                loan_tenor_months=rnd.choice([0, 6, 12, 36, 37, 60, 120]),
+                annual_income=rnd.choice([None, 0.0, -1.0, 1.0, rnd.uniform(1e6, 5e9)]),
+                dti=rnd.choice([None, 0.0, 30.0, 60.0, 60.0001, rnd.uniform(0, 200)]),
+                grade=rnd.choice([None, "", "a", "B", "c", "D", "e", "F", "AA"]),
+            )
+        )
+    return out
+
+
+def _stable(result):
+    return {k: v for k, v in result.items() if k not in _VOLATILE}
+
+
+@pytest.fixture(scope="module")
+def score_requests():
+    return _requests(20000)
+
+
+def test_scalar_matches_legacy(score_requests):
+    for req in score_requests:
+        assert _stable(_synthetic_score(req)) == legacy_synthetic_score(req), req
+
+
+def test_batch_matches_legacy(score_requests):
+    batch = _synthetic_score_batch(score_requests)
+    assert len(batch) == len(score_requests)
+    for req, result in zip(score_requests, batch):
+        assert _stable(result) == legacy_synthetic_score(req), req
+
+
+def test_arrays_match_scalar(score_requests):
+    arrays = synthetic_score_many(score_requests)
+    for i in range(0, len(score_requests), 97):
+        expected = legacy_synthetic_score(score_requests[i])
+        assert round(float(arrays["pd_12m"][i]), 4) == expected["pd_12m"]
+        assert int(arrays["credit_score"][i]) == expected["credit_score"]
+        assert _BANDS[int(arrays["band"][i])] == expected["grade_bucket"]
+
+
+def test_band_edges():
+    # PD ngay trên / dưới từng ngưỡng band (không qua phép tính từ request)
+    for pd_value, band in [(0.0299999, "A"), (0.03, "B"), (0.0599999, "B"), (0.06, "C"),
+                           (0.1199999, "C"), (0.12, "D"), (0.2499999, "D"), (0.25, "E"), (0.7, "E")]:
+        assert _BANDS[_PD_BAND.index(pd_value)] == band
@@ -0,0 +1,58 @@
+# backend/train_pb025_model.py
+"""
+PB-025: train model LogisticRegression của API (main.py) và ghi artifact
+có version vào model store. API chỉ load artifact, không tự train lại.
+
+    python train_pb025_model.py              # train + active version mới
+    python train_pb025_model.py --streaming  # train out-of-core trên toàn bộ file
+    python train_pb025_model.py --no-activate
+    python train_pb025_model.py --list
+    python train_pb025_model.py --activate-version <version>
+
+Sau khi train, gọi POST /api/v1/model/reload (header X-Supervisor-Token) để
+worker đang chạy nhận model mới.
+"""
+
+import argparse
+import os
+
+from model_store import MODEL_STORE_DIR, activate_version, latest_version, list_versions, train_lock
+
+
+def cli():
+    parser = argparse.ArgumentParser(description="Train & quản lý model artifact PB-025")
+    parser.add_argument("--streaming", action="store_true", help="train out-of-core (SGD + partial_fit) trên toàn bộ file")
+    parser.add_argument("--chunksize", type=int, default=int(os.getenv("TRAIN_CHUNKSIZE", "200000")), help="số dòng mỗi chunk (streaming)")
+    parser.add_argument("--epochs", type=int, default=1, help="số lượt partial_fit qua file (streaming)")
+    parser.add_argument("--no-activate", action="store_true", help="không trỏ LATEST tới version mới")
+    parser.add_argument("--list", action="store_true", help="liệt kê các version đã có")
+    parser.add_argument("--activate-version", help="trỏ LATEST tới 1 version có sẵn")
+    args = parser.parse_args()
+
+    if args.list:
+        current = latest_version()
+        for v in list_versions():
+            print(("* " if v == current else "  ") + v)
+        return
+
+    if args.activate_version:
+        activate_version(args.activate_version)
+        print(f"[INFO] LATEST -> {args.activate_version}")
+        return
+
+    # chỉ import main khi train: --list / --activate-version không mở DB, không chạy thread nền
+    os.environ["MODEL_TRAIN_IF_MISSING"] = "0"  # không train 2 lần lúc import
+    import main
+
+    with train_lock():  # không chạy song song với lần train khác trên cùng store
+        version = main.train_and_save_artifact(
+            activate=not args.no_activate,
+            streaming=args.streaming,
+            chunksize=args.chunksize,
+            epochs=args.epochs,
+        )
+    print(f"[INFO] DONE – artifact {version} in {MODEL_STORE_DIR}")
+
+
+if __name__ == "__main__":
+    cli()
@@ -1,8 +1,17 @@
 import os
+import sys
 import json
 import requests
 import streamlit as st
 import math
+from pathlib import Path
+
+# rule_engine.py + rules/ dùng chung với API: trong image UI được copy cạnh
+# app.py (xem frontend/Dockerfile), chạy local thì lấy từ ../backend
+_BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+if _BACKEND_DIR.is_dir():
+    sys.path.append(str(_BACKEND_DIR))
+from rule_engine import load_rules
 
 # ================== CONFIG CƠ BẢN ==================
 
@@ -345,6 +354,11 @@ def view_citizen_portal():
 # ================== BANKER SCORING POLICY (V1) ==================
 
 POLICY_VERSION = "PB025_BANK_V1.0"
+# Bảng luật dùng chung với API (backend/rules/<version>.json, xem rule_engine.py)
+RULES = load_rules(POLICY_VERSION)
+BASE_SCORE = RULES.constants["base_score"]
+SCORE_MIN = RULES.constants["score_min"]
+SCORE_MAX = RULES.constants["score_max"]
 
 def clamp(x, lo, hi):
     return max(lo, min(hi, x))
@@ -368,78 +382,43 @@ def dti_calc_simple(annual_income: float, loan_amount: float, tenure_months: int
     return clamp(dti, 0.0, 200.0)
 
 def score_cic_grade(grade: str) -> int:
-    mapping = {"A": 120, "B": 80, "C": 40, "D": 0, "E": -80}
-    return mapping.get(grade, 0)
+    return RULES["cic_grade"].lookup(grade)
 
 def score_dti(dti: float) -> int:
-    if dti < 30: return 120
-    if 30 <= dti < 40: return 60
-    if 40 <= dti < 50: return 0
-    if 50 <= dti < 60: return -60
-    return -120
+    return RULES["dti"].lookup(dti)
 
 def score_income(annual_income: float) -> int:
     # annual_income VND
-    if annual_income > 500_000_000: return 80
-    if 300_000_000 <= annual_income <= 500_000_000: return 50
-    if 150_000_000 <= annual_income < 300_000_000: return 20
-    return -40
+    return RULES["income"].lookup(annual_income)
 
 def score_loan_vs_income(annual_income: float, loan_amount: float) -> int:
-    if annual_income <= 0:
-        return -80
-    ratio = loan_amount / annual_income
-    if ratio <= 2: return 40
-    if 2 < ratio <= 3: return 10
-    if 3 < ratio <= 5: return -30
-    return -80
+    ratio = loan_amount / annual_income if annual_income > 0 else math.inf
+    return RULES["loan_vs_income"].lookup(ratio)
 
 def score_home(home: str) -> int:
-    mapping = {"OWN": 50, "MORTGAGE": 20, "RENT": -20}
-    return mapping.get(home, 0)
+    return RULES["home"].lookup(home)
 
 def score_tenure(months: int) -> int:
-    if 12 <= months <= 36: return 30
-    if 36 < months <= 60: return 10
-    if months > 60: return -20
-    return 0
+    return RULES["tenure"].lookup(months)
 
 def score_purpose(purpose: str) -> int:
-    mapping = {
-        "personal": 20,
-        "debt_consolidation": 10,
-        "business": 0,
-        "speculative": -40,
-        "other": 0,
-    }
-    return mapping.get(purpose, 0)
+    return RULES["purpose"].lookup(purpose)
 
 def score_risk_flags(flags_count: int) -> int:
-    if flags_count <= 0: return 20
-    if flags_count == 1: return -10
-    return -40
+    return RULES["risk_flags"].lookup(flags_count)
 
 def score_to_grade(score: int):
-    # 300–850
-    if score >= 800: return ("A+", "🟢")
-    if score >= 740: return ("A", "🟢")
-    if score >= 670: return ("B", "🟡")
-    if score >= 580: return ("C", "🟠")
-    if score >= 500: return ("D", "🔴")
-    return ("E", "🔴")
+    # SCORE_MIN–SCORE_MAX
+    band = RULES["score_grade"].lookup(score)
+    return (band["grade"], band["icon"])
 
 def score_color(score: int) -> str:
     # CIC-like color mapping
-    if score >= 800: return "#16A34A"   # green
-    if score >= 740: return "#22C55E"
-    if score >= 670: return "#EAB308"   # yellow
-    if score >= 580: return "#F97316"   # orange
-    if score >= 500: return "#EF4444"   # red
-    return "#B91C1C"                    # dark red
+    return RULES["score_grade"].lookup(score)["color"]
 
 def render_score_gauge(score: int):
-    score = clamp(score, 300, 850)
-    pct = (score - 300) / (850 - 300) * 100.0
+    score = clamp(score, SCORE_MIN, SCORE_MAX)
+    pct = (score - SCORE_MIN) / (SCORE_MAX - SCORE_MIN) * 100.0
     color = score_color(score)
 
     st.markdown(
@@ -451,7 +430,7 @@ def render_score_gauge(score: int):
               <div style="font-size:34px;font-weight:700;line-height:1;">{score}</div>
             </div>
             <div style="font-size:12px;color:#6B7280;text-align:right;">
-              <div>Range: 300 – 850</div>
+              <div>Range: {SCORE_MIN} – {SCORE_MAX}</div>
               <div style="margin-top:4px;">
                 <span style="display:inline-flex;align-items:center;gap:8px;">
                   <span style="width:10px;height:10px;background:{color};border-radius:999px;display:inline-block;"></span>
@@ -468,7 +447,7 @@ def render_score_gauge(score: int):
               </div>
             </div>
             <div style="display:flex;justify-content:space-between;font-size:11px;color:#6B7280;margin-top:6px;">
-              <span>300</span><span>500</span><span>580</span><span>670</span><span>740</span><span>850</span>
+              <span>{SCORE_MIN}</span><span>500</span><span>580</span><span>670</span><span>740</span><span>{SCORE_MAX}</span>
             </div>
           </div>
         </div>
@@ -558,13 +537,8 @@ def banker_recommendation(score: int, dti: float, consent_ok: bool = True):
     if not consent_ok:
         return ("FALLBACK_REQUIRED", "Consent không hợp lệ → bật Fallback (phi-PII).", "red")
 
-    if score >= 740 and dti < 45:
-        return ("APPROVE", "PHÊ DUYỆT • Điều kiện chuẩn.", "green")
-    if score >= 670:
-        return ("APPROVE_COND", "PHÊ DUYỆT CÓ ĐIỀU KIỆN • Giảm hạn mức 10% / yêu cầu sao kê 6 tháng.", "yellow")
-    if score >= 580:
-        return ("MANUAL_REVIEW", "CHUYỂN THẨM ĐỊNH THỦ CÔNG (Human-in-the-loop).", "yellow")
-    return ("DENY", "TỪ CHỐI / GIẢM HẠN MỨC (rủi ro cao).", "red")
+    rec = RULES["banker_decision"].lookup(score=score, dti_pct=dti)
+    return (rec["decision"], rec["text"], rec["tone"])
 
 
 # ================== BANKER VIEW (UI MỚI) ==================
@@ -647,7 +621,7 @@ def view_banker_portal():
 
         # ================== SCORE + BREAKDOWN ==================
         with right:
-            base = 500
+            base = BASE_SCORE
 
             p1 = score_cic_grade(cic_grade)
             p2 = score_dti(dti)
@@ -659,7 +633,7 @@ def view_banker_portal():
             p8 = score_risk_flags(flags_count)
 
             raw_total = base + p1 + p2 + p3 + p4 + p5 + p6 + p7 + p8
-            final_score = int(clamp(raw_total, 300, 850))
+            final_score = int(clamp(raw_total, SCORE_MIN, SCORE_MAX))
             grade, emoji = score_to_grade(final_score)
 
             # Render gauge
@@ -713,7 +687,7 @@ def view_banker_portal():
             st.write("")
             with st.expander("Xem công thức tính (demo)"):
                 st.code(
-                    f"""Base=500
+                    f"""Base={base}
 Score = clamp( Base
   + CIC({cic_grade})={p1}
   + DTI({dti:.2f}%)={p2}
@@ -723,7 +697,7 @@ Score = clamp( Base
   + Tenure({int(tenure)})={p6}
   + Purpose({purpose})={p7}
   + RiskFlags({flags_count})={p8}
-, 300..850)
+, {SCORE_MIN}..{SCORE_MAX})
 = {final_score}""",
                     language="text",
                 )